@@ -0,0 +1,95 @@
+"""
+Compare converting hydrated payloads through CumploFundingRequest and export against the single-validation path.
+
+Every funding request is converted by both strategies and their results are checked to be identical.
+
+Usage:
+    python -m benchmarks.conversion --size 500 --rounds 5
+"""
+
+import argparse
+import copy
+import os
+import time
+import tracemalloc
+from collections.abc import Callable
+from statistics import mean
+
+from benchmarks.fake_upstream import FakeUpstream
+from benchmarks.payloads import PayloadGenerator
+
+
+def measure(name: str, convert: Callable[[dict], object], payloads: list[list[dict]]) -> list:
+    """Convert every payload once per round and print the time and peak memory spent per funding request."""
+    durations, converted = [], []
+    for round_payloads in payloads:
+        start = time.perf_counter()
+        converted = [convert(payload) for payload in round_payloads]
+        durations.append((time.perf_counter() - start) / len(round_payloads))
+
+    sample = copy.deepcopy(payloads[0][0])
+    tracemalloc.start()
+    convert(sample)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    microseconds = [duration * 1_000_000 for duration in durations]
+    print(f"{name:<8} mean={mean(microseconds):.1f}us best={min(microseconds):.1f}us peak={peak / 1024:.1f}KiB")
+    return converted
+
+
+def main() -> None:
+    """
+    Run the benchmark over payloads hydrated from a local fake upstream.
+
+    Raises:
+        SystemExit: If both strategies don't yield the same funding requests
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=500, help="Amount of listed funding requests")
+    parser.add_argument("--rounds", type=int, default=5, help="Amount of conversions of every funding request")
+    args = parser.parse_args()
+
+    with FakeUpstream(PayloadGenerator(args.size), latency=0) as upstream:
+        os.environ.update(upstream.environment)
+
+        # NOTE: The constants are read at import time, so the application must be imported after pointing it upstream
+        from cumplo_spotter.integrations.cumplo.api_global import CumploGlobalAPI
+        from cumplo_spotter.integrations.cumplo.hydration import HydrationEngine
+        from cumplo_spotter.models.cumplo import CumploFundingRequest
+
+        engine = HydrationEngine()
+        hydrated = engine.hydrate(CumploGlobalAPI.get_funding_requests(ignore_completed=True))
+        engine.close()
+
+    payloads = [
+        {
+            **details,
+            "score": funding_request.score,
+            "simulation": simulation,
+            "id_borrower": funding_request.id_borrower,
+        }
+        for funding_request, details, simulation in hydrated
+    ]
+
+    def legacy(payload: dict) -> object:
+        funding_request = CumploFundingRequest.model_validate(payload)
+        funding_request.borrower.id = payload["id_borrower"]
+        return funding_request.export()
+
+    def direct(payload: dict) -> object:
+        return CumploFundingRequest.convert(payload, id_borrower=payload["id_borrower"])
+
+    print(f"funding_requests={len(payloads)} rounds={args.rounds}")
+    # NOTE: The legacy path modifies its payloads, so each round gets its own copy
+    expected = measure("legacy", legacy, [copy.deepcopy(payloads) for _ in range(args.rounds)])
+    results = measure("direct", direct, [payloads] * args.rounds)
+
+    if [x.model_dump() for x in results] != [x.model_dump() for x in expected]:
+        print("The single-validation path doesn't match CumploFundingRequest.export")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
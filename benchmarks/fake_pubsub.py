@@ -0,0 +1,74 @@
+"""Local stand-in of Cloud Pub/Sub that keeps the published messages in memory and charges a latency per round trip."""
+
+import time
+from collections import defaultdict
+from collections.abc import Sequence
+from itertools import count
+from threading import Lock
+
+from cumplo_spotter.integrations.pubsub.transport import Message, Transport
+
+
+class FakePubSub(Transport):
+    """
+    Transport that records every published message instead of sending it.
+
+    Every round trip to Pub/Sub costs a fixed latency, plus a small one per message. By default every message takes
+    a round trip of its own, as it does through `CloudPubSubTransport`, which publishes the messages of a batch one by
+    one. A transport that sends a whole batch in a single request can be modeled with `per_message=False`.
+
+    Usage:
+        publisher = BatchPublisher(FakePubSub(latency=0.02))
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.02,
+        latency_per_message: float = 0.0,
+        per_message: bool = True,
+        fail: bool = False,
+    ) -> None:
+        self.latency = latency
+        self.latency_per_message = latency_per_message
+        self.per_message = per_message
+        self.fail = fail
+        self.requests = 0
+        self.messages: dict[str, list[Message]] = defaultdict(list)
+        self._ids = count(1)
+        self._lock = Lock()
+
+    @property
+    def batched(self) -> bool:  # type: ignore[override]
+        """Whether a whole batch costs a single round trip."""
+        return not self.per_message
+
+    @property
+    def published(self) -> int:
+        """Amount of messages published to every topic."""
+        return sum(len(messages) for messages in self.messages.values())
+
+    def publish(self, topic: str, messages: Sequence[Message]) -> list[str]:
+        """
+        Record the given messages after waiting for the latency of their round trips.
+
+        Args:
+            topic (str): The topic the messages are published to
+            messages (Sequence[Message]): The messages to publish
+
+        Returns:
+            list[str]: The IDs of the published messages, in the same order
+
+        Raises:
+            ConnectionError: If the fake is set to fail
+
+        """
+        round_trips = len(messages) if self.per_message else 1
+        time.sleep(self.latency * round_trips + self.latency_per_message * len(messages))
+        if self.fail:
+            raise ConnectionError(topic)
+
+        with self._lock:
+            self.requests += round_trips
+            self.messages[topic].extend(messages)
+            return [str(next(self._ids)) for _ in messages]
@@ -0,0 +1,352 @@
+"""
+Local stand-in of Cumplo's Global API serving synthetic payloads.
+
+Responses take a configurable latency distribution, a share of them can be replaced by faults (invalid JSON bodies,
+hanging connections, throttling and server errors) and the listing can churn over time like the real market does.
+
+Usage:
+    python -m benchmarks.fake_upstream --size 500 --latency lognormal:0.15:0.6 --invalid-json 0.02 --port 8081
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, Self
+
+from benchmarks.payloads import PayloadGenerator
+
+FUNDING_REQUESTS_PATH = "/funding-requests"
+DETAILS_PATH = "/funding-requests/{id_funding_request}"
+SIMULATION_PATH = "/simulations/{credit_type}/{currency}"
+
+DETAILS_PATTERN = re.compile(r"^/funding-requests/(?P<id>\d+)$")
+SIMULATION_PATTERN = re.compile(r"^/simulations/[^/]+/[^/]+$")
+
+# NOTE: Cumplo sometimes answers with an HTML error page and a 200 status, which can't be decoded as JSON
+INVALID_JSON_BODY = b"<html><body><h1>Service temporarily unavailable</h1></body></html>"
+
+
+@dataclass(frozen=True)
+class Latency:
+    """
+    Distribution of the latency of the responses, in seconds.
+
+    Distributions are given as `fixed:SECONDS`, `uniform:LOW:HIGH`, `exponential:MEAN` or `lognormal:MEDIAN:SIGMA`.
+    A bare number is a fixed latency.
+    """
+
+    distribution: str = "fixed"
+    parameters: tuple[float, ...] = (0.05,)
+
+    @classmethod
+    def parse(cls, specification: str) -> Self:
+        """
+        Parse a latency distribution specification.
+
+        Args:
+            specification (str): The distribution and its parameters separated by colons
+
+        Returns:
+            Self: The latency distribution
+
+        Raises:
+            ValueError: If the distribution is unknown or its parameters are invalid
+
+        """
+        distribution, *parameters = specification.split(":")
+        if not parameters:
+            return cls("fixed", (float(distribution),))
+
+        arities = {"fixed": 1, "uniform": 2, "exponential": 1, "lognormal": 2}
+        if arities.get(distribution) != len(parameters):
+            raise ValueError(specification)
+
+        return cls(distribution, tuple(map(float, parameters)))
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        Draw a latency from the distribution.
+
+        Args:
+            rng (random.Random): The random number generator to draw from
+
+        Returns:
+            float: The latency in seconds
+
+        """
+        match self.distribution, self.parameters:
+            case "uniform", (low, high):
+                return rng.uniform(low, high)
+            case "exponential", (mean,):
+                return rng.expovariate(1 / mean) if mean > 0 else 0.0
+            case "lognormal", (median, sigma):
+                return rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+            case _, (seconds, *_):
+                return seconds
+        return 0.0
+
+
+@dataclass(frozen=True)
+class Faults:
+    """Share of the responses replaced by each kind of fault, and how long hanging responses take."""
+
+    invalid_json: float = 0.0
+    timeout: float = 0.0
+    throttle: float = 0.0
+    server_error: float = 0.0
+    hang: float = 60.0
+    retry_after: int = 1
+
+
+@dataclass
+class Reply:
+    status: int
+    body: bytes
+    content_type: str = "application/json"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class FakeUpstream:
+    """
+    Threaded HTTP/1.1 server that mimics the funding requests, details and simulation endpoints.
+
+    Usage:
+        with FakeUpstream(PayloadGenerator(size=200), latency=0.05) as upstream:
+            os.environ.update(upstream.environment)
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        generator: PayloadGenerator,
+        *,
+        latency: float | Latency = 0.05,
+        faults: Faults | None = None,
+        churn: float = 0.0,
+        churn_interval: float = 60.0,
+        port: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.generator = generator
+        self.latency = latency if isinstance(latency, Latency) else Latency("fixed", (latency,))
+        self.faults = faults or Faults()
+        self.churn = churn
+        self.churn_interval = churn_interval
+        self.calls: dict[str, int] = {"list": 0, "details": 0, "simulation": 0}
+        self.injected: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._churned_at = time.monotonic()
+        self._lock = Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """Base URL of the fake upstream."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def environment(self) -> dict[str, str]:
+        """Environment variables that point the application to this fake upstream."""
+        return {
+            "CUMPLO_GLOBAL_API": self.url,
+            "CUMPLO_GLOBAL_API_FUNDING_REQUESTS": FUNDING_REQUESTS_PATH,
+            "CUMPLO_GLOBAL_API_DETAILS": DETAILS_PATH,
+            "CUMPLO_GLOBAL_API_SIMULATION": SIMULATION_PATH,
+        }
+
+    def __enter__(self) -> "FakeUpstream":
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        """Export the calls to every endpoint along with the injected faults."""
+        with self._lock:
+            return {"calls": dict(self.calls), "faults": dict(self.injected)}
+
+    def respond(self, method: str, path: str, body: bytes) -> Reply:
+        """
+        Build the response of a given request.
+
+        Args:
+            method (str): The HTTP method of the request
+            path (str): The path of the request
+            body (bytes): The body of the request
+
+        Returns:
+            Reply: The response
+
+        """
+        with self._lock:
+            latency = self.latency.sample(self._random)
+            fault = self._draw_fault()
+        time.sleep(latency)
+
+        if method == "GET" and path == FUNDING_REQUESTS_PATH:
+            self._count("list")
+            return self._fault(fault) or self._json(self._list())
+
+        if method == "GET" and (match := DETAILS_PATTERN.match(path)):
+            self._count("details")
+            with self._lock:
+                if (id_funding_request := int(match.group("id"))) not in self.generator.operations:
+                    return self._json({"errors": [{"detail": "Not found"}]}, status=404)
+                details = self.generator.details(id_funding_request)
+            return self._fault(fault) or self._json(details)
+
+        if method == "POST" and SIMULATION_PATTERN.match(path):
+            self._count("simulation")
+            payload = json.loads(body)
+            with self._lock:
+                if payload["data"]["id_operacion"] not in self.generator.operations:
+                    return self._json({"errors": [{"detail": "Not found"}]}, status=404)
+                simulation = self.generator.simulation(payload)
+            return self._fault(fault) or self._json(simulation)
+
+        return self._json({"error": f"Unknown endpoint {method} {path}"}, status=404)
+
+    def _list(self) -> dict:
+        """Build the listing, churning it first if it's due."""
+        with self._lock:
+            if self.churn and time.monotonic() - self._churned_at >= self.churn_interval:
+                self.generator.churn(self.churn)
+                self._churned_at = time.monotonic()
+                self.injected["churn"] += 1
+            return self.generator.funding_requests()
+
+    def _draw_fault(self) -> str | None:
+        """Draw the fault that replaces the response, if any."""
+        draw = self._random.random()
+        for fault in ("invalid_json", "timeout", "throttle", "server_error"):
+            if draw < (share := getattr(self.faults, fault)):
+                return fault
+            draw -= share
+        return None
+
+    def _fault(self, fault: str | None) -> Reply | None:
+        """Build the response of the given fault."""
+        if fault is None:
+            return None
+
+        with self._lock:
+            self.injected[fault] += 1
+
+        match fault:
+            case "invalid_json":
+                return Reply(200, INVALID_JSON_BODY, "text/html")
+            case "timeout":
+                time.sleep(self.faults.hang)
+                return Reply(504, INVALID_JSON_BODY, "text/html")
+            case "throttle":
+                return Reply(429, b'{"errors": []}', headers={"Retry-After": str(self.faults.retry_after)})
+            case _:
+                return Reply(503, INVALID_JSON_BODY, "text/html")
+
+    @staticmethod
+    def _json(content: Any, status: int = 200) -> Reply:
+        """Build a JSON response."""
+        return Reply(status, json.dumps(content).encode())
+
+    def _count(self, endpoint: str) -> None:
+        """Count a call to the given endpoint."""
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        """Build the request handler bound to this fake upstream."""
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                self._reply()
+
+            def do_POST(self) -> None:
+                self._reply()
+
+            def log_message(self, *_: Any) -> None:
+                """Silence the default access log."""
+
+            def _reply(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                reply = upstream.respond(self.command, self.path, body)
+                self.send_response(reply.status)
+                self.send_header("Content-Type", reply.content_type)
+                self.send_header("Content-Length", str(len(reply.body)))
+                for name, value in reply.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(reply.body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # NOTE: Clients give up on hanging responses before they are written
+                    return
+
+        return Handler
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments that configure a fake upstream to the given parser."""
+    parser.add_argument("--size", type=int, default=500, help="Amount of listed funding requests")
+    parser.add_argument("--latency", type=Latency.parse, default=Latency(), help="Latency distribution of responses")
+    parser.add_argument("--invalid-json", type=float, default=0.0, help="Share of responses with an HTML body")
+    parser.add_argument("--timeout", type=float, default=0.0, help="Share of responses that hang")
+    parser.add_argument("--hang", type=float, default=60.0, help="Seconds hanging responses take")
+    parser.add_argument("--throttle", type=float, default=0.0, help="Share of responses throttled with a 429")
+    parser.add_argument("--server-error", type=float, default=0.0, help="Share of responses failing with a 503")
+    parser.add_argument("--churn", type=float, default=0.0, help="Share of the listing that changes every interval")
+    parser.add_argument("--churn-interval", type=float, default=60.0, help="Seconds between listing changes")
+
+
+def from_arguments(args: argparse.Namespace, port: int = 0) -> FakeUpstream:
+    """Build a fake upstream from the parsed arguments."""
+    faults = Faults(
+        invalid_json=args.invalid_json,
+        timeout=args.timeout,
+        throttle=args.throttle,
+        server_error=args.server_error,
+        hang=args.hang,
+    )
+    return FakeUpstream(
+        PayloadGenerator(args.size),
+        latency=args.latency,
+        faults=faults,
+        churn=args.churn,
+        churn_interval=args.churn_interval,
+        port=port,
+    )
+
+
+def main() -> None:
+    """Serve a fake upstream until interrupted, printing the environment that points the application to it."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8081, help="Port to listen on")
+    args = parser.parse_args()
+
+    with from_arguments(args, args.port) as upstream:
+        for name, value in upstream.environment.items():
+            print(f"export {name}={value}")
+
+        try:
+            while True:
+                time.sleep(10)
+                print(upstream.stats())
+        except KeyboardInterrupt:
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compare the per funding request filter chain against the compiled columnar filter plans.
+
+Every configuration is evaluated by both strategies and their results are checked to be identical.
+
+Usage:
+    python -m benchmarks.filtering --size 1000 --configurations 1000
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+from decimal import Decimal
+
+from benchmarks.fake_upstream import FakeUpstream
+from benchmarks.payloads import PayloadGenerator
+
+
+def random_configuration(generator: random.Random, index: int) -> dict:
+    """Build a random filter configuration payload where every threshold is enabled half of the time."""
+
+    def maybe(value: object) -> object:
+        return value if generator.random() < 0.5 else None  # noqa: PLR2004
+
+    return {
+        "id": f"configuration-{index}",
+        "name": f"Configuration {index}",
+        "ignore_dicom": generator.random() < 0.5,  # noqa: PLR2004
+        "minimum_score": maybe(Decimal(generator.randint(0, 100)) / 100),
+        "minimum_irr": maybe(Decimal(generator.randint(0, 30))),
+        "minimum_amount": maybe(generator.randrange(0, 50_000_000, 1_000_000)),
+        "minimum_duration": maybe(generator.randint(0, 90)),
+        "maximum_duration": maybe(generator.randint(60, 400)),
+        "minimum_investment_amount": maybe(generator.randrange(0, 5_000_000, 100_000)),
+    }
+
+
+def run_chain(funding_requests: list, configurations: list) -> list[list]:
+    """Apply every filter to every funding request, one configuration at a time."""
+    from cumplo_spotter.models.filter import (
+        CreditTypeFilter,
+        DicomFilter,
+        MaximumDurationFilter,
+        MinimumAmountFilter,
+        MinimumDurationFilter,
+        MinimumInvestmentFilter,
+        MinimumIRRFilter,
+        MinimumMonthlyProfitFilter,
+        MinimumScoreFilter,
+        PortfolioFilter,
+    )
+
+    filters = (
+        MinimumAmountFilter,
+        CreditTypeFilter,
+        MinimumInvestmentFilter,
+        MinimumScoreFilter,
+        MinimumIRRFilter,
+        MinimumMonthlyProfitFilter,
+        MinimumDurationFilter,
+        MaximumDurationFilter,
+        DicomFilter,
+        PortfolioFilter,
+    )
+
+    results = []
+    for configuration in configurations:
+        chain = [filter_(configuration) for filter_ in filters]
+        results.append([x for x in funding_requests if all(filter_.apply(x) for filter_ in chain)])
+    return results
+
+
+def run_plans(funding_requests: list, configurations: list, *, indexed: bool = False) -> list[list]:
+    """Compile every configuration and evaluate it over the columns of the funding requests."""
+    from cumplo_spotter.models.filter_plan import FilterPlan, FundingRequestColumns
+
+    columns = FundingRequestColumns(funding_requests, indexed=indexed)
+    return [
+        columns.select(FilterPlan.compile(configuration).evaluate(columns).mask) for configuration in configurations
+    ]
+
+
+def main() -> None:
+    """
+    Run the benchmark over funding requests hydrated from a local fake upstream.
+
+    Raises:
+        SystemExit: If both strategies don't yield the same funding requests
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000, help="Amount of listed funding requests")
+    parser.add_argument("--configurations", type=int, default=1000, help="Amount of filter configurations")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated configurations")
+    args = parser.parse_args()
+
+    # NOTE: The filter chain logs every rejection, which would dominate its timings
+    logging.disable(logging.INFO)
+
+    with FakeUpstream(PayloadGenerator(args.size), latency=0) as upstream:
+        os.environ.update(upstream.environment)
+
+        # NOTE: The constants are read at import time, so the application must be imported after pointing it upstream
+        from cumplo_common.models import FilterConfiguration
+
+        from cumplo_spotter.integrations import cumplo
+
+        funding_requests = list(cumplo.cache.refresh().funding_requests)
+
+    generator = random.Random(args.seed)
+    configurations = [
+        FilterConfiguration.model_validate(random_configuration(generator, index))
+        for index in range(args.configurations)
+    ]
+
+    start = time.perf_counter()
+    expected = run_chain(funding_requests, configurations)
+    chain_duration = time.perf_counter() - start
+
+    evaluations = len(funding_requests) * len(configurations)
+    print(f"funding_requests={len(funding_requests)} configurations={len(configurations)}")
+    print(f"{'chain':<8} {chain_duration:.3f}s {evaluations / chain_duration:,.0f} evaluations/s")
+
+    for name, indexed in (("plan", False), ("indexed", True)):
+        start = time.perf_counter()
+        results = run_plans(funding_requests, configurations, indexed=indexed)
+        duration = time.perf_counter() - start
+
+        if [[x.id for x in result] for result in results] != [[x.id for x in result] for result in expected]:
+            print(f"The {name} strategy doesn't match the filter chain")
+            raise SystemExit(1)
+
+        print(f"{name:<8} {duration:.3f}s {evaluations / duration:,.0f} evaluations/s")
+
+
+if __name__ == "__main__":
+    main()
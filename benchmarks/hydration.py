@@ -0,0 +1,72 @@
+"""
+Compare the refresh cycle time of the thread-pool hydration against the asynchronous hydration engine.
+
+Usage:
+    python -m benchmarks.hydration --size 200 --latency 0.05 --cycles 3
+"""
+
+import argparse
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from statistics import mean
+
+from benchmarks.fake_upstream import FakeUpstream
+from benchmarks.payloads import PayloadGenerator
+
+
+def measure(name: str, cycle: Callable[[], int], cycles: int) -> None:
+    """Run the given refresh cycle several times and print its timings."""
+    durations = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        hydrated = cycle()
+        durations.append(time.perf_counter() - start)
+
+    print(f"{name:<12} hydrated={hydrated:<5} mean={mean(durations):.3f}s best={min(durations):.3f}s")
+
+
+def main() -> None:
+    """Run the benchmark against a local fake upstream."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200, help="Amount of listed funding requests")
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream latency per call in seconds")
+    parser.add_argument("--cycles", type=int, default=3, help="Amount of refresh cycles per strategy")
+    parser.add_argument("--workers", type=int, default=25, help="Thread-pool size and engine concurrency")
+    args = parser.parse_args()
+
+    with FakeUpstream(PayloadGenerator(args.size), latency=args.latency) as upstream:
+        os.environ.update(upstream.environment)
+
+        # NOTE: The constants are read at import time, so the application must be imported after pointing it upstream
+        from cumplo_spotter.integrations.cumplo.api_global import CumploGlobalAPI
+        from cumplo_spotter.integrations.cumplo.hydration import HydrationEngine
+
+        funding_requests = CumploGlobalAPI.get_funding_requests(ignore_completed=True)
+        engine = HydrationEngine(concurrency=args.workers)
+
+        def thread_pool_cycle() -> int:
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                futures = [
+                    executor.submit(
+                        lambda x: CumploGlobalAPI.simulate_funding_request(
+                            x, CumploGlobalAPI.get_funding_request(x.id)["fecha_vencimiento"]
+                        ),
+                        funding_request,
+                    )
+                    for funding_request in funding_requests
+                ]
+                return len([future.result() for future in as_completed(futures)])
+
+        def engine_cycle() -> int:
+            return len(engine.hydrate(funding_requests))
+
+        print(f"size={args.size} latency={args.latency}s workers={args.workers} cycles={args.cycles}")
+        measure("thread-pool", thread_pool_cycle, args.cycles)
+        measure("engine", engine_cycle, args.cycles)
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
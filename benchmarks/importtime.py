@@ -0,0 +1,158 @@
+"""
+Check how long importing the application takes, which every new instance pays before serving its first request.
+
+The application is imported in a fresh interpreter with `python -X importtime` over several rounds, after a warm-up
+round that compiles the bytecode. The median time is checked against a budget, and modules that shouldn't be loaded
+at startup, such as the HTML parser or the Cloud Logging client, fail the check when they are. Results can be written
+as JSON and compared against a previous results file, so startup regressions show up between commits.
+
+Usage:
+    python -m benchmarks.importtime --budget 1000
+    python -m benchmarks.importtime --output importtime.json --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import json
+import platform
+import re
+import subprocess  # noqa: S404
+import sys
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from pathlib import Path
+from statistics import median
+
+# NOTE: Every line looks like `import time:       self [us] |   cumulative |   <indentation>package`
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+FORBIDDEN = ("bs4", "lxml", "google.cloud.logging", "retry")
+
+
+def measure(module: str) -> dict[str, tuple[int, int]]:
+    """
+    Import the given module in a fresh interpreter.
+
+    Returns:
+        dict[str, tuple[int, int]]: The self and cumulative microseconds of every module it imported
+
+    Raises:
+        SystemExit: If the module can't be imported
+
+    """
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if process.returncode:
+        print(process.stderr[-4000:], file=sys.stderr)
+        message = f"Failed to import {module}"
+        raise SystemExit(message)
+
+    modules = {}
+    for line in process.stderr.splitlines():
+        if match := LINE.match(line):
+            own, cumulative, _, name = match.groups()
+            modules[name] = (int(own), int(cumulative))
+    return modules
+
+
+def imported(modules: dict[str, tuple[int, int]], forbidden: Iterable[str]) -> list[str]:
+    """List the forbidden modules that were imported, along with any of their submodules."""
+    return [module for module in forbidden if any(name == module or name.startswith(f"{module}.") for name in modules)]
+
+
+def summarize(rounds: list[dict[str, tuple[int, int]]], module: str, top: int) -> dict:
+    """Summarize the rounds into the median total time, the slowest packages and the slowest first-party modules."""
+    totals = [modules[module][1] / 1000 for modules in rounds]
+
+    # NOTE: The self time of every module is added up into its top-level package, taking the fastest round
+    packages: dict[str, float] = defaultdict(float)
+    for name in rounds[0]:
+        packages[name.split(".")[0]] += min(modules.get(name, (0, 0))[0] for modules in rounds) / 1000
+
+    first_party = module.split(".")[0]
+    own = {
+        name: min(modules.get(name, (0, 0))[1] for modules in rounds) / 1000
+        for name in rounds[0]
+        if name.split(".")[0] == first_party
+    }
+
+    return {
+        "module": module,
+        "total": median(totals),
+        "best": min(totals),
+        "modules": len(rounds[0]),
+        "packages": dict(sorted(packages.items(), key=lambda item: -item[1])[:top]),
+        "first_party": dict(sorted(own.items(), key=lambda item: -item[1])[:top]),
+    }
+
+
+def report(summary: dict) -> None:
+    """Print the summary of the import time."""
+    print(f"{summary['module']}: median={summary['total']:.1f}ms best={summary['best']:.1f}ms")
+    print(f"modules={summary['modules']}\n\nslowest packages (self time)")
+    for name, milliseconds in summary["packages"].items():
+        print(f"{name:<48} {milliseconds:>8.1f}ms")
+    print("\nslowest first-party modules (cumulative time)")
+    for name, milliseconds in summary["first_party"].items():
+        print(f"{name:<48} {milliseconds:>8.1f}ms")
+
+
+def main() -> None:
+    """
+    Run the check.
+
+    Raises:
+        SystemExit: If the import time is over the budget, got slower than the threshold allows when comparing against
+            a previous run, or a forbidden module was imported
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="cumplo_spotter.main", help="Module imported at startup")
+    parser.add_argument("--rounds", type=int, default=5, help="Amount of timed imports")
+    parser.add_argument("--budget", type=float, default=1000, help="Maximum median import time in milliseconds")
+    parser.add_argument("--forbid", nargs="*", default=FORBIDDEN, help="Modules that mustn't be imported at startup")
+    parser.add_argument("--top", type=int, default=15, help="Amount of packages and modules listed")
+    parser.add_argument("--output", type=Path, default=None, help="Results file")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    measure(args.module)
+    rounds = [measure(args.module) for _ in range(args.rounds)]
+    report(summary := summarize(rounds, args.module, args.top))
+
+    if args.output is not None:
+        metadata = {
+            "created_at": datetime.now(UTC).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "parameters": {"rounds": args.rounds, "budget": args.budget},
+        }
+        args.output.write_text(json.dumps({"metadata": metadata, "results": summary}, indent=2))
+        print(f"\nwrote {args.output}")
+
+    failures = []
+    if forbidden := imported(rounds[0], args.forbid):
+        failures.append(f"Imported at startup: {', '.join(forbidden)}")
+
+    if summary["total"] > args.budget:
+        failures.append(f"Import time of {summary['total']:.1f}ms is over the budget of {args.budget:.1f}ms")
+
+    if args.compare is not None:
+        previous = json.loads(args.compare.read_text())["results"]["total"]
+        ratio = summary["total"] / previous - 1
+        print(f"\nagainst {args.compare}: {ratio:+.1%}")
+        if ratio > args.threshold:
+            failures.append(f"Import time got {ratio:.1%} slower than {args.compare}")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Load the real application, served by uvicorn with several workers, against a fake Cumplo upstream.
+
+Concurrent clients send a weighted mix of requests to the listing, promising, single funding request and fetch
+endpoints. Latency percentiles and histograms are reported per endpoint, along with the throughput, the calls that
+reached the upstream and the memory of every worker.
+
+The application authenticates every request, so the headers that authenticate a user with filters, and an admin for
+the fetch endpoint, have to be given.
+
+Usage:
+    python -m benchmarks.load --header "Authorization: Bearer ..." --admin-header "Authorization: Bearer ..."
+    python -m benchmarks.load --workers 8 --concurrency 64 --latency lognormal:0.15:0.6 --invalid-json 0.02 --churn 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_upstream import add_arguments, from_arguments
+
+ENDPOINTS = {
+    "list": ("GET", "/funding-requests"),
+    "promising": ("GET", "/funding-requests/promising"),
+    "item": ("GET", "/funding-requests/{id_funding_request}"),
+    "fetch": ("POST", "/funding-requests/fetch"),
+}
+BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30)
+
+
+@dataclass
+class EndpointStatistics:
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter[str] = field(default_factory=Counter)
+
+    def summary(self, duration: float) -> dict:
+        """Summarize the latencies and statuses of the requests sent to an endpoint."""
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"requests": 0, "statuses": dict(self.statuses)}
+
+        histogram = Counter(BUCKETS[min(bisect_left(BUCKETS, latency), len(BUCKETS) - 1)] for latency in latencies)
+        return {
+            "requests": len(latencies),
+            "throughput": len(latencies) / duration,
+            "statuses": dict(self.statuses),
+            "p50": percentile(latencies, 0.5),
+            "p90": percentile(latencies, 0.9),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1],
+            "histogram": {f"<={bucket}s": histogram[bucket] for bucket in BUCKETS if histogram[bucket]},
+        }
+
+
+def percentile(latencies: list[float], quantile: float) -> float:
+    """Nearest-rank percentile of sorted latencies."""
+    return latencies[min(int(quantile * len(latencies)), len(latencies) - 1)]
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """
+    Parse the weights of the endpoints, such as `list=10,promising=3,item=6,fetch=1`.
+
+    Raises:
+        argparse.ArgumentTypeError: If an endpoint is unknown
+
+    """
+    weights = {}
+    for entry in value.split(","):
+        name, _, weight = entry.partition("=")
+        if name not in ENDPOINTS:
+            message = f"Unknown endpoint {name}, expected one of {', '.join(ENDPOINTS)}"
+            raise argparse.ArgumentTypeError(message)
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def parse_header(value: str) -> tuple[str, str]:
+    """Parse a header given as `Name: value`."""
+    name, _, content = value.partition(":")
+    return name.strip(), content.strip()
+
+
+def free_port() -> int:
+    """Find a free local port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(args: argparse.Namespace, port: int, environment: dict[str, str], log: Path) -> subprocess.Popen:
+    """Serve the application with uvicorn, as it's deployed."""
+    command = [sys.executable, "-m", "uvicorn", "--workers", str(args.workers), "--port", str(port), args.app]
+    with log.open("wb") as output:
+        return subprocess.Popen(command, env=environment, stdout=output, stderr=subprocess.STDOUT)  # noqa: S603
+
+
+def wait_until_ready(server: subprocess.Popen, url: str, timeout: float) -> None:
+    """
+    Wait for the application to accept requests.
+
+    Raises:
+        SystemExit: If the application exits or doesn't start before the timeout
+
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            print(f"The application exited with code {server.returncode}")
+            raise SystemExit(1)
+
+        try:
+            httpx.get(url, timeout=1)
+        except httpx.TransportError:
+            time.sleep(0.2)
+        else:
+            return
+
+    print(f"The application didn't start within {timeout}s")
+    raise SystemExit(1)
+
+
+def worker_memory(pid: int) -> list[dict]:
+    """Resident and peak memory of the given process and of every one of its children, in MiB."""
+    pids = [pid]
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # NOTE: The command name is parenthesized and may contain spaces, so the fields are split after it
+            fields = stat.read_text(encoding="utf-8").rpartition(")")[2].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            pids.append(int(stat.parent.name))
+
+    memory = []
+    for process in pids:
+        try:
+            status = dict(
+                line.split(":", 1)
+                for line in Path(f"/proc/{process}/status").read_text(encoding="utf-8").splitlines()
+                if ":" in line
+            )
+            command = Path(f"/proc/{process}/cmdline").read_bytes()
+        except OSError:
+            continue
+
+        # NOTE: Uvicorn spawns its workers through multiprocessing, which also starts a resource tracker
+        role = "master" if process == pid else "worker" if b"spawn_main" in command else "helper"
+        memory.append({
+            "pid": process,
+            "role": role,
+            "rss_mib": int(status["VmRSS"].split()[0]) / 1024,
+            "peak_mib": int(status["VmHWM"].split()[0]) / 1024,
+        })
+    return memory
+
+
+async def drive(args: argparse.Namespace, url: str) -> tuple[dict[str, EndpointStatistics], float, float]:
+    """
+    Send the mix of requests from concurrent clients until the duration is over.
+
+    Returns:
+        tuple: The statistics of every endpoint, the latency of the first, cold listing and the load duration
+
+    """
+    headers, admin_headers = dict(args.header), dict(args.admin_header)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    statistics = {name: EndpointStatistics() for name in args.mix}
+    rng = random.Random(args.seed)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.request_timeout) as client:
+        start = time.perf_counter()
+        response = await client.get("/funding-requests", headers=headers)
+        cold = time.perf_counter() - start
+        ids = [funding_request["id"] for funding_request in response.json()] if response.is_success else [0]
+
+        names, weights = list(args.mix), list(args.mix.values())
+        deadline = time.monotonic() + args.duration
+
+        async def client_loop() -> None:
+            while time.monotonic() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, path = ENDPOINTS[name]
+                path = path.format(id_funding_request=rng.choice(ids))
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers=admin_headers if name == "fetch" else headers)
+                    status = str(response.status_code)
+                except httpx.HTTPError as error:
+                    status = type(error).__name__
+                statistics[name].latencies.append(time.perf_counter() - start)
+                statistics[name].statuses[status] += 1
+
+        load_start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+        duration = time.perf_counter() - load_start
+
+    return statistics, cold, duration
+
+
+def report(results: dict) -> None:
+    """Print the results of a load run."""
+    print(f"\ncold listing {results['cold_seconds'] * 1000:.0f}ms, then {results['duration']:.1f}s of load")
+    print(f"{'endpoint':<10} {'requests':>9} {'req/s':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  statuses")
+    for name, summary in results["endpoints"].items():
+        if not summary["requests"]:
+            continue
+        timings = " ".join(f"{summary[key] * 1000:>7.1f}ms" for key in ("p50", "p90", "p99", "max"))
+        print(f"{name:<10} {summary['requests']:>9} {summary['throughput']:>8.1f} {timings}  {summary['statuses']}")
+
+    for name, summary in results["endpoints"].items():
+        if summary["requests"]:
+            print(f"{name:<10} histogram {summary['histogram']}")
+
+    if upstream := results.get("upstream"):
+        print(f"upstream   {upstream}")
+    for process in results["memory"]:
+        memory = f"rss={process['rss_mib']:.1f}MiB peak={process['peak_mib']:.1f}MiB"
+        print(f"{process['role']:<10} pid={process['pid']} {memory}")
+
+
+def main() -> None:
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--app", default="cumplo_spotter.main:app", help="Application to serve")
+    parser.add_argument("--workers", type=int, default=8, help="Amount of uvicorn workers")
+    parser.add_argument("--url", default=None, help="Load an application that is already running instead")
+    parser.add_argument("--env", action="append", default=[], help="Extra KEY=VALUE environment of the application")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=64, help="Amount of concurrent clients")
+    parser.add_argument("--request-timeout", type=float, default=30, help="Seconds before a request is abandoned")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("list=10,promising=3,item=6,fetch=1"))
+    parser.add_argument("--header", type=parse_header, action="append", default=[], help="Header of the user")
+    parser.add_argument("--admin-header", type=parse_header, action="append", default=[], help="Header of an admin")
+    parser.add_argument("--startup-timeout", type=float, default=30, help="Seconds to wait for the application")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the request mix")
+    parser.add_argument("--output", type=Path, default=None, help="File to write the results to as JSON")
+    args = parser.parse_args()
+
+    if args.url is not None:
+        statistics, cold, duration = asyncio.run(drive(args, args.url))
+        results = {"cold_seconds": cold, "duration": duration, "memory": []}
+
+    else:
+        with from_arguments(args) as upstream:
+            port = free_port()
+            environment = {"IS_TESTING": "1", **os.environ, **upstream.environment}
+            environment.update(entry.split("=", 1) for entry in args.env)
+
+            log = Path(tempfile.gettempdir()) / f"cumplo-spotter-load-{port}.log"
+            print(f"serving {args.app} with {args.workers} workers on port {port}, logging to {log}")
+            server = serve(args, port, environment, log)
+            try:
+                wait_until_ready(server, f"http://127.0.0.1:{port}/", args.startup_timeout)
+                statistics, cold, duration = asyncio.run(drive(args, f"http://127.0.0.1:{port}"))
+                results = {
+                    "cold_seconds": cold,
+                    "duration": duration,
+                    "upstream": upstream.stats(),
+                    "memory": worker_memory(server.pid),
+                }
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    results["endpoints"] = {name: statistics[name].summary(results["duration"]) for name in statistics}
+    report(results)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
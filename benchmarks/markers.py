@@ -0,0 +1,126 @@
+"""
+Compare the DICOM detection over cleaned descriptions scanning each marker separately against the single-scan matcher.
+
+Every description pair is classified by both strategies and their results are checked to be identical. Besides the
+generated showcase descriptions, random pairs embedding every marker are included to cover all the precedence rules.
+
+Usage:
+    python -m benchmarks.markers --size 2000 --rounds 5
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+from statistics import mean
+
+from cumplo_common.utils import text
+
+from benchmarks.payloads import PayloadGenerator
+from cumplo_spotter.models.cumplo import CumploFundingRequest
+from cumplo_spotter.utils.constants import DicomMarker
+from cumplo_spotter.utils.text import clean_text
+
+MARKERS = (
+    DicomMarker.BOTH_TRUE,
+    DicomMarker.BOTH_FALSE,
+    DicomMarker.DEBTOR_TRUE,
+    DicomMarker.BORROWER_FALSE,
+    *DicomMarker.BORROWER_TRUE,
+    *DicomMarker.SINGLE_FALSE,
+    *DicomMarker.SINGLE_TRUE,
+)
+
+
+def scan_each_marker(data: dict) -> tuple[bool | None, bool | None]:
+    """Identify the DICOM status looking for every marker separately, as it used to be done."""
+    debtor_description = text.clean_text(data["vitrina_descripcion_empresa_deudora"])
+    borrower_description = text.clean_text(data["vitrina_descripcion_empresa_solicitante"])
+    description = f"{borrower_description} {debtor_description}"
+
+    debtor_dicom, borrower_dicom = None, None
+
+    if DicomMarker.BOTH_TRUE in description:
+        return True, True
+
+    if DicomMarker.BOTH_FALSE in description:
+        return False, False
+
+    if DicomMarker.DEBTOR_TRUE in description:
+        debtor_dicom = True
+
+    if any(marker in description for marker in DicomMarker.BORROWER_TRUE):
+        borrower_dicom = True
+
+    if DicomMarker.BORROWER_FALSE in description:
+        borrower_dicom = False
+
+    if borrower_dicom is None and any(marker in description for marker in DicomMarker.SINGLE_FALSE):
+        borrower_dicom = False
+
+    elif borrower_dicom is None and any(marker in description for marker in DicomMarker.SINGLE_TRUE):
+        borrower_dicom = True
+
+    return debtor_dicom, borrower_dicom
+
+
+def build_descriptions(size: int) -> list[dict]:
+    """Build description pairs from the generated showcase plus random pairs embedding the markers."""
+    generator = PayloadGenerator(size)
+    descriptions = [generator.details(id_)["data"]["attributes"] for id_ in generator.operations]
+
+    rng = random.Random(0)
+    for _ in range(size):
+        sentences = [f"{marker.capitalize()}." for marker in rng.sample(MARKERS, k=rng.randint(0, 3))]
+        debtor, borrower = sentences[: len(sentences) // 2], sentences[len(sentences) // 2 :]
+        descriptions.append({
+            "vitrina_descripcion_empresa_deudora": " ".join(debtor),
+            "vitrina_descripcion_empresa_solicitante": " ".join(borrower),
+        })
+
+    return descriptions
+
+
+def measure(name: str, identify: Callable[[dict], tuple], descriptions: list[dict], rounds: int) -> list[tuple]:
+    """Classify every description pair once per round and print the time spent per pair."""
+    durations, results = [], []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        results = [identify(description) for description in descriptions]
+        durations.append((time.perf_counter() - start) / len(descriptions))
+
+    microseconds = [duration * 1_000_000 for duration in durations]
+    print(f"{name:<8} mean={mean(microseconds):.1f}us best={min(microseconds):.1f}us")
+    return results
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+
+    Raises:
+        SystemExit: If both strategies don't yield the same DICOM status
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2000, help="Amount of generated and random description pairs")
+    parser.add_argument("--rounds", type=int, default=5, help="Amount of classifications of every pair")
+    args = parser.parse_args()
+
+    descriptions = build_descriptions(args.size)
+    print(f"descriptions={len(descriptions)} rounds={args.rounds}")
+
+    expected = measure("scan", scan_each_marker, descriptions, args.rounds)
+    clean_text.cache_clear()
+    # NOTE: The first round fills the memo, the rest of them show the cost on descriptions seen on previous refreshes
+    results = measure("matcher", CumploFundingRequest._identify_dicom_status, descriptions, args.rounds)  # noqa: SLF001
+
+    if results != expected:
+        print("The single-scan matcher doesn't match scanning every marker")
+        raise SystemExit(1)
+
+    print(f"memo     {clean_text.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Synthetic generator of Cumplo's Global API payloads for benchmarks."""
+
+import random
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+CREDIT_TYPES = ("simple", "invoice", "bullet", "irrigation", "ANTICIPO_FACTURA", "CAPITAL_TRABAJO")
+ECONOMIC_SECTORS = ("CONSTRUCCION", "TRANSPORTE", "AGRICULTURA", "COMERCIO AL POR MAYOR", "SERVICIOS", "null")
+DICOM_SENTENCES = (
+    "Deudor y cliente sin DICOM.",
+    "Cliente con DICOM por montos menores.",
+    "Solicitante sin DICOM, deudor con DICOM.",
+    "No tiene DICOM vigente.",
+    "Presenta DICOM asociado a un proveedor.",
+    "",
+)
+FILLER_SENTENCES = (
+    "La empresa cuenta con más de diez años de experiencia en el rubro.",
+    "El financiamiento se destinará a capital de trabajo para la ejecución del contrato.",
+    "No presenta deudas con la TGR.",
+    "El pagador es una empresa de reconocida trayectoria en la industria.",
+    "Historial de pagos dentro de plazo en operaciones anteriores.",
+)
+BORROWER_PORTFOLIO_KEYS = (
+    "cantidad_pagadas_plazo_normal_solicitante",
+    "monto_pagadas_plazo_normal_solicitante",
+    "porcentaje_pagado_plazo_normal",
+    "cantidad_pagadas_en_mora_solicitante",
+    "monto_pagadas_en_mora_solicitante",
+    "cantidad_operaciones_activas_solicitante",
+    "monto_operaciones_activas_solicitante",
+    "cantidad_operaciones_mora_menor_30_solicitante",
+    "monto_operaciones_mora_menor_30_solicitante",
+    "cantidad_operaciones_mora_mayor_30_solicitante",
+    "monto_operaciones_mora_mayor_30_solicitante",
+    "cantidad_total_solicitante",
+    "monto_total_solicitante",
+)
+DEBTOR_PORTFOLIO_KEYS = (
+    "cantidad_pagadas_plazo_normal_pagador",
+    "monto_pagadas_plazo_normal_pagador",
+    "cantidad_pagadas_en_mora_pagador",
+    "monto_pagadas_en_mora_pagador",
+    "cantidad_operaciones_activas_pagador",
+    "monto_operaciones_activas_pagador",
+    "cantidad_operaciones_mora_menor_30_pagador",
+    "monto_operaciones_mora_menor_30_pagador",
+    "cantidad_operaciones_mora_mayor_30_pagador",
+    "monto_operaciones_mora_mayor_30_pagador",
+    "cantidad_total_pagador",
+    "monto_total_pagador",
+)
+
+
+class PayloadGenerator:
+    """
+    Deterministic generator of list, details and simulation payloads shaped like Cumplo's Global API responses.
+
+    The same seed always yields the same market, so results are comparable between runs and commits.
+    """
+
+    def __init__(self, size: int = 200, *, seed: int = 0, debtors: int = 2, history: int = 12) -> None:
+        self.size = size
+        self.debtors = debtors
+        self.history = history
+        self.random = random.Random(seed)
+        self.now = datetime(2024, 1, 1, tzinfo=UTC)
+        self.operations = {id_: self._operation(id_) for id_ in range(100_000, 100_000 + size)}
+        self._next_id = 100_000 + size
+
+    def funding_requests(self) -> dict:
+        """Payload of the endpoint that lists the existing funding requests."""
+        return {
+            "data": [
+                {"attributes": {"operacion": operation, "empresa": {"id": operation["id"] + 1}}}
+                for operation in self.operations.values()
+            ]
+        }
+
+    def churn(self, fraction: float) -> None:
+        """
+        Change the listing as the market moves.
+
+        Some funding requests are funded and leave, new ones are listed and some others raise more investments.
+
+        Args:
+            fraction (float): Share of the listing that leaves, and of the one that raises more investments
+
+        """
+        amount = int(len(self.operations) * fraction)
+        for id_funding_request in self.random.sample(sorted(self.operations), k=amount):
+            del self.operations[id_funding_request]
+
+        for id_funding_request in range(self._next_id, self._next_id + amount):
+            self.operations[id_funding_request] = self._operation(id_funding_request)
+        self._next_id += amount
+
+        for id_funding_request in self.random.sample(sorted(self.operations), k=amount):
+            operation = self.operations[id_funding_request]
+            operation["porcentaje_inversion"] = min(operation["porcentaje_inversion"] + self.random.randint(1, 20), 99)
+
+    def details(self, id_funding_request: int) -> dict:
+        """Payload of the endpoint that returns the details of a given funding request."""
+        operation = self.operations[id_funding_request]
+        rng = random.Random(id_funding_request)
+        amount = rng.randrange(5_000_000, 300_000_000, 100_000)
+        raised_amount = amount * operation["porcentaje_inversion"] // 100
+        attributes = {
+            "id_operacion": operation["id"],
+            "score": operation["score"],
+            "tir": operation["tir"],
+            "moneda": operation["moneda"],
+            "plazo": operation["plazo"],
+            "codigo_producto": operation["producto"]["codigo"],
+            "porcentaje_inversion": operation["porcentaje_inversion"],
+            "monto_financiar": amount,
+            "total_inversion": raised_amount,
+            "max_inversion": amount - raised_amount,
+            "cantidad_inversionistas": rng.randint(0, 400),
+            "fecha_vencimiento": (self.now + timedelta(days=rng.randint(30, 360))).strftime("%Y-%m-%d"),
+            "tipo_respaldo": rng.sample(["Factura", "Contrato de obra", "Orden de compra", "Pagaré"], k=2),
+            "vitrina_descripcion_empresa_solicitante": self._description(rng),
+            "vitrina_descripcion_empresa_deudora": self._description(rng),
+            "solicitante": {
+                "nombre_solicitante": f"Empresa Solicitante {id_funding_request} SpA",
+                "giro_detalle": rng.choice(ECONOMIC_SECTORS),
+                "descripcion": self._description(rng),
+                "historial": self._history(rng, BORROWER_PORTFOLIO_KEYS),
+                "fecha_primera_operacion": (self.now - timedelta(days=rng.randint(30, 3000))).isoformat(),
+            },
+            "pagadores": [
+                {
+                    "participacion": round(1 / self.debtors, 4),
+                    "nombre_pagador": f"Pagador {id_funding_request}-{index} S.A.",
+                    "giro_detalle": rng.choice(ECONOMIC_SECTORS),
+                    "descripcion": self._description(rng),
+                    "historial": self._history(rng, DEBTOR_PORTFOLIO_KEYS),
+                    "fecha_primera_operacion": (self.now - timedelta(days=rng.randint(30, 3000))).isoformat(),
+                }
+                for index in range(self.debtors)
+            ],
+        }
+        return {"data": {"attributes": attributes}}
+
+    def simulation(self, payload: dict) -> dict:
+        """Payload of the endpoint that simulates an investment on a given funding request."""
+        data = payload["data"]
+        amount, rate, due_date = data["monto_simulacion"], data["tasa_anual"], data["fecha_vencimiento"]
+        days = data["plazo"] if self.operations[data["id_operacion"]]["plazo"]["type"] == "day" else data["plazo"] * 30
+        interest = amount * ((1 + rate / 100) ** (days / 365) - 1)
+        upfront_fee, exit_fee = amount * 0.003, interest * 0.1
+        attributes = {
+            "ganancia_liquida": interest - upfront_fee - exit_fee,
+            "costos": {
+                "valores": [
+                    {"nombre": "Comisión entrada", "valor": upfront_fee},
+                    {"nombre": "Comisión salida", "valor": exit_fee},
+                ]
+            },
+            "forma_pago": [{"interes": interest, "monto_cuota": amount + interest, "fecha_vencimiento": due_date}],
+        }
+        return {"data": {"attributes": attributes}}
+
+    def _operation(self, id_funding_request: int) -> dict:
+        """Build the list entry of a funding request."""
+        unit = self.random.choice(["day", "month"])
+        return {
+            "id": id_funding_request,
+            "score": round(self.random.uniform(0.3, 1), 2),
+            "tir": round(self.random.uniform(8, 30), 2),
+            "moneda": "CLP",
+            "plazo": {
+                "type": unit,
+                "value": self.random.randint(30, 180) if unit == "day" else self.random.randint(1, 12),
+            },
+            "porcentaje_inversion": self.random.randint(0, 99),
+            "producto": {"codigo": self.random.choice(CREDIT_TYPES)},
+        }
+
+    def _history(self, rng: random.Random, keys: tuple[str, ...]) -> list[dict[str, Any]]:
+        """Build a portfolio history with the given keys."""
+        return [{"tipo": key, "cantidad": rng.randint(0, 5_000_000)} for key in keys[: self.history]]
+
+    @staticmethod
+    def _description(rng: random.Random) -> str:
+        """Build a free-text description like the ones displayed on Cumplo's showcase."""
+        sentences = [*rng.sample(FILLER_SENTENCES, k=3), rng.choice(DICOM_SENTENCES)]
+        rng.shuffle(sentences)
+        return "\n".join(sentences)
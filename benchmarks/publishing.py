@@ -0,0 +1,99 @@
+"""
+Compare publishing every notification synchronously from the handler against the batched, asynchronous publisher.
+
+Every simulated request publishes its notifications to a fake Pub/Sub with a fixed latency per round trip. The time
+each handler spends publishing is measured, along with the throughput until every message is published.
+
+The production transport still takes a round trip per message, so by default the fake charges the latency per message:
+batching takes publishing off the handlers, but the throughput stays bound by the round trips. `--batched-transport`
+charges it once per batch instead, to model a transport that sends a whole batch in a single request.
+
+Usage:
+    python -m benchmarks.publishing --requests 50 --notifications 20 --latency 0.02
+    python -m benchmarks.publishing --batched-transport
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from statistics import mean
+
+from benchmarks.fake_pubsub import FakePubSub
+from cumplo_spotter.integrations.pubsub import BatchPublisher, BatchSettings
+from cumplo_spotter.integrations.pubsub.transport import Message
+
+TOPIC = "funding-request-promising"
+
+
+def notification(id_funding_request: int) -> dict:
+    """Build a notification about a promising funding request with a realistic size."""
+    return {"id": id_funding_request, "irr": 18.5, "score": 0.83, "description": "x" * 600}
+
+
+def measure(
+    name: str, publish: Callable[[dict, str], object], flush: Callable[[], object], args: argparse.Namespace
+) -> None:
+    """Run every simulated request and print the time spent per handler and the overall throughput."""
+    handlers = []
+    start = time.perf_counter()
+
+    for id_request in range(args.requests):
+        handler_start = time.perf_counter()
+        for id_funding_request in range(args.notifications):
+            publish(notification(id_request * args.notifications + id_funding_request), TOPIC)
+        handlers.append(time.perf_counter() - handler_start)
+
+    flush()
+    duration = time.perf_counter() - start
+    messages = args.requests * args.notifications
+    milliseconds = [handler * 1000 for handler in handlers]
+    print(
+        f"{name:<8} handler mean={mean(milliseconds):.2f}ms max={max(milliseconds):.2f}ms "
+        f"total={duration:.2f}s throughput={messages / duration:.0f} msg/s"
+    )
+
+
+def main() -> None:
+    """
+    Run the benchmark.
+
+    Raises:
+        SystemExit: If any message wasn't published
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Amount of simulated handler calls")
+    parser.add_argument("--notifications", type=int, default=20, help="Amount of notifications of every request")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds every request to Pub/Sub takes")
+    parser.add_argument("--max-messages", type=int, default=100, help="Maximum amount of messages of a batch")
+    parser.add_argument("--max-latency", type=float, default=0.05, help="Seconds a message may wait for its batch")
+    parser.add_argument(
+        "--batched-transport", action="store_true", help="Send every batch in a single round trip to Pub/Sub"
+    )
+    args = parser.parse_args()
+    print(
+        f"requests={args.requests} notifications={args.notifications} latency={args.latency}s "
+        f"transport={'batched' if args.batched_transport else 'per-message'}"
+    )
+
+    synchronous = FakePubSub(latency=args.latency)
+    measure(
+        "sync",
+        lambda content, topic: synchronous.publish(topic, [Message(topic=topic, content=content, attributes={})]),
+        lambda: None,
+        args,
+    )
+
+    batched = FakePubSub(latency=args.latency, per_message=not args.batched_transport)
+    settings = BatchSettings(max_messages=args.max_messages, max_latency=args.max_latency)
+    publisher = BatchPublisher(batched, settings)
+    measure("batched", publisher.publish, publisher.close, args)
+    print(f"batched  requests={batched.requests} {publisher.stats()}")
+
+    if batched.published != synchronous.published:
+        print("The batched publisher didn't publish every message")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
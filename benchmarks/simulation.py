@@ -0,0 +1,112 @@
+"""
+Validate the local simulation model against a corpus of simulations answered by Cumplo.
+
+The corpus is a JSON lines file of simulations answered by Cumplo, as recorded by the simulator through
+SIMULATION_CORPUS_PATH. A synthetic corpus would only check the model against the pricing it was generated with, so
+a recorded one is required. The simulations of every product are split in two halves: the model is calibrated on one
+of them and checked on the other, so a product the simulator would cover that doesn't reproduce the simulations it
+wasn't calibrated on fails the validation. Products without enough samples, or whose model doesn't fit within the
+tolerance, are reported as simulated remotely.
+
+Usage:
+    python -m benchmarks.simulation --corpus simulations.jsonl
+    python -m benchmarks.simulation --corpus simulations.jsonl --tolerance 0.001
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from cumplo_spotter.integrations.cumplo.simulator import SimulationSample, calibrate
+from cumplo_spotter.utils.constants import SIMULATION_MIN_SAMPLES, SIMULATION_TOLERANCE
+
+
+def load(path: Path) -> list[dict]:
+    """Read a recorded corpus along with its rotated file, if any, skipping malformed lines."""
+    lines = []
+    for file in (path.with_name(f"{path.name}.1"), path):
+        if file.exists():
+            lines.extend(file.read_text(encoding="utf-8").splitlines())
+
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def validate(records: list[dict], tolerance: float, min_samples: int) -> list[str]:
+    """
+    Calibrate and check the model of every product, printing the results.
+
+    Returns:
+        list[str]: The products whose model is covered but doesn't hold on the simulations it wasn't calibrated on
+
+    """
+    samples: dict[tuple[str, str], list[SimulationSample]] = {}
+    skipped = 0
+    for record in records:
+        try:
+            sample = SimulationSample.parse(record)
+        except (KeyError, TypeError, ValueError):
+            sample = None
+
+        if sample is None:
+            skipped += 1
+            continue
+        samples.setdefault((record["credit_type"], record["currency"]), []).append(sample)
+
+    print(f"records={len(records)} skipped={skipped} products={len(samples)}\n")
+    print(f"{'product':<32} {'samples':>7} {'model':<28} {'upfront':>8} {'exit':>8} {'fit':>10} {'holdout':>10}")
+
+    failures = []
+    for product, product_samples in sorted(samples.items()):
+        name = "/".join(product)
+        if len(product_samples) < 2 * min_samples:
+            print(f"{name:<32} {len(product_samples):>7} remote, not enough samples")
+            continue
+
+        model = calibrate(product_samples[::2])
+        holdout = max(model.error(sample) for sample in product_samples[1::2])
+        description = f"{model.convention}/{model.day_count}/{model.year_days}"
+        print(
+            f"{name:<32} {len(product_samples):>7} {description:<28} {model.upfront_fee_rate:>8.4%} "
+            f"{model.exit_fee_rate:>8.2%} {model.max_error:>10.2e} {holdout:>10.2e}"
+        )
+
+        if model.max_error > tolerance:
+            print(f"{'':<32} remote, the model doesn't fit within the tolerance")
+        elif holdout > tolerance:
+            failures.append(name)
+
+    return failures
+
+
+def main() -> None:
+    """
+    Run the validation.
+
+    Raises:
+        SystemExit: If the corpus is empty or a covered product doesn't reproduce the simulations it wasn't
+            calibrated on
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, required=True, help="Corpus of simulations recorded from Cumplo")
+    parser.add_argument("--tolerance", type=float, default=SIMULATION_TOLERANCE, help="Maximum relative error")
+    parser.add_argument("--min-samples", type=int, default=SIMULATION_MIN_SAMPLES, help="Samples to calibrate from")
+    args = parser.parse_args()
+
+    if not (records := load(args.corpus)):
+        print(f"There are no recorded simulations in {args.corpus}")
+        raise SystemExit(1)
+
+    if failures := validate(records, args.tolerance, args.min_samples):
+        print(f"\nThe model doesn't hold on the simulations it wasn't calibrated on: {', '.join(failures)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
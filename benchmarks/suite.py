@@ -0,0 +1,321 @@
+"""
+Microbenchmark suite of the hot paths of a refresh cycle and of the API, over synthetic Cumplo payloads.
+
+Every case is timed over several rounds and reported in seconds per item. Results are written as JSON along with the
+commit and environment they were measured on, and can be compared against a previous results file, so performance
+regressions show up between commits.
+
+Usage:
+    python -m benchmarks.suite --size 500 --output benchmark-results.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import random
+import subprocess  # noqa: S404
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from itertools import starmap
+from pathlib import Path
+from statistics import mean, median, stdev
+from typing import Any
+
+from benchmarks.fake_upstream import FakeUpstream
+from benchmarks.filtering import random_configuration
+from benchmarks.payloads import PayloadGenerator
+
+
+@dataclass
+class Case:
+    name: str
+    items: int
+    run: Callable[[Any], object]
+    setup: Callable[[], Any] = lambda: None
+
+
+@dataclass
+class Result:
+    name: str
+    items: int
+    rounds: int
+    mean: float
+    median: float
+    best: float
+    stdev: float
+
+
+def measure(case: Case, rounds: int) -> Result:
+    """Run a case once to warm it up and then once per round, timing only the run and not its setup."""
+    case.run(case.setup())
+
+    durations = []
+    for _ in range(rounds):
+        argument = case.setup()
+        start = time.perf_counter()
+        case.run(argument)
+        durations.append((time.perf_counter() - start) / case.items)
+
+    return Result(
+        name=case.name,
+        items=case.items,
+        rounds=rounds,
+        mean=mean(durations),
+        median=median(durations),
+        best=min(durations),
+        stdev=stdev(durations) if rounds > 1 else 0.0,
+    )
+
+
+def build_payloads(generator: PayloadGenerator) -> list[tuple[dict, int | None]]:
+    """Build the payloads the refresh cycle converts, joining the list, details and simulation of every request."""
+    from cumplo_spotter.integrations.cumplo.api_global import CumploGlobalAPI, GlobalFundingRequest
+
+    payloads = []
+    for element in generator.funding_requests()["data"]:
+        attributes = element["attributes"]
+        funding_request = GlobalFundingRequest.model_validate({
+            **attributes["operacion"],
+            "credit_type": attributes["operacion"]["producto"]["codigo"],
+            "id_borrower": attributes["empresa"]["id"],
+        })
+        details = generator.details(funding_request.id)["data"]["attributes"]
+        _, simulation = CumploGlobalAPI.build_simulation(funding_request, details["fecha_vencimiento"])
+        data = {
+            **details,
+            "score": funding_request.score,
+            "simulation": generator.simulation(simulation)["data"]["attributes"],
+        }
+        payloads.append((data, funding_request.id_borrower))
+
+    return payloads
+
+
+def conversion_cases(payloads: list[tuple[dict, int | None]]) -> list[Case]:
+    """Cases of the conversion of the raw payloads into funding requests."""
+    from cumplo_spotter.models.cumplo import CumploFundingRequest
+    from cumplo_spotter.models.cumplo.borrower import BorrowerPortfolio
+    from cumplo_spotter.models.cumplo.debtor import DebtorPortfolio
+    from cumplo_spotter.utils.text import clean_text
+
+    def validate_export(copies: list[tuple[dict, int | None]]) -> None:
+        for data, id_borrower in copies:
+            funding_request = CumploFundingRequest.model_validate(data)
+            funding_request.borrower.id = id_borrower
+            funding_request.export()
+
+    histories = [(BorrowerPortfolio, data["solicitante"]["historial"]) for data, _ in payloads] + [
+        (DebtorPortfolio, debtor["historial"]) for data, _ in payloads for debtor in data["pagadores"]
+    ]
+
+    return [
+        # NOTE: Validating into a CumploFundingRequest modifies the payload, so every round gets its own copy
+        Case("validate_export", len(payloads), validate_export, lambda: copy.deepcopy(payloads)),
+        Case("convert", len(payloads), lambda _: list(starmap(CumploFundingRequest.convert, payloads))),
+        Case(
+            "format_portfolio_data",
+            len(histories),
+            lambda _: [portfolio._format_portfolio_data(history) for portfolio, history in histories],  # noqa: SLF001
+        ),
+        Case(
+            "identify_dicom_status_cold",
+            len(payloads),
+            lambda _: [CumploFundingRequest._identify_dicom_status(data) for data, _ in payloads],  # noqa: SLF001
+            clean_text.cache_clear,
+        ),
+        Case(
+            "identify_dicom_status_warm",
+            len(payloads),
+            lambda _: [CumploFundingRequest._identify_dicom_status(data) for data, _ in payloads],  # noqa: SLF001
+        ),
+    ]
+
+
+def filtering_cases(funding_requests: list, configurations: int, seed: int) -> list[Case]:
+    """Cases of the evaluation of many filter configurations over the funding requests."""
+    from cumplo_common.models import FilterConfiguration
+
+    from cumplo_spotter.business import filters
+    from cumplo_spotter.business.funding_requests import filter_, filter_any
+
+    generator = random.Random(seed)
+    configurations_ = [
+        FilterConfiguration.model_validate(random_configuration(generator, index)) for index in range(configurations)
+    ]
+
+    return [
+        Case(
+            "filter_per_configuration",
+            len(configurations_),
+            lambda _: [filter_(funding_requests, configuration) for configuration in configurations_],
+        ),
+        Case(
+            "filter_any_configuration",
+            len(configurations_),
+            lambda _: filter_any(funding_requests, configurations_),
+            filters.results.clear,
+        ),
+    ]
+
+
+def serialization_cases(funding_requests: list) -> list[Case]:
+    """Cases of the serialization of a snapshot of the funding requests."""
+    from cumplo_spotter.models.snapshot import Snapshot
+
+    def fresh() -> Snapshot:
+        return Snapshot(version=time.time_ns(), funding_requests=tuple(funding_requests))
+
+    def page(snapshot: Snapshot) -> None:
+        cursor = None
+        while True:
+            ids, cursor = snapshot.page("-irr", 100, cursor)
+            snapshot.project(ids, ("id", "irr", "score", "monthly_profit_rate"))
+            if cursor is None:
+                return
+
+    def paged() -> Snapshot:
+        snapshot = fresh()
+        _ = snapshot.payloads, snapshot.orders
+        return snapshot
+
+    return [
+        Case("serialize_snapshot", len(funding_requests), lambda snapshot: snapshot.serialized_list, fresh),
+        Case("page_and_project", len(funding_requests), page, paged),
+    ]
+
+
+def router_cases(size: int) -> list[Case]:
+    """Cases of whole requests to the public router, over the snapshot cached by the application."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from cumplo_spotter.routers.funding_requests import public
+
+    app = FastAPI()
+    app.include_router(public.router)
+    client = TestClient(app)
+    etag = client.get("/funding-requests").headers["ETag"]
+
+    return [
+        Case("router_list", size, lambda _: client.get("/funding-requests")),
+        Case("router_list_not_modified", 1, lambda _: client.get("/funding-requests", headers={"If-None-Match": etag})),
+        Case("router_page", 100, lambda _: client.get("/funding-requests?limit=100&sort=-irr&fields=id,irr,score")),
+    ]
+
+
+def metadata(args: argparse.Namespace) -> dict:
+    """Describe the commit, environment and parameters the results were measured with."""
+
+    def git(*command: str) -> str | None:
+        try:
+            process = subprocess.run(  # noqa: S603
+                ["git", *command],  # noqa: S607
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=Path(__file__).parent,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return process.stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": {"size": args.size, "configurations": args.configurations, "rounds": args.rounds},
+    }
+
+
+def compare(results: list[Result], path: Path, threshold: float) -> list[str]:
+    """
+    Print how every result compares against the same case of a previous results file.
+
+    Returns:
+        list[str]: The names of the cases that got slower than the threshold allows
+
+    """
+    baseline = {result["name"]: result for result in json.loads(path.read_text())["results"]}
+    print(f"\nagainst {path} ({json.loads(path.read_text())['metadata']['commit']})")
+
+    regressions = []
+    for result in results:
+        if (previous := baseline.get(result.name)) is None:
+            continue
+
+        ratio = result.median / previous["median"] - 1
+        flag = " REGRESSION" if ratio > threshold else ""
+        print(f"{result.name:<28} {ratio:+7.1%}{flag}")
+        if flag:
+            regressions.append(result.name)
+
+    return regressions
+
+
+def main() -> None:
+    """
+    Run the suite.
+
+    Raises:
+        SystemExit: If any case got slower than the threshold allows when comparing against a previous run
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=500, help="Amount of listed funding requests")
+    parser.add_argument("--configurations", type=int, default=200, help="Amount of filter configurations")
+    parser.add_argument("--rounds", type=int, default=5, help="Amount of timed rounds of every case")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated payloads and configurations")
+    parser.add_argument("--only", nargs="*", default=None, help="Names of the cases to run")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"), help="Results file")
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    # NOTE: Logging every conversion and evaluation would dominate the timings
+    logging.disable(logging.INFO)
+    generator = PayloadGenerator(args.size, seed=args.seed)
+
+    with FakeUpstream(generator, latency=0) as upstream:
+        os.environ.update(upstream.environment)
+
+        # NOTE: The constants are read at import time, so the application must be imported after pointing it upstream
+        from cumplo_spotter.integrations import cumplo
+
+        funding_requests = list(cumplo.cache.refresh().funding_requests)
+
+    cases = [
+        *conversion_cases(build_payloads(generator)),
+        *filtering_cases(funding_requests, args.configurations, args.seed),
+        *serialization_cases(funding_requests),
+        *router_cases(len(funding_requests)),
+    ]
+
+    results = []
+    print(f"funding_requests={len(funding_requests)} configurations={args.configurations} rounds={args.rounds}")
+    for case in cases:
+        if args.only is not None and case.name not in args.only:
+            continue
+
+        results.append(result := measure(case, args.rounds))
+        print(f"{result.name:<28} median={result.median * 1e6:>10.1f}us best={result.best * 1e6:>10.1f}us per item")
+
+    report = {"metadata": metadata(args), "results": [asdict(result) for result in results]}
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"\nwrote {args.output}")
+
+    if args.compare is not None and (regressions := compare(results, args.compare, args.threshold)):
+        print(f"Regressions: {', '.join(regressions)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import fcntl
+import hashlib
+import json
+import os
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from cachetools import LRUCache
+from cumplo_common.models import FundingRequest
+
+from cumplo_spotter.models.events import FundingRequestEvent, FundingRequestEventType, FundingRequestUpdate
+from cumplo_spotter.utils.constants import CACHE_MAXSIZE, EVENTS_SNAPSHOT_INTERVAL, SHARED_SNAPSHOT_PATH
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class PublishedState:
+    version: int
+    funding_requests: dict[int, dict]
+    deltas: int = 0
+
+
+class FundingRequestEventTracker:
+    """
+    Keep the last published funding requests of every user to emit only what changed since then.
+
+    Versions are nanosecond timestamps, so they keep increasing across processes and restarts. Every delta references
+    the version it was computed against, which lets consumers detect a gap and wait for the next snapshot.
+    """
+
+    def __init__(self, snapshot_interval: int = EVENTS_SNAPSHOT_INTERVAL, maxsize: int = CACHE_MAXSIZE) -> None:
+        self.snapshot_interval = snapshot_interval
+        self._states: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = Lock()
+
+    def track(self, id_user: str, funding_requests: Sequence[FundingRequest]) -> FundingRequestEvent | None:
+        """
+        Build the event that takes the given user from its last published funding requests to the given ones.
+
+        Args:
+            id_user (str): The ID of the user the event is published to
+            funding_requests (Sequence[FundingRequest]): The currently available funding requests
+
+        Returns:
+            FundingRequestEvent | None: The event to publish or None if nothing changed
+
+        """
+        current = {funding_request.id: funding_request.json() for funding_request in funding_requests}
+
+        with self._locked(id_user):
+            previous = self._read(id_user)
+            version = max(time.time_ns(), previous.version + 1) if previous else time.time_ns()
+
+            if previous is None or previous.deltas + 1 >= self.snapshot_interval:
+                event = FundingRequestEvent(
+                    type=FundingRequestEventType.SNAPSHOT, version=version, added=list(current.values())
+                )
+                self._write(id_user, PublishedState(version, current))
+                return event
+
+            event = self._diff(previous, current, version)
+            if event.is_empty:
+                logger.info(f"No changes in the available funding requests for user {id_user}")
+                return None
+
+            self._write(id_user, PublishedState(version, current, previous.deltas + 1))
+            return event
+
+    def reset(self, id_user: str | None = None) -> None:
+        """
+        Forget the published funding requests, so the next event is a snapshot.
+
+        Args:
+            id_user (str | None): The ID of the user to reset. Resets every user if not given.
+
+        """
+        with self._lock:
+            if id_user is None:
+                self._states.clear()
+            else:
+                self._states.pop(id_user, None)
+
+    def _locked(self, id_user: str) -> AbstractContextManager[Any]:  # noqa: ARG002
+        """Get the lock that serializes the events of the given user."""
+        return self._lock
+
+    def _read(self, id_user: str) -> PublishedState | None:
+        """Get the last published funding requests of the given user, if any."""
+        return self._states.get(id_user)
+
+    def _write(self, id_user: str, state: PublishedState) -> None:
+        """Keep the published funding requests of the given user."""
+        self._states[id_user] = state
+
+    @staticmethod
+    def _diff(previous: PublishedState, current: dict[int, dict], version: int) -> FundingRequestEvent:
+        """Build the delta between the previously published funding requests and the current ones."""
+        event = FundingRequestEvent(type=FundingRequestEventType.DELTA, version=version, base_version=previous.version)
+
+        for id_funding_request, funding_request in current.items():
+            if (old := previous.funding_requests.get(id_funding_request)) is None:
+                event.added.append(funding_request)
+                continue
+
+            changes = {key: value for key, value in funding_request.items() if old.get(key) != value}
+            changes.update(dict.fromkeys(old.keys() - funding_request.keys()))
+            if changes:
+                event.updated.append(FundingRequestUpdate(id=id_funding_request, changes=changes))
+
+        event.removed = [id_ for id_ in previous.funding_requests if id_ not in current]
+        return event
+
+
+class SharedFundingRequestEventTracker(FundingRequestEventTracker):
+    """
+    Event tracker whose published states are shared by every worker of the host through a directory.
+
+    Consecutive fetches of a user are usually answered by different workers, so each one keeping its own state would
+    break the chain of base versions. Instead, the state of every user is kept in a file of its own, locked while an
+    event is built, so every delta references the last event published to that user by any worker.
+    """
+
+    def __init__(self, directory: str, **kwargs: int) -> None:
+        super().__init__(**kwargs)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def reset(self, id_user: str | None = None) -> None:
+        """
+        Forget the published funding requests, so the next event is a snapshot.
+
+        Args:
+            id_user (str | None): The ID of the user to reset. Resets every user if not given.
+
+        """
+        paths = self.directory.glob("*.json") if id_user is None else [self._path(id_user)]
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    @contextmanager
+    def _locked(self, id_user: str) -> Iterator[None]:
+        """Hold the lock file of the given user, so no other worker builds an event for it meanwhile."""
+        with self._lock, self._path(id_user).with_suffix(".lock").open("wb") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, id_user: str) -> PublishedState | None:
+        """Read the last published funding requests of the given user, if any."""
+        try:
+            data = json.loads(self._path(id_user).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.exception(f"Failed to read the published state of user {id_user}, starting over from a snapshot")
+            return None
+
+        # NOTE: JSON object keys are strings, while funding requests are identified by integers
+        funding_requests = {int(id_): payload for id_, payload in data["funding_requests"].items()}
+        return PublishedState(data["version"], funding_requests, data["deltas"])
+
+    def _write(self, id_user: str, state: PublishedState) -> None:
+        """Atomically replace the published funding requests of the given user."""
+        path = self._path(id_user)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(asdict(state)), encoding="utf-8")
+        temporary.replace(path)
+
+    def _path(self, id_user: str) -> Path:
+        """Get the file of the published state of the given user, named after a digest of its ID."""
+        return self.directory / f"{hashlib.sha256(id_user.encode()).hexdigest()}.json"
+
+
+# NOTE: Published states are shared along with the snapshot, so every worker continues the same chain of versions
+tracker = (
+    SharedFundingRequestEventTracker(f"{SHARED_SNAPSHOT_PATH}.events")
+    if SHARED_SNAPSHOT_PATH
+    else FundingRequestEventTracker()
+)
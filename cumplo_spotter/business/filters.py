@@ -0,0 +1,228 @@
+import json
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal, InvalidOperation
+from logging import getLogger
+from threading import Lock
+from typing import Any
+
+from cumplo_common.models import FilterConfiguration
+
+from cumplo_spotter.models.filter_plan import FilterResult
+from cumplo_spotter.utils.constants import FILTER_REJECTION_MAX_CONFIGURATIONS
+from cumplo_spotter.utils.metrics import registry
+
+logger = getLogger(__name__)
+
+EVALUATIONS = registry.counter("spotter_filter_evaluations_total", "Filter configurations evaluated")
+EVALUATED_FUNDING_REQUESTS = registry.counter(
+    "spotter_filter_evaluated_funding_requests_total", "Funding requests the filter configurations were evaluated over"
+)
+RESULT_LOOKUPS = registry.counter(
+    "spotter_filter_cache_lookups_total", "Lookups of the filter results cache, by hit or miss", ("result",)
+)
+
+# NOTE: Fields that only identify a filter configuration and don't change its results
+IDENTITY_FIELDS = {"id", "name"}
+
+
+@dataclass
+class FilterResultStatistics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class FilterResultCache:
+    """
+    Cache of the results of every filter configuration evaluated over the current snapshot.
+
+    Configurations are keyed by their filtering fields only, so users sharing the same filter, even under different
+    names, pay a dictionary lookup instead of an evaluation. Results are dropped as soon as a newer snapshot shows up.
+    """
+
+    def __init__(self) -> None:
+        self.statistics = FilterResultStatistics()
+        self._version: int | None = None
+        self._results: dict[str, FilterResult] = {}
+        self._lock = Lock()
+
+    def get(
+        self, version: int, configuration: FilterConfiguration, evaluate: Callable[[], FilterResult]
+    ) -> FilterResult:
+        """
+        Get the result of the given configuration over the given snapshot, evaluating it on a miss.
+
+        Args:
+            version (int): The version of the snapshot the configuration is evaluated over
+            configuration (FilterConfiguration): The filter configuration
+            evaluate (Callable[[], FilterResult]): Evaluates the configuration over the snapshot
+
+        Returns:
+            FilterResult: The funding requests of the snapshot that satisfy the configuration
+
+        """
+        key = self.key(configuration)
+
+        with self._lock:
+            if version == self._version and (result := self._results.get(key)) is not None:
+                self.statistics.hits += 1
+                RESULT_LOOKUPS.inc(result="hits")
+                return result
+
+            self.statistics.misses += 1
+            RESULT_LOOKUPS.inc(result="misses")
+
+        result = evaluate()
+
+        with self._lock:
+            if self._version is None or version > self._version:
+                self.statistics.evictions += len(self._results)
+                self._version, self._results = version, {}
+
+            if version == self._version:
+                self._results[key] = result
+
+        return result
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            self._version, self._results = None, {}
+
+    def stats(self) -> dict:
+        """Export the cache counters along with the share of evaluations that were avoided."""
+        with self._lock:
+            statistics, entries, version = asdict(self.statistics), len(self._results), self._version
+
+        lookups = statistics["hits"] + statistics["misses"]
+        return {
+            **statistics,
+            "entries": entries,
+            "version": version,
+            "hit_rate": statistics["hits"] / lookups if lookups else None,
+        }
+
+    @staticmethod
+    def key(configuration: FilterConfiguration) -> str:
+        """
+        Build the canonical key of the given configuration.
+
+        Args:
+            configuration (FilterConfiguration): The filter configuration
+
+        Returns:
+            str: The configuration serialized without the fields that only identify it
+
+        """
+        # NOTE: Dumped in JSON mode, so every value of the configuration can be serialized, whatever its type
+        return json.dumps(_canonical(configuration.model_dump(mode="json", exclude=IDENTITY_FIELDS)), sort_keys=True)
+
+
+def _canonical(value: Any) -> Any:
+    """
+    Normalize a dumped filter configuration, so equivalent configurations serialize the same way.
+
+    Every list of a configuration is set-like, as its filters are all applied regardless of their order, so lists are
+    sorted and deduplicated. Decimals, which are dumped as strings, are written without their exponent nor trailing
+    zeros.
+
+    Args:
+        value (Any): The dumped configuration or any of its values
+
+    Returns:
+        Any: The normalized value, ready to be serialized
+
+    """
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+
+    if isinstance(value, list | tuple | set | frozenset):
+        items = {json.dumps(item, sort_keys=True): item for item in map(_canonical, value)}
+        return [items[key] for key in sorted(items)]
+
+    if isinstance(value, str):
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            return value
+        return format(number.normalize(), "f") if number.is_finite() else value
+
+    return value
+
+
+@dataclass
+class ConfigurationRejections:
+    name: str | None
+    evaluations: int = 0
+    evaluated: int = 0
+    kept: int = 0
+    rejected: Counter[str] = field(default_factory=Counter)
+
+
+class FilterRejectionStatistics:
+    """
+    In-memory counters of the funding requests rejected by each filter, overall and per filter configuration.
+
+    They replace logging every rejected funding request: each evaluation only adds up the already computed masks.
+    Only the most recently evaluated configurations are kept, so churning configurations don't grow them for good.
+    """
+
+    def __init__(self, max_configurations: int = FILTER_REJECTION_MAX_CONFIGURATIONS) -> None:
+        self.max_configurations = max_configurations
+        self.evicted = 0
+        self._filters: Counter[str] = Counter()
+        self._configurations: dict[str, ConfigurationRejections] = {}
+        self._lock = Lock()
+
+    def record(self, configuration: FilterConfiguration, result: FilterResult, evaluated: int) -> None:
+        """
+        Add the rejections of the given evaluation to the counters.
+
+        Args:
+            configuration (FilterConfiguration): The evaluated filter configuration
+            result (FilterResult): The result of the evaluation
+            evaluated (int): The amount of funding requests the configuration was evaluated over
+
+        """
+        rejected = result.rejected
+
+        with self._lock:
+            self._filters.update(rejected)
+            # NOTE: Configurations are reinserted on every evaluation, so the first one is the least recently evaluated
+            key = str(configuration.id)
+            counters = self._configurations.pop(key, None) or ConfigurationRejections(name=configuration.name)
+            self._configurations[key] = counters
+            if len(self._configurations) > self.max_configurations:
+                del self._configurations[next(iter(self._configurations))]
+                self.evicted += 1
+
+            counters.name = configuration.name
+            counters.evaluations += 1
+            counters.evaluated += evaluated
+            counters.kept += result.mask.bit_count()
+            counters.rejected.update(rejected)
+
+    def reset(self) -> None:
+        """Reset every counter."""
+        with self._lock:
+            self._filters.clear()
+            self._configurations.clear()
+            self.evicted = 0
+
+    def stats(self) -> dict:
+        """Export the rejections by filter and by filter configuration."""
+        with self._lock:
+            return {
+                "filters": dict(self._filters.most_common()),
+                "evicted_configurations": self.evicted,
+                "configurations": {
+                    id_configuration: {**asdict(counters), "rejected": dict(counters.rejected.most_common())}
+                    for id_configuration, counters in self._configurations.items()
+                },
+            }
+
+
+results = FilterResultCache()
+rejections = FilterRejectionStatistics()
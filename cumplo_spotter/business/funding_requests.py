@@ -1,55 +1,122 @@
-from logging import getLogger
+import random
+from collections import Counter
+from collections.abc import Generator, Iterable
+from logging import DEBUG, getLogger
 
 from cumplo_common.models import FilterConfiguration, FundingRequest, User
 
+from cumplo_spotter.business.filters import EVALUATED_FUNDING_REQUESTS, EVALUATIONS, rejections, results
 from cumplo_spotter.integrations import cumplo
-from cumplo_spotter.models.filter import (
-    CreditTypeFilter,
-    DicomFilter,
-    MaximumDurationFilter,
-    MinimumAmountFilter,
-    MinimumDurationFilter,
-    MinimumInvestmentFilter,
-    MinimumIRRFilter,
-    MinimumMonthlyProfitFilter,
-    MinimumScoreFilter,
-    PortfolioFilter,
-)
+from cumplo_spotter.models.filter_plan import FilterPlan, FilterResult, FundingRequestColumns
+from cumplo_spotter.models.snapshot import Snapshot
+from cumplo_spotter.utils.constants import FILTER_REJECTION_SAMPLE, FILTER_TRACE_SAMPLE_RATE
+from cumplo_spotter.utils.timing import phase
 
 logger = getLogger(__name__)
 
 
-def get_available() -> list[FundingRequest]:
+def get_snapshot() -> Snapshot:
     """
-    Get a list of available funding requests sorted by monthly profit rate.
+    Get the snapshot of the available funding requests.
 
     Returns:
-        list[dict]: List of available funding requests
+        Snapshot: The snapshot of the available funding requests
 
     """
-    funding_requests = cumplo.get_available_funding_requests()
-    funding_requests.sort(key=lambda x: x.monthly_profit_rate, reverse=True)
-    return funding_requests
+    return cumplo.get_snapshot()
 
 
-def get_promising(user: User) -> list[FundingRequest]:
+def get_available(snapshot: Snapshot | None = None) -> tuple[FundingRequest, ...]:
+    """
+    Get the available funding requests sorted by monthly profit rate.
+
+    Args:
+        snapshot (Snapshot | None): Snapshot to read from. Defaults to the cached one.
+
+    Returns:
+        tuple[FundingRequest, ...]: The available funding requests
+
+    """
+    snapshot = snapshot or cumplo.get_snapshot()
+    return snapshot.by_profit
+
+
+def stream_available() -> Generator[FundingRequest, None, Snapshot]:
+    """
+    Iterate over the available funding requests without waiting for the whole snapshot to be refreshed.
+
+    Yields:
+        FundingRequest: The available funding requests, sorted by monthly profit rate unless the cache is cold, in
+            which case they are yielded as soon as each one is hydrated
+
+    Returns:
+        Snapshot: The snapshot the funding requests were streamed from
+
+    """
+    return (yield from cumplo.stream_available_funding_requests())
+
+
+def get_by_ids(ids: Iterable[int], snapshot: Snapshot | None = None) -> list[FundingRequest]:
+    """
+    Get the available funding requests with the given IDs, skipping the ones that aren't available.
+
+    Args:
+        ids (Iterable[int]): IDs of the funding requests, in the order they should be returned
+        snapshot (Snapshot | None): Snapshot to read from. Defaults to the cached one.
+
+    Returns:
+        list[FundingRequest]: The available funding requests, without duplicates
+
+    """
+    snapshot = snapshot or cumplo.get_snapshot()
+    return [snapshot.index[id_] for id_ in dict.fromkeys(ids) if id_ in snapshot.index]
+
+
+def get_promising(user: User, snapshot: Snapshot | None = None) -> list[FundingRequest]:
     """
     Get a list of promising funding requests based on the user's configuration sorted by monthly profit rate.
 
     Args:
         user (User): User to get the configuration from
+        snapshot (Snapshot | None): Snapshot to read from. Defaults to the cached one.
 
     Returns:
         list[FundingRequest]: List of promising funding requests
 
     """
-    funding_requests = cumplo.get_available_funding_requests()
+    snapshot = snapshot or cumplo.get_snapshot()
+    promising_requests = _filter_any(snapshot.columns, user.filters.values(), snapshot.version)
+    return sorted(promising_requests, key=lambda x: x.monthly_profit_rate, reverse=True)
 
-    promising_requests = set()
-    for configuration in user.filters.values():
-        promising_requests.update(filter_(funding_requests, configuration))
 
-    return sorted(promising_requests, key=lambda x: x.monthly_profit_rate, reverse=True)
+def get_promising_batch(users: Iterable[User], snapshot: Snapshot | None = None) -> dict[str, list[FundingRequest]]:
+    """
+    Get the promising funding requests of many users at once sorted by monthly profit rate.
+
+    Every distinct configuration is evaluated once over the indexed columns of the snapshot, no matter how many users
+    share it, so the cost grows with the snapshot size rather than with users times filters.
+
+    Args:
+        users (Iterable[User]): Users to get the configurations from
+        snapshot (Snapshot | None): Snapshot to read from. Defaults to the cached one.
+
+    Returns:
+        dict[str, list[FundingRequest]]: Promising funding requests by user ID
+
+    """
+    snapshot = snapshot or cumplo.get_snapshot()
+    columns = snapshot.columns
+    promising = {}
+
+    for user in users:
+        mask = 0
+        for configuration in user.filters.values():
+            mask |= _evaluate(columns, configuration, snapshot.version).mask
+
+        promising[str(user.id)] = sorted(columns.select(mask), key=lambda x: x.monthly_profit_rate, reverse=True)
+
+    logger.info(f"Evaluated the filters of {len(promising)} users over snapshot {snapshot.version}")
+    return promising
 
 
 def filter_(funding_requests: list[FundingRequest], configuration: FilterConfiguration) -> list[FundingRequest]:
@@ -64,21 +131,67 @@ def filter_(funding_requests: list[FundingRequest], configuration: FilterConfigu
         list[FundingRequest]: Filtered funding requests
 
     """
-    filters = [
-        MinimumAmountFilter(configuration),
-        CreditTypeFilter(configuration),
-        MinimumInvestmentFilter(configuration),
-        MinimumScoreFilter(configuration),
-        MinimumIRRFilter(configuration),
-        MinimumMonthlyProfitFilter(configuration),
-        DicomFilter(configuration),
-        MinimumDurationFilter(configuration),
-        MaximumDurationFilter(configuration),
-        PortfolioFilter(configuration),
-    ]
-
-    logger.info(f"Applying {len(filters)} filters to {len(funding_requests)} funding requests")
-    funding_requests = list(filter(lambda x: all(f.apply(x) for f in filters), funding_requests))
-
-    logger.info(f"Got {len(funding_requests)} funding requests after applying filter {configuration.name}")
-    return funding_requests
+    return _filter_any(FundingRequestColumns(funding_requests), [configuration])
+
+
+def filter_any(
+    funding_requests: list[FundingRequest],
+    configurations: Iterable[FilterConfiguration],
+) -> list[FundingRequest]:
+    """
+    Filter a list of funding requests keeping the ones that satisfy any of the given filters.
+
+    Args:
+        funding_requests (list[FundingRequest]): List of funding requests
+        configurations (Iterable[FilterConfiguration]): User's filters
+
+    Returns:
+        list[FundingRequest]: Filtered funding requests, without duplicates
+
+    """
+    return _filter_any(FundingRequestColumns(list(dict.fromkeys(funding_requests))), configurations)
+
+
+def _filter_any(
+    columns: FundingRequestColumns,
+    configurations: Iterable[FilterConfiguration],
+    version: int | None = None,
+) -> list[FundingRequest]:
+    """Evaluate every filter over the given columns and merge their results."""
+    mask, evaluated, rejected = 0, 0, Counter[str]()
+    with phase("filter"):
+        for configuration in configurations:
+            result = _evaluate(columns, configuration, version)
+            mask |= result.mask
+            evaluated += 1
+            rejected.update(result.rejected)
+
+    logger.info(
+        f"Kept {mask.bit_count()} of {len(columns)} funding requests after applying {evaluated} filters, "
+        f"rejections: {dict(rejected.most_common())}"
+    )
+    return columns.select(mask)
+
+
+def _evaluate(columns: FundingRequestColumns, configuration: FilterConfiguration, version: int | None) -> FilterResult:
+    """Evaluate the compiled plan of the filter, reusing its result when the columns belong to a snapshot."""
+    if version is None:
+        result = FilterPlan.compile(configuration).evaluate(columns)
+    else:
+        result = results.get(version, configuration, lambda: FilterPlan.compile(configuration).evaluate(columns))
+
+    rejections.record(configuration, result, len(columns))
+    EVALUATIONS.inc()
+    EVALUATED_FUNDING_REQUESTS.inc(len(columns))
+
+    # NOTE: Tracing every evaluation would log a line per configuration and filter, so only a sample of them is traced
+    if random.random() < FILTER_TRACE_SAMPLE_RATE and logger.isEnabledFor(DEBUG):  # noqa: S311
+        _trace_rejections(columns, configuration, result)
+    return result
+
+
+def _trace_rejections(columns: FundingRequestColumns, configuration: FilterConfiguration, result: FilterResult) -> None:
+    """Log a sample of the funding requests rejected by each filter of the configuration."""
+    for name, mask in result.rejections.items():
+        sample = [funding_request.id for funding_request in columns.select(mask)[:FILTER_REJECTION_SAMPLE]]
+        logger.debug(f"'{configuration.name}' {name} rejected {mask.bit_count()} funding requests, e.g. {sample}")
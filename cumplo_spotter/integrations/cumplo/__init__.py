@@ -1 +1,33 @@
-from cumplo_spotter.integrations.cumplo.controller import cache, get_available_funding_requests
+from importlib import import_module
+from typing import Any
+
+from cumplo_spotter.integrations.cumplo.controller import (
+    cache,
+    get_available_funding_requests,
+    get_snapshot,
+    scheduler,
+    stream_available_funding_requests,
+)
+
+# NOTE: The HTML and GraphQL APIs aren't used while serving requests, so they're only imported when first accessed
+LAZY_ATTRIBUTES = {
+    "CumploHTMLAPI": "cumplo_spotter.integrations.cumplo.api_html",
+    "CumploGraphQLAPI": "cumplo_spotter.integrations.cumplo.api_graphql",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the integrations that are loaded lazily when they're first accessed.
+
+    Raises:
+        AttributeError: If the package has no such attribute
+
+    """
+    if (module := LAZY_ATTRIBUTES.get(name)) is None:
+        message = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(message)
+
+    attribute = getattr(import_module(module), name)
+    globals()[name] = attribute
+    return attribute
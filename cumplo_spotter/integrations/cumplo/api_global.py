@@ -1,14 +1,16 @@
+import time
 from decimal import Decimal
 from functools import cached_property
-from http import HTTPMethod
+from http import HTTPMethod, HTTPStatus
 from logging import getLogger
 from typing import Any
 
 import requests
 from cumplo_common.models import Currency
 from pydantic import BaseModel, Field, field_validator
-from retry import retry
 
+from cumplo_spotter.integrations.cumplo.exceptions import UpstreamUnavailableError
+from cumplo_spotter.integrations.cumplo.governor import check_status, governor
 from cumplo_spotter.models.cumplo.funding_request import CumploCreditType
 from cumplo_spotter.models.cumplo.request_duration import CumploFundingRequestDuration
 from cumplo_spotter.utils.constants import (
@@ -16,11 +18,65 @@ from cumplo_spotter.utils.constants import (
     CUMPLO_GLOBAL_API_DETAILS,
     CUMPLO_GLOBAL_API_FUNDING_REQUESTS,
     CUMPLO_GLOBAL_API_SIMULATION,
+    CUMPLO_TIMEOUT,
     SIMULATION_AMOUNT,
 )
+from cumplo_spotter.utils.metrics import registry
 
 logger = getLogger(__name__)
 
+REQUEST_SECONDS = registry.histogram(
+    "spotter_upstream_request_duration_seconds",
+    "Latency of the requests to Cumplo's Global API, by operation and status code or error",
+    ("operation", "status"),
+)
+RESPONSE_BYTES = registry.counter(
+    "spotter_upstream_response_bytes_total", "Bytes received from Cumplo's Global API, by operation", ("operation",)
+)
+VALIDATION_FAILURES = registry.counter(
+    "spotter_validation_failures_total",
+    "Responses of Cumplo's Global API that couldn't be decoded and funding requests that couldn't be converted",
+    ("stage",),
+)
+
+
+def record_request(operation: str, started_at: float, status: int | str, size: int = 0) -> None:
+    """
+    Record the latency and size of a request to Cumplo's Global API.
+
+    Args:
+        operation (str): The operation requested, such as `list`, `details` or `simulation`
+        started_at (float): The performance counter when the request was sent
+        status (int | str): The status code of the response, or the name of the error that prevented it
+        size (int): The amount of bytes received
+
+    """
+    REQUEST_SECONDS.observe(time.perf_counter() - started_at, operation=operation, status=status)
+    RESPONSE_BYTES.inc(size, operation=operation)
+
+
+def extract_data(body: Any, operation: str) -> Any:
+    """
+    Get the data of a response body of Cumplo's Global API.
+
+    Args:
+        body (Any): The decoded response body
+        operation (str): The operation requested, such as `list`, `details` or `simulation`
+
+    Raises:
+        UpstreamUnavailableError: If the body has no data, which Cumplo answers along with some transient errors
+
+    Returns:
+        Any: The data of the response
+
+    """
+    try:
+        return body["data"]
+    except (KeyError, TypeError) as error:
+        VALIDATION_FAILURES.inc(stage=operation)
+        # NOTE: Bodies without data are retried like any other transient error of Cumplo
+        raise UpstreamUnavailableError(HTTPStatus.BAD_GATEWAY) from error
+
 
 class GlobalFundingRequest(BaseModel):
     id: int = Field(...)
@@ -31,6 +87,7 @@ class GlobalFundingRequest(BaseModel):
     raised_percentage: Decimal = Field(..., alias="porcentaje_inversion")
     credit_type: CumploCreditType = Field(...)
     id_borrower: int | None = Field(None)
+    payload: dict = Field(default_factory=dict, exclude=True, repr=False)
 
     @field_validator("raised_percentage", mode="before")
     @classmethod
@@ -50,23 +107,42 @@ class CumploGlobalAPI:
     url = CUMPLO_GLOBAL_API
 
     @classmethod
-    def _request(cls, method: HTTPMethod, endpoint: str, payload: dict | None = None) -> requests.Response:
+    def _request(cls, method: HTTPMethod, endpoint: str, operation: str, payload: dict | None = None) -> dict:
         """
-        Make a request to Cumplo's Global API.
+        Make a request to Cumplo's Global API and decode its response.
 
         Args:
             method (HTTPMethod): HTTP method to use
             endpoint (str): Endpoint to call
+            operation (str): Name of the operation the request is recorded under
             payload (dict): Payload to send
 
         Returns:
-            requests.Response: Response from the API
+            dict: Decoded body of the response
+
+        Raises:
+            RequestException: If the request couldn't be sent or its response received
+            ValueError: If the response couldn't be decoded
 
         """
-        return requests.request(method=method, url=f"{cls.url}{endpoint}", json=payload)
+        started_at = time.perf_counter()
+        try:
+            response = requests.request(method=method, url=f"{cls.url}{endpoint}", json=payload, timeout=CUMPLO_TIMEOUT)
+        except requests.exceptions.RequestException as error:
+            record_request(operation, started_at, type(error).__name__)
+            raise
+
+        record_request(operation, started_at, response.status_code, len(response.content))
+        check_status(response.status_code, response.headers)
+
+        try:
+            return response.json()
+        except ValueError:
+            VALIDATION_FAILURES.inc(stage=operation)
+            raise
 
     @classmethod
-    @retry(requests.exceptions.JSONDecodeError, tries=5, delay=1)
+    @governor.governed
     def get_funding_request(cls, id_funding_request: int) -> dict:
         """
         Query the Cumplo's Global API for the given funding request information.
@@ -80,11 +156,11 @@ class CumploGlobalAPI:
         """
         logger.debug(f"Getting funding request {id_funding_request} from Cumplo's Global API")
         endpoint = CUMPLO_GLOBAL_API_DETAILS.format(id_funding_request=id_funding_request)
-        response = cls._request(HTTPMethod.GET, endpoint)
-        return response.json()["data"]["attributes"]
+        body = cls._request(HTTPMethod.GET, endpoint, "details")
+        return extract_data(body, "details")["attributes"]
 
     @classmethod
-    @retry(requests.exceptions.JSONDecodeError, tries=5, delay=1)
+    @governor.governed
     def simulate_funding_request(cls, funding_request: GlobalFundingRequest, due_date: str) -> dict:
         """
         Request the Cumplo's Global API to simulate the funding request.
@@ -97,6 +173,23 @@ class CumploGlobalAPI:
 
         """
         logger.debug(f"Simulating funding request {funding_request.id} from Cumplo's Global API")
+        endpoint, payload = cls.build_simulation(funding_request, due_date)
+        body = cls._request(HTTPMethod.POST, endpoint, "simulation", payload=payload)
+        return extract_data(body, "simulation")["attributes"]
+
+    @staticmethod
+    def build_simulation(funding_request: GlobalFundingRequest, due_date: str) -> tuple[str, dict]:
+        """
+        Build the endpoint and payload needed to simulate the given funding request.
+
+        Args:
+            funding_request (GlobalFundingRequest): The funding request information
+            due_date (str): The due date of the funding request
+
+        Returns:
+            tuple[str, dict]: The simulation endpoint and its payload
+
+        """
         # NOTE: The payload is hardcoded because the simulation only depends on the funding request ID and the amount
         payload = {
             "data": {
@@ -112,11 +205,10 @@ class CumploGlobalAPI:
             credit_type=funding_request.credit_type.value,
             currency=funding_request.currency.value,
         )
-        response = cls._request(HTTPMethod.POST, endpoint, payload=payload)
-        return response.json()["data"]["attributes"]
+        return endpoint, payload
 
     @classmethod
-    @retry((KeyError, requests.exceptions.JSONDecodeError), tries=5, delay=1)
+    @governor.governed
     def get_funding_requests(cls, *, ignore_completed: bool = False) -> list[GlobalFundingRequest]:
         """
         Query the Cumplo's Global API for the existing funding requests.
@@ -126,15 +218,16 @@ class CumploGlobalAPI:
 
         """
         logger.debug("Getting funding requests from Cumplo's Global API")
-        response = cls._request(HTTPMethod.GET, CUMPLO_GLOBAL_API_FUNDING_REQUESTS)
+        body = cls._request(HTTPMethod.GET, CUMPLO_GLOBAL_API_FUNDING_REQUESTS, "list")
 
-        data = [x["attributes"] for x in response.json()["data"]]
+        data = [x["attributes"] for x in extract_data(body, "list")]
 
         funding_requests = [
             GlobalFundingRequest.model_validate({
                 **element["operacion"],
                 "credit_type": element["operacion"]["producto"]["codigo"],
                 "id_borrower": element["empresa"]["id"],
+                "payload": element["operacion"],
             })
             for element in data
         ]
@@ -1,13 +1,16 @@
 from http import HTTPMethod
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 import requests
-from bs4 import BeautifulSoup
 from cumplo_common.utils.text import clean_text
 
 from cumplo_spotter.integrations.cumplo.exceptions import NoResultFoundError
 from cumplo_spotter.utils.constants import CREDIT_DETAIL_TITLE, CUMPLO_HTML_API
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
 logger = getLogger(__name__)
 
 
@@ -33,7 +36,7 @@ class CumploHTMLAPI:
         return requests.request(method=method, url=f"{cls.url}{endpoint}", json=payload)
 
     @classmethod
-    def get_funding_requests(cls, id_funding_request: int) -> BeautifulSoup:
+    def get_funding_requests(cls, id_funding_request: int) -> "BeautifulSoup":
         """
         Query the Cumplo's HTML API for the given funding request information.
 
@@ -47,6 +50,9 @@ class CumploHTMLAPI:
             BeautifulSoup: The parsed HTML of the funding request
 
         """
+        # NOTE: The HTML parser is only loaded by the instances that actually scrape Cumplo's HTML API
+        from bs4 import BeautifulSoup  # noqa: PLC0415
+
         logger.debug(f"Getting funding request {id_funding_request} from Cumplo's HTML API")
         response = cls._request(HTTPMethod.GET, f"/{id_funding_request}")
         soup = BeautifulSoup(response.text, "html.parser")
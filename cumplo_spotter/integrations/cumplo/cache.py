@@ -0,0 +1,347 @@
+import time
+from collections.abc import Callable, Generator, Iterable
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from threading import Condition, Lock, Thread
+from typing import cast
+
+from cumplo_common.models import FundingRequest
+
+from cumplo_spotter.integrations.cumplo.exceptions import CircuitOpenError
+from cumplo_spotter.models.snapshot import Snapshot
+from cumplo_spotter.utils.constants import CUMPLO_CACHE_MAX_STALENESS, CUMPLO_CACHE_TTL
+from cumplo_spotter.utils.metrics import registry
+from cumplo_spotter.utils.profiling import ProfileTarget, profiler
+from cumplo_spotter.utils.timing import phase
+
+logger = getLogger(__name__)
+
+CACHE_LOOKUPS = registry.counter(
+    "spotter_snapshot_cache_lookups_total",
+    "Lookups of the funding requests snapshot, by hit, stale hit or miss",
+    ("result",),
+)
+REFRESH_SECONDS = registry.histogram(
+    "spotter_snapshot_refresh_duration_seconds",
+    "Duration of the refresh cycles of the funding requests snapshot, by outcome",
+    ("outcome",),
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+)
+
+
+@dataclass
+class CacheStatistics:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    failed_refreshes: int = 0
+    refresh_seconds_total: float = 0.0
+    last_refresh_seconds: float = 0.0
+
+
+class LoadProgress:
+    """Funding requests loaded so far by an in-flight refresh, so they can be followed before it completes."""
+
+    def __init__(self) -> None:
+        self.items: list[FundingRequest] = []
+        self.snapshot: Snapshot | None = None
+        self.done = False
+        self.error: Exception | None = None
+        self._condition = Condition()
+
+    def add(self, funding_request: FundingRequest) -> None:
+        """
+        Publish a freshly loaded funding request to the followers.
+
+        Args:
+            funding_request (FundingRequest): The loaded funding request
+
+        """
+        with self._condition:
+            self.items.append(funding_request)
+            self._condition.notify_all()
+
+    def finish(self, snapshot: Snapshot | None = None, error: Exception | None = None) -> None:
+        """
+        Mark the refresh as completed, either with the resulting snapshot or with the error that made it fail.
+
+        Args:
+            snapshot (Snapshot | None): The refreshed snapshot
+            error (Exception | None): The error that made the refresh fail
+
+        """
+        with self._condition:
+            # NOTE: Snapshots adopted from elsewhere are published at once, as nothing was loaded along the way
+            if snapshot is not None and not self.items:
+                self.items.extend(snapshot.by_profit)
+
+            self.snapshot, self.done, self.error = snapshot, True, error
+            self._condition.notify_all()
+
+    def follow(self) -> Generator[FundingRequest, None, Snapshot]:
+        """
+        Iterate over the loaded funding requests, waiting for the rest of them until the refresh completes.
+
+        If the refresh fails, its error is raised after the funding requests loaded before it.
+
+        Yields:
+            FundingRequest: The funding requests in the order they were loaded
+
+        Returns:
+            Snapshot: The snapshot built by the refresh
+
+        """
+        position = 0
+        while True:
+            with self._condition:
+                while position >= len(self.items) and not self.done:
+                    self._condition.wait()
+                items, done, error = self.items[position:], self.done, self.error
+
+            yield from items
+            position += len(items)
+
+            if done:
+                if error is not None:
+                    raise error
+                return cast(Snapshot, self.snapshot)  # noqa: B901
+
+
+class SnapshotCache:
+    """
+    Cache of the available funding requests snapshot with single-flight refreshes.
+
+    Only one refresh runs at a time: concurrent callers wait on the in-flight one instead of starting their own. Once
+    the snapshot outlives its TTL it's still served, flagged as stale, while a background refresh replaces it. Only
+    snapshots older than the maximum staleness make callers wait for a refresh.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[FundingRequest]],
+        ttl: float = CUMPLO_CACHE_TTL,
+        max_staleness: float = CUMPLO_CACHE_MAX_STALENESS,
+        on_refresh: Callable[[Snapshot], None] | None = None,
+    ) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.on_refresh = on_refresh
+        self.statistics = CacheStatistics()
+        self._snapshot: Snapshot | None = None
+        self._inflight: Future[Snapshot] | None = None
+        self._progress: LoadProgress | None = None
+        self._lock = Lock()
+
+    @property
+    def snapshot(self) -> Snapshot | None:
+        """Last good snapshot, regardless of its age."""
+        return self._snapshot
+
+    def get(self) -> Snapshot:
+        """
+        Get the current snapshot, refreshing it if needed.
+
+        Returns:
+            Snapshot: The freshest snapshot that can be served, or the last good one while Cumplo is unavailable
+
+        Raises:
+            CircuitOpenError: If Cumplo is unavailable and there's no snapshot to fall back to
+
+        """
+        snapshot = self._snapshot
+
+        if snapshot is not None and snapshot.age <= self.ttl:
+            self._lookup("hits")
+            return snapshot
+
+        if snapshot is not None and snapshot.age <= self.max_staleness:
+            self._lookup("stale_hits")
+            self.refresh_in_background()
+            return snapshot
+
+        self._lookup("misses")
+        try:
+            return self.refresh()
+
+        except CircuitOpenError:
+            if snapshot is None:
+                raise
+            logger.warning(f"Cumplo is unavailable, serving the last good snapshot from {snapshot.age:.0f}s ago")
+            return snapshot
+
+    def refresh(self) -> Snapshot:
+        """
+        Refresh the snapshot, joining the in-flight refresh if there is one.
+
+        Returns:
+            Snapshot: The refreshed snapshot
+
+        """
+        future, progress, is_leader = self._begin()
+        if not is_leader:
+            with phase("wait"):
+                return future.result()
+        return self._complete(future, progress)
+
+    def stream(self) -> Generator[FundingRequest, None, Snapshot]:
+        """
+        Iterate over the available funding requests without waiting for a whole refresh.
+
+        A servable snapshot is iterated right away, sorted by monthly profit rate. Otherwise the funding requests are
+        yielded as the refresh loads them, joining the in-flight one if there is one. The refresh always runs to
+        completion, even if the caller stops iterating, so it fills the cache anyway.
+
+        Yields:
+            FundingRequest: The available funding requests
+
+        Raises:
+            CircuitOpenError: If Cumplo is unavailable and there's no snapshot to fall back to
+
+        Returns:
+            Snapshot: The snapshot the funding requests were streamed from
+
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age <= self.max_staleness:
+            snapshot = self.get()
+            yield from snapshot.by_profit
+            return snapshot
+
+        self._lookup("misses")
+        future, progress, is_leader = self._begin()
+        if is_leader:
+            Thread(target=self._complete_quietly, args=(future, progress), name="snapshot-refresh", daemon=True).start()
+
+        try:
+            return (yield from progress.follow())
+
+        except CircuitOpenError:
+            # NOTE: The breaker rejects the listing, the very first request of a refresh, so nothing was yielded yet
+            if snapshot is None:
+                raise
+            logger.warning(f"Cumplo is unavailable, streaming the last good snapshot from {snapshot.age:.0f}s ago")
+            yield from snapshot.by_profit
+            return snapshot  # noqa: B901
+
+    def refresh_in_background(self) -> Future[Snapshot]:
+        """
+        Start a refresh on a background thread, joining the in-flight refresh if there is one.
+
+        Returns:
+            Future[Snapshot]: The outcome of the refresh
+
+        """
+        future, progress, is_leader = self._begin()
+        if is_leader:
+            Thread(target=self._complete_quietly, args=(future, progress), name="snapshot-refresh", daemon=True).start()
+        return future
+
+    def warm(self) -> Future[Snapshot]:
+        """
+        Refresh the snapshot ahead of its expiry, so callers don't have to wait for it.
+
+        Returns:
+            Future[Snapshot]: The outcome of the refresh
+
+        """
+        return self.refresh_in_background()
+
+    def clear(self) -> None:
+        """Drop the current snapshot, so the next caller waits for a refresh."""
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> dict:
+        """Export the cache counters along with the age of the current snapshot."""
+        snapshot = self._snapshot
+        return {
+            **asdict(self.statistics),
+            "version": snapshot.version if snapshot else None,
+            "age_seconds": snapshot.age if snapshot else None,
+            "refreshing": self._inflight is not None,
+        }
+
+    def _begin(self) -> tuple[Future[Snapshot], LoadProgress, bool]:
+        """Join the in-flight refresh or register a new one, telling whether the caller has to run it."""
+        with self._lock:
+            if self._inflight is not None and self._progress is not None:
+                return self._inflight, self._progress, False
+
+            self._inflight, self._progress = Future(), LoadProgress()
+            return self._inflight, self._progress, True
+
+    def _complete(self, future: Future[Snapshot], progress: LoadProgress) -> Snapshot:
+        """Run the registered refresh and hand its outcome to everyone waiting on it."""
+        try:
+            snapshot = self._load(progress)
+
+        except Exception as exception:
+            with self._lock:
+                self._inflight, self._progress = None, None
+            progress.finish(error=exception)
+            future.set_exception(exception)
+            raise
+
+        with self._lock:
+            self._snapshot, self._inflight, self._progress = snapshot, None, None
+        progress.finish(snapshot)
+        future.set_result(snapshot)
+        return snapshot
+
+    def _load(self, progress: LoadProgress | None = None) -> Snapshot:
+        """Build a new snapshot with the loader, publishing each funding request to the given progress."""
+        start = time.perf_counter()
+        funding_requests = []
+        try:
+            with profiler.capture(ProfileTarget.REFRESH, "refresh"):
+                for funding_request in self.loader():
+                    funding_requests.append(funding_request)
+                    if progress is not None:
+                        progress.add(funding_request)
+
+        except Exception:
+            self._count("failed_refreshes")
+            REFRESH_SECONDS.observe(time.perf_counter() - start, outcome="failure")
+            raise
+
+        duration = time.perf_counter() - start
+        REFRESH_SECONDS.observe(duration, outcome="success")
+        with self._lock:
+            self.statistics.refreshes += 1
+            self.statistics.refresh_seconds_total += duration
+            self.statistics.last_refresh_seconds = duration
+
+        logger.info(f"Refreshed the snapshot with {len(funding_requests)} funding requests in {duration:.2f}s")
+        snapshot = Snapshot(version=time.time_ns(), funding_requests=tuple(funding_requests))
+        with phase("serialize"):
+            snapshot.precompute()
+
+        # NOTE: Only snapshots loaded by this process are handed over, not the ones adopted from the fetcher process
+        if self.on_refresh is not None:
+            try:
+                self.on_refresh(snapshot)
+            except Exception:
+                logger.exception(f"Failed to hand over snapshot {snapshot.version} after the refresh")
+        return snapshot
+
+    def _complete_quietly(self, future: Future[Snapshot], progress: LoadProgress) -> None:
+        """Run the registered refresh logging any error instead of raising it."""
+        try:
+            self._complete(future, progress)
+        except CircuitOpenError:
+            logger.warning("Skipped the background refresh, Cumplo's circuit breaker is open")
+        except Exception:
+            logger.exception("Failed to refresh the snapshot in background")
+
+    def _lookup(self, result: str) -> None:
+        """Count a lookup of the snapshot by its result."""
+        self._count(result)
+        CACHE_LOOKUPS.inc(result=result)
+
+    def _count(self, counter: str) -> None:
+        """Increment the given counter."""
+        with self._lock:
+            setattr(self.statistics, counter, getattr(self.statistics, counter) + 1)
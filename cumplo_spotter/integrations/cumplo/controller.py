@@ -1,54 +1,133 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Generator, Iterator
+from decimal import Decimal
 from logging import getLogger
 
-from cachetools import TTLCache, cached
 from cumplo_common.models import FundingRequest
+from pydantic import ValidationError
 
-from cumplo_spotter.integrations.cumplo.api_global import CumploGlobalAPI, GlobalFundingRequest
+from cumplo_spotter.integrations.cumplo.api_global import VALIDATION_FAILURES, CumploGlobalAPI
+from cumplo_spotter.integrations.cumplo.cache import SnapshotCache
+from cumplo_spotter.integrations.cumplo.hydration import HydratedFundingRequest, engine
+from cumplo_spotter.integrations.cumplo.scheduler import RefreshScheduler
+from cumplo_spotter.integrations.cumplo.shared import SharedSnapshotCache
+from cumplo_spotter.integrations.cumplo.store import HydrationPlan, store
+from cumplo_spotter.integrations.history import history
 from cumplo_spotter.models.cumplo import CumploFundingRequest
-from cumplo_spotter.utils.constants import CACHE_MAXSIZE, CUMPLO_CACHE_TTL
+from cumplo_spotter.models.snapshot import Snapshot
+from cumplo_spotter.utils.constants import SHARED_SNAPSHOT_PATH
+from cumplo_spotter.utils.metrics import registry
+from cumplo_spotter.utils.timing import phase, timed
 
 logger = getLogger(__name__)
-cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CUMPLO_CACHE_TTL)
 
 
-@cached(cache=cache)
+def get_snapshot() -> Snapshot:
+    """
+    Get the cached snapshot of the available funding requests.
+
+    Returns:
+        Snapshot: The snapshot of the available funding requests
+
+    """
+    return cache.get()
+
+
 def get_available_funding_requests() -> list[FundingRequest]:
     """
-    Query the Cumplo's GraphQL API and returns a list of available funding requests.
+    Get the cached list of available funding requests.
 
     Returns:
         list[FundingRequest]: List of available funding requests
 
+    """
+    return list(cache.get().funding_requests)
+
+
+def stream_available_funding_requests() -> Generator[FundingRequest, None, Snapshot]:
+    """
+    Iterate over the available funding requests without waiting for a whole refresh of the cache.
+
+    Yields:
+        FundingRequest: The available funding requests, as soon as they are hydrated when the cache is cold
+
+    Returns:
+        Snapshot: The snapshot the funding requests were streamed from
+
+    """
+    return (yield from cache.stream())
+
+
+def _load_available_funding_requests() -> Iterator[FundingRequest]:
+    """
+    Query the Cumplo's Global API and yield the available funding requests as soon as each one is hydrated.
+
+    Funding requests that can't be converted keep the version of the previous snapshot, if any, so a bad payload of a
+    listing that is still available isn't published as a removal. The ones that were never converted are skipped.
+
+    Yields:
+        FundingRequest: The available funding requests
+
     """
     logger.info("Getting funding requests from Cumplo API")
 
-    funding_requests = []
-    global_funding_requests = CumploGlobalAPI.get_funding_requests(ignore_completed=True)
+    count = 0
+    with phase("upstream"):
+        global_funding_requests = CumploGlobalAPI.get_funding_requests(ignore_completed=True)
     logger.info(f"Found {len(global_funding_requests)} existing funding requests")
 
-    with ThreadPoolExecutor(max_workers=25) as executor:
-        funding_request_by_future = {
-            executor.submit(_get_funding_request_details, global_funding_request): global_funding_request
-            for global_funding_request in global_funding_requests
-        }
-        for future in as_completed(funding_request_by_future):
-            global_funding_request = funding_request_by_future[future]
-            details, simulation = future.result()
+    previous = snapshot.index if (snapshot := cache.snapshot) is not None else {}
+    plan = store.plan(global_funding_requests)
+    for global_funding_request, details, simulation in timed(_hydrate(plan), "upstream"):
+        data = {**details, "score": global_funding_request.score, "simulation": simulation}
+        try:
+            with phase("validate"):
+                funding_request = CumploFundingRequest.convert(data, id_borrower=global_funding_request.id_borrower)
+
+        except (ValidationError, KeyError):
+            VALIDATION_FAILURES.inc(stage="conversion")
+            if (funding_request := previous.get(global_funding_request.id)) is None:
+                logger.exception(f"Skipping funding request {global_funding_request.id}, which couldn't be converted")
+                continue
+
+            logger.exception(f"Keeping the previous version of funding request {global_funding_request.id}")
 
-            data = {**details, **global_funding_request.model_dump(), "simulation": simulation}
-            funding_request = CumploFundingRequest.model_validate(data)
-            funding_request.borrower.id = global_funding_request.id_borrower
+        if funding_request.raised_percentage != Decimal(1) and funding_request.maximum_investment:
+            count += 1
+            yield funding_request
+
+    store.retain({funding_request.id for funding_request in global_funding_requests})
+    logger.info(f"Got {count} funding requests")
+
+
+def _hydrate(plan: HydrationPlan) -> Iterator[HydratedFundingRequest]:
+    """
+    Yield the reused funding requests first and then the pending ones as soon as each one is hydrated.
+
+    Yields:
+        HydratedFundingRequest: The funding requests along with their details and simulation
+
+    """
+    yield from plan.reused
 
-            if not funding_request.is_completed and funding_request.maximum_investment:
-                funding_requests.append(funding_request.export())
+    for hydrated in engine.stream(plan.pending, plan.simulations):
+        store.update([hydrated])
+        yield hydrated
 
-    logger.info(f"Got {len(funding_requests)} funding requests")
-    return funding_requests
 
+cache = (
+    SharedSnapshotCache(loader=_load_available_funding_requests, path=SHARED_SNAPSHOT_PATH, on_refresh=history.append)
+    if SHARED_SNAPSHOT_PATH
+    else SnapshotCache(loader=_load_available_funding_requests, on_refresh=history.append)
+)
+scheduler = RefreshScheduler(cache)
 
-def _get_funding_request_details(funding_request: GlobalFundingRequest) -> tuple[dict, dict]:
-    """Request the details of a given funding request."""
-    details = CumploGlobalAPI.get_funding_request(funding_request.id)
-    simulation = CumploGlobalAPI.simulate_funding_request(funding_request, details["fecha_vencimiento"])
-    return details, simulation
+registry.gauge(
+    "spotter_snapshot_age_seconds",
+    "Age of the funding requests snapshot held by this worker",
+    function=lambda: snapshot.age if (snapshot := cache.snapshot) else None,
+)
+registry.gauge(
+    "spotter_snapshot_funding_requests",
+    "Available funding requests in the snapshot held by this worker",
+    function=lambda: len(snapshot.funding_requests) if (snapshot := cache.snapshot) else None,
+)
@@ -1,2 +1,19 @@
 class NoResultFoundError(Exception):
     """Exception raised when no result is found in a Cumplo API."""
+
+
+class SnapshotUnavailableError(Exception):
+    """Exception raised when no snapshot of the funding requests is available."""
+
+
+class UpstreamUnavailableError(Exception):
+    """Exception raised when Cumplo answers with a throttling or server error status."""
+
+    def __init__(self, status_code: int, retry_after: float | None = None) -> None:
+        super().__init__(status_code)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Exception raised when a request to Cumplo is rejected because its circuit breaker is open."""
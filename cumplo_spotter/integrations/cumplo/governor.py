@@ -0,0 +1,511 @@
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import asdict, dataclass
+from enum import StrEnum
+from functools import partial, wraps
+from http import HTTPStatus
+from logging import getLogger
+from threading import Lock
+from typing import ParamSpec, TypeVar
+
+import httpx
+import requests
+
+from cumplo_spotter.integrations.cumplo.exceptions import CircuitOpenError, UpstreamUnavailableError
+from cumplo_spotter.utils.constants import (
+    GOVERNOR_BURST,
+    GOVERNOR_DECREASE_RATIO,
+    GOVERNOR_FAILURE_THRESHOLD,
+    GOVERNOR_INITIAL_CONCURRENCY,
+    GOVERNOR_LATENCY_TARGET,
+    GOVERNOR_MIN_CONCURRENCY,
+    GOVERNOR_OPEN_SECONDS,
+    GOVERNOR_RATE,
+    GOVERNOR_RETRY_BASE_DELAY,
+    GOVERNOR_RETRY_MAX_DELAY,
+    GOVERNOR_RETRY_TRIES,
+    HYDRATION_CONCURRENCY,
+)
+from cumplo_spotter.utils.metrics import registry
+
+logger = getLogger(__name__)
+
+GOVERNOR_EVENTS = registry.counter(
+    "spotter_governor_events_total",
+    "Requests, failures, retries, throttled and rejected requests and limit decreases of the upstream governor",
+    ("event",),
+)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# NOTE: Invalid JSON bodies, which Cumplo sends along with some transient errors, are retried as well
+RETRYABLE_ERRORS = (
+    UpstreamUnavailableError,
+    json.JSONDecodeError,
+    requests.JSONDecodeError,
+    httpx.TransportError,
+    requests.exceptions.RequestException,
+)
+
+
+def check_status(status_code: int, headers: Mapping[str, str]) -> None:
+    """
+    Check that a response of Cumplo isn't a throttling or server error.
+
+    Args:
+        status_code (int): The status code of the response
+        headers (Mapping[str, str]): The headers of the response
+
+    Raises:
+        UpstreamUnavailableError: If the response is a throttling or server error
+
+    """
+    if status_code != HTTPStatus.TOO_MANY_REQUESTS and status_code < HTTPStatus.INTERNAL_SERVER_ERROR:
+        return
+
+    try:
+        retry_after = float(headers.get("Retry-After", ""))
+    except ValueError:
+        retry_after = None
+
+    raise UpstreamUnavailableError(status_code, retry_after)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class GovernorStatistics:
+    requests: int = 0
+    failures: int = 0
+    retries: int = 0
+    throttled: int = 0
+    rejected: int = 0
+    decreases: int = 0
+
+
+class AdaptiveLimit:
+    """
+    Limit of concurrent requests adapted with additive increase and multiplicative decrease (AIMD).
+
+    Every request answered within the latency target raises the limit by one over the current limit, which adds up to
+    one more slot per round of requests. Errors and slow responses cut it by the decrease ratio, once per round: only
+    requests started after the last decrease can trigger the next one.
+    """
+
+    def __init__(
+        self,
+        initial: int = GOVERNOR_INITIAL_CONCURRENCY,
+        minimum: int = GOVERNOR_MIN_CONCURRENCY,
+        maximum: int = HYDRATION_CONCURRENCY,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.inflight = 0
+        self._last_decrease = float("-inf")
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._lock = Lock()
+
+    @property
+    def waiting(self) -> int:
+        """Amount of requests waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a free slot.
+
+        Raises:
+            CancelledError: If the request is cancelled while waiting, after passing its turn on if it had one
+
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return
+
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+
+    def release(self) -> None:
+        """Free a slot, waking up as many waiting requests as the current limit allows."""
+        with self._lock:
+            self.inflight -= 1
+        self._wake()
+
+    def increase(self) -> None:
+        """Add a fraction of a slot after a fast and successful response."""
+        with self._lock:
+            self.limit = min(self.limit + 1 / self.limit, self.maximum)
+        self._wake()
+
+    def decrease(self, started_at: float, ratio: float = GOVERNOR_DECREASE_RATIO) -> bool:
+        """
+        Cut the limit after an error or a slow response, unless it was already cut during the request.
+
+        Args:
+            started_at (float): Monotonic time the request was started at
+            ratio (float): The ratio the limit is multiplied by
+
+        Returns:
+            bool: Whether the limit was decreased
+
+        """
+        with self._lock:
+            if started_at < self._last_decrease:
+                return False
+
+            self.limit = max(self.limit * ratio, self.minimum)
+            self._last_decrease = time.monotonic()
+            return True
+
+    def _wake(self) -> None:
+        """Wake up the waiting requests that fit in the current limit."""
+        with self._lock:
+            free = int(self.limit) - self.inflight
+            while free > 0 and self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.get_loop().call_soon_threadsafe(self._resolve, waiter)
+                    free -= 1
+
+    @staticmethod
+    def _resolve(waiter: asyncio.Future[None]) -> None:
+        """Resolve a waiter unless it was cancelled in the meantime."""
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+class TokenBucket:
+    """Rate limit that allows bursts of up to its capacity and refills at a constant rate."""
+
+    def __init__(self, rate: float = GOVERNOR_RATE, burst: int = GOVERNOR_BURST) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, borrowing it from the future if the bucket is empty.
+
+        Returns:
+            float: Seconds the caller has to wait before using the token
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self._updated_at) * self.rate, self.burst)
+            self._updated_at = now
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0)
+
+
+class CircuitBreaker:
+    """
+    Breaker that rejects every request for a while after too many consecutive failures.
+
+    Once the open period is over a single probe request is let through: its success closes the circuit again and its
+    failure opens it for another period. A probe that ends without an outcome, like a cancelled one, hands its turn over
+    to the next request.
+    """
+
+    def __init__(
+        self, failure_threshold: int = GOVERNOR_FAILURE_THRESHOLD, open_seconds: float = GOVERNOR_OPEN_SECONDS
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        """
+        Check if a request may be sent to Cumplo.
+
+        Returns:
+            bool: Whether the request is allowed
+
+        """
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+
+            if self.state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                logger.info("Probing Cumplo after the circuit breaker open period")
+                self.state = CircuitState.HALF_OPEN
+                return True
+
+            return False
+
+    def record(self, *, success: bool) -> None:
+        """
+        Record the outcome of a request.
+
+        Args:
+            success (bool): Whether the request succeeded
+
+        """
+        with self._lock:
+            if success:
+                self.state, self.failures = CircuitState.CLOSED, 0
+                return
+
+            self.failures += 1
+            if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != CircuitState.OPEN:
+                    logger.warning(f"Opening the circuit breaker after {self.failures} consecutive failures")
+                self.state, self._opened_at = CircuitState.OPEN, time.monotonic()
+
+    def abandon(self) -> None:
+        """Give back the probe of a request that ended without an outcome, so the next request probes instead."""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self.state = CircuitState.OPEN
+
+
+class UpstreamGovernor:
+    """
+    Shared governor of every request to Cumplo's Global API.
+
+    Requests are throttled by a token bucket and retried with exponential backoff and full jitter, honoring the
+    `Retry-After` header of throttled responses. Asynchronous requests also take a slot of the adaptive concurrency
+    limit, while synchronous ones, a handful per refresh, only feed it with their outcome. After too many consecutive
+    failures the circuit breaker rejects requests right away, so refreshes fail fast to the last good snapshot.
+    """
+
+    def __init__(
+        self,
+        tries: int = GOVERNOR_RETRY_TRIES,
+        base_delay: float = GOVERNOR_RETRY_BASE_DELAY,
+        max_delay: float = GOVERNOR_RETRY_MAX_DELAY,
+        latency_target: float = GOVERNOR_LATENCY_TARGET,
+    ) -> None:
+        self.tries = tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency_target = latency_target
+        self.limit = AdaptiveLimit()
+        self.bucket = TokenBucket()
+        self.breaker = CircuitBreaker()
+        self.statistics = GovernorStatistics()
+        self._lock = Lock()
+
+    async def request(self, send: Callable[[], Awaitable[T]]) -> T:
+        """
+        Send an asynchronous request within the concurrency limit, retrying it on transient errors.
+
+        Args:
+            send (Callable[[], Awaitable[T]]): Sends the request and parses its response
+
+        Returns:
+            T: The parsed response
+
+        """
+        for attempt in range(self.tries - 1):
+            try:
+                return await self._send(send)
+            except RETRYABLE_ERRORS as error:
+                # NOTE: The slot is released before backing off, so other requests can use it meanwhile
+                await asyncio.sleep(self._retry(error, attempt))
+
+        return await self._send(send)
+
+    def call(self, send: Callable[[], T]) -> T:
+        """
+        Send a synchronous request, retrying it on transient errors.
+
+        Args:
+            send (Callable[[], T]): Sends the request and parses its response
+
+        Returns:
+            T: The parsed response
+
+        """
+        for attempt in range(self.tries - 1):
+            try:
+                return self._send_sync(send)
+            except RETRYABLE_ERRORS as error:
+                time.sleep(self._retry(error, attempt))
+
+        return self._send_sync(send)
+
+    def governed(self, function: Callable[P, T]) -> Callable[P, T]:
+        """
+        Decorate a function that sends a synchronous request to Cumplo, so it's sent through the governor.
+
+        Args:
+            function (Callable[P, T]): The function to decorate
+
+        Returns:
+            Callable[P, T]: The decorated function
+
+        """
+
+        @wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            return self.call(partial(function, *args, **kwargs))
+
+        return wrapper
+
+    def stats(self) -> dict:
+        """Export the governor counters along with the current limits and the state of the circuit breaker."""
+        with self._lock:
+            statistics = asdict(self.statistics)
+
+        return {
+            **statistics,
+            "limit": int(self.limit.limit),
+            "inflight": self.limit.inflight,
+            "waiting": self.limit.waiting,
+            "circuit": self.breaker.state,
+        }
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        Compute the delay before retrying a request, with full jitter.
+
+        Args:
+            attempt (int): The zero-based attempt that failed
+            retry_after (float | None): The delay requested by Cumplo, if any
+
+        Returns:
+            float: Seconds to wait before the next attempt
+
+        """
+        delay = random.uniform(0, min(self.base_delay * 2**attempt, self.max_delay))  # noqa: S311
+        return max(delay, retry_after or 0)
+
+    def _admit(self) -> None:
+        """
+        Check that the circuit breaker lets the request through.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError
+
+    async def _send(self, send: Callable[[], Awaitable[T]]) -> T:
+        """Send a single asynchronous attempt, holding a slot of the concurrency limit while it's in flight."""
+        self._admit()
+        try:
+            await asyncio.sleep(self.bucket.reserve())
+            await self.limit.acquire()
+        except BaseException:
+            self.breaker.abandon()
+            raise
+
+        started_at = time.monotonic()
+        try:
+            result = await send()
+
+        except RETRYABLE_ERRORS as error:
+            self._failed(error, started_at)
+            raise
+
+        except BaseException:
+            # NOTE: Cancelled requests and unexpected errors say nothing about Cumplo, but must not keep the probe
+            self.breaker.abandon()
+            raise
+
+        finally:
+            self.limit.release()
+
+        self._succeeded(started_at)
+        return result
+
+    def _send_sync(self, send: Callable[[], T]) -> T:
+        """Send a single synchronous attempt."""
+        self._admit()
+        try:
+            time.sleep(self.bucket.reserve())
+        except BaseException:
+            self.breaker.abandon()
+            raise
+
+        started_at = time.monotonic()
+        try:
+            result = send()
+
+        except RETRYABLE_ERRORS as error:
+            self._failed(error, started_at)
+            raise
+
+        except BaseException:
+            self.breaker.abandon()
+            raise
+
+        self._succeeded(started_at)
+        return result
+
+    def _succeeded(self, started_at: float) -> None:
+        """Feed a successful response into the limit and the circuit breaker."""
+        latency = time.monotonic() - started_at
+        self._count("requests")
+        self.breaker.record(success=True)
+
+        if latency <= self.latency_target:
+            self.limit.increase()
+        elif self.limit.decrease(started_at):
+            self._count("decreases")
+
+    def _failed(self, error: Exception, started_at: float) -> None:
+        """Feed a failed response into the limit and the circuit breaker."""
+        self._count("requests")
+        self._count("failures")
+        self.breaker.record(success=False)
+
+        if self.limit.decrease(started_at):
+            self._count("decreases")
+
+        if isinstance(error, UpstreamUnavailableError) and error.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            self._count("throttled")
+
+    def _retry(self, error: Exception, attempt: int) -> float:
+        """Compute the delay before retrying a failed attempt."""
+        self._count("retries")
+        logger.debug(f"Request to Cumplo failed with {error!r}. Retrying ({attempt + 1}/{self.tries})")
+        return self.backoff(attempt, getattr(error, "retry_after", None))
+
+    def _count(self, counter: str) -> None:
+        """Increment the given counter."""
+        with self._lock:
+            setattr(self.statistics, counter, getattr(self.statistics, counter) + 1)
+        GOVERNOR_EVENTS.inc(event=counter)
+
+
+governor = UpstreamGovernor()
+
+registry.gauge(
+    "spotter_upstream_concurrency_limit",
+    "Concurrent requests to Cumplo currently allowed by the adaptive limit",
+    function=lambda: int(governor.limit.limit),
+)
+registry.gauge(
+    "spotter_upstream_circuit_open",
+    "Whether the circuit breaker rejects the requests to Cumplo",
+    function=lambda: governor.breaker.state == CircuitState.OPEN,
+)
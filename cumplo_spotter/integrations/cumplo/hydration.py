@@ -0,0 +1,273 @@
+import asyncio
+import time
+from collections.abc import Coroutine, Iterator, Mapping
+from http import HTTPMethod
+from logging import getLogger
+from queue import Queue
+from threading import Lock, Thread
+from typing import Any, TypeVar
+
+import httpx
+
+from cumplo_spotter.integrations.cumplo.api_global import (
+    VALIDATION_FAILURES,
+    CumploGlobalAPI,
+    GlobalFundingRequest,
+    extract_data,
+    record_request,
+)
+from cumplo_spotter.integrations.cumplo.governor import check_status, governor
+from cumplo_spotter.integrations.cumplo.simulator import simulator
+from cumplo_spotter.utils.constants import (
+    CUMPLO_GLOBAL_API,
+    CUMPLO_GLOBAL_API_DETAILS,
+    CUMPLO_HTTP2,
+    CUMPLO_TIMEOUT,
+    HYDRATION_CONCURRENCY,
+)
+from cumplo_spotter.utils.metrics import registry
+
+logger = getLogger(__name__)
+
+PENDING_HYDRATIONS = registry.gauge(
+    "spotter_hydration_queue_depth", "Funding requests waiting for or in the middle of their hydration"
+)
+
+T = TypeVar("T")
+HydratedFundingRequest = tuple[GlobalFundingRequest, dict, dict]
+
+
+class HydrationEngine:
+    """
+    Asynchronous engine that hydrates funding requests with their details and simulation.
+
+    Every process owns a single engine, which runs its own event loop on a background thread and keeps one pooled,
+    keep-alive HTTP client to Cumplo's Global API. Synchronous callers submit work to that loop, so the connections
+    are reused across refresh cycles instead of being opened for every call.
+    """
+
+    url = CUMPLO_GLOBAL_API
+
+    def __init__(self, concurrency: int = HYDRATION_CONCURRENCY, *, http2: bool = CUMPLO_HTTP2) -> None:
+        self.concurrency = concurrency
+        self.http2 = http2
+        self._lock = Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Start the engine's event loop on a background thread if it isn't running yet."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                Thread(target=self._loop.run_forever, name="hydration-engine", daemon=True).start()
+            return self._loop
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client shared by every hydration of this process."""
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            self._client = httpx.AsyncClient(http2=self.http2, limits=limits, timeout=CUMPLO_TIMEOUT)
+        return self._client
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine on the engine's event loop and wait for its result.
+
+        Args:
+            coroutine (Coroutine): The coroutine to run
+
+        Returns:
+            T: The result of the coroutine
+
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def hydrate(
+        self,
+        funding_requests: list[GlobalFundingRequest],
+        simulations: Mapping[int, tuple[str, dict]] | None = None,
+    ) -> list[HydratedFundingRequest]:
+        """
+        Hydrate the given funding requests with their details and simulation.
+
+        Args:
+            funding_requests (list[GlobalFundingRequest]): The funding requests to hydrate
+            simulations (Mapping[int, tuple[str, dict]]): Known simulations by funding request ID along with the due
+                date they were requested for. They are reused as long as the due date hasn't changed.
+
+        Returns:
+            list[HydratedFundingRequest]: The funding requests along with their details and simulation
+
+        """
+        simulator.load()
+        return self.run(self._hydrate(funding_requests, simulations or {}))
+
+    def stream(
+        self,
+        funding_requests: list[GlobalFundingRequest],
+        simulations: Mapping[int, tuple[str, dict]] | None = None,
+    ) -> Iterator[HydratedFundingRequest]:
+        """
+        Hydrate the given funding requests, yielding each one as soon as it's ready.
+
+        Funding requests are yielded in the order their hydration completes. If the caller stops iterating, the ones
+        still in flight are cancelled.
+
+        Args:
+            funding_requests (list[GlobalFundingRequest]): The funding requests to hydrate
+            simulations (Mapping[int, tuple[str, dict]]): Known simulations by funding request ID along with the due
+                date they were requested for. They are reused as long as the due date hasn't changed.
+
+        Yields:
+            HydratedFundingRequest: The funding requests along with their details and simulation
+
+        """
+        # NOTE: The corpus is read from the calling thread, so the first local simulation doesn't block the event loop
+        simulator.load()
+        simulations = simulations or {}
+        completed: Queue[asyncio.Future[HydratedFundingRequest]] = Queue()
+
+        # NOTE: Tasks must be created from within the engine's event loop
+        async def start() -> list[asyncio.Future[HydratedFundingRequest]]:  # noqa: RUF029
+            tasks = [
+                asyncio.ensure_future(self._hydrate_one(funding_request, simulations.get(funding_request.id)))
+                for funding_request in funding_requests
+            ]
+            PENDING_HYDRATIONS.inc(len(tasks))
+            for task in tasks:
+                task.add_done_callback(lambda _: PENDING_HYDRATIONS.inc(-1))
+                task.add_done_callback(completed.put)
+            return tasks
+
+        tasks = self.run(start())
+        try:
+            for _ in tasks:
+                yield completed.get().result()
+        finally:
+            for task in tasks:
+                self.loop.call_soon_threadsafe(task.cancel)
+
+    def close(self) -> None:
+        """Close the pooled HTTP client and stop the event loop."""
+        with self._lock:
+            if self._loop is None:
+                return
+
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop, self._client = None, None
+
+    async def _hydrate(
+        self,
+        funding_requests: list[GlobalFundingRequest],
+        simulations: Mapping[int, tuple[str, dict]],
+    ) -> list[HydratedFundingRequest]:
+        """Hydrate the given funding requests concurrently."""
+        PENDING_HYDRATIONS.inc(len(funding_requests))
+        try:
+            return await asyncio.gather(
+                *(
+                    self._hydrate_one(funding_request, simulations.get(funding_request.id))
+                    for funding_request in funding_requests
+                )
+            )
+        finally:
+            PENDING_HYDRATIONS.inc(-len(funding_requests))
+
+    async def _hydrate_one(
+        self,
+        funding_request: GlobalFundingRequest,
+        known_simulation: tuple[str, dict] | None = None,
+    ) -> HydratedFundingRequest:
+        """Request the details and, unless it's known or simulated locally, the simulation of a funding request."""
+        # NOTE: In-flight requests are bounded by the governor's adaptive limit, whose slots are freed while backing off
+        details = await self.get_funding_request(funding_request.id)
+        due_date = details["fecha_vencimiento"]
+
+        if known_simulation is not None and known_simulation[0] == due_date:
+            return funding_request, details, known_simulation[1]
+
+        # NOTE: A share of the local simulations is still requested to Cumplo to check the model against it
+        local = simulator.simulate(funding_request, due_date)
+        if local is not None and not simulator.should_check():
+            return funding_request, details, local
+
+        simulation = await self.simulate_funding_request(funding_request, due_date)
+
+        # NOTE: Recording may append to the corpus and recalibrate the model, so it's kept off the event loop
+        await asyncio.to_thread(simulator.record, funding_request, due_date, simulation, local)
+        return funding_request, details, simulation
+
+    async def get_funding_request(self, id_funding_request: int) -> dict:
+        """
+        Query the Cumplo's Global API for the given funding request information.
+
+        Args:
+            id_funding_request (int): The ID of the funding request
+
+        Returns:
+            dict: The funding request information
+
+        """
+        logger.debug(f"Getting funding request {id_funding_request} from Cumplo's Global API")
+        endpoint = CUMPLO_GLOBAL_API_DETAILS.format(id_funding_request=id_funding_request)
+        return await self._request(HTTPMethod.GET, endpoint, "details")
+
+    async def simulate_funding_request(self, funding_request: GlobalFundingRequest, due_date: str) -> dict:
+        """
+        Request the Cumplo's Global API to simulate the funding request.
+
+        Args:
+            funding_request (GlobalFundingRequest): The funding request information
+            due_date (str): The due date of the funding request
+
+        Returns:
+            dict: The simulation information
+
+        """
+        logger.debug(f"Simulating funding request {funding_request.id} from Cumplo's Global API")
+        endpoint, payload = CumploGlobalAPI.build_simulation(funding_request, due_date)
+        return await self._request(HTTPMethod.POST, endpoint, "simulation", payload=payload)
+
+    async def _request(self, method: HTTPMethod, endpoint: str, operation: str, payload: dict | None = None) -> dict:
+        """
+        Make a request to Cumplo's Global API through the upstream governor.
+
+        Args:
+            method (HTTPMethod): HTTP method to use
+            endpoint (str): Endpoint to call
+            operation (str): Name of the operation the request is recorded under
+            payload (dict): Payload to send
+
+        Returns:
+            dict: The attributes of the response data
+
+        """
+
+        async def send() -> dict:
+            started_at = time.perf_counter()
+            try:
+                response = await self.client.request(method, f"{self.url}{endpoint}", json=payload)
+            except httpx.HTTPError as error:
+                record_request(operation, started_at, type(error).__name__)
+                raise
+
+            record_request(operation, started_at, response.status_code, len(response.content))
+            check_status(response.status_code, response.headers)
+
+            try:
+                body = response.json()
+            except ValueError:
+                VALIDATION_FAILURES.inc(stage=operation)
+                raise
+            return extract_data(body, operation)["attributes"]
+
+        return await governor.request(send)
+
+
+engine = HydrationEngine()
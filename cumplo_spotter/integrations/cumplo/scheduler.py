@@ -0,0 +1,136 @@
+import asyncio
+import random
+import time
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from threading import Lock
+
+from cumplo_spotter.integrations.cumplo.cache import SnapshotCache
+from cumplo_spotter.integrations.cumplo.exceptions import CircuitOpenError
+from cumplo_spotter.utils.constants import (
+    CUMPLO_REFRESH_INTERVAL,
+    CUMPLO_REFRESH_JITTER,
+    CUMPLO_REFRESH_SHUTDOWN_TIMEOUT,
+)
+from cumplo_spotter.utils.metrics import registry
+
+logger = getLogger(__name__)
+
+SCHEDULED_REFRESHES = registry.counter(
+    "spotter_scheduled_refreshes_total",
+    "Refreshes of the funding requests snapshot started by the scheduler, by outcome",
+    ("outcome",),
+)
+
+
+@dataclass
+class SchedulerStatistics:
+    runs: int = 0
+    failed_runs: int = 0
+    skipped_runs: int = 0
+    last_run_seconds: float = 0.0
+    last_run_at: float | None = None
+
+
+class RefreshScheduler:
+    """
+    Background task that keeps the snapshot warm, refreshing it on a fixed cadence ahead of its TTL.
+
+    The first refresh starts right away, so new instances warm up without waiting for a request. Each run is timed
+    from the start of the previous one, plus a random jitter that keeps the workers of a host from refreshing in
+    lockstep. Runs never overlap: a run waits for its refresh, and joins the one in flight if a request started it.
+    Refreshes run on a thread of their own, so on shutdown the in-flight one is awaited for a while and then left
+    behind.
+    """
+
+    def __init__(
+        self,
+        cache: SnapshotCache,
+        interval: float = CUMPLO_REFRESH_INTERVAL,
+        jitter: float = CUMPLO_REFRESH_JITTER,
+        shutdown_timeout: float = CUMPLO_REFRESH_SHUTDOWN_TIMEOUT,
+    ) -> None:
+        self.cache = cache
+        self.interval = interval
+        self.jitter = jitter
+        self.shutdown_timeout = shutdown_timeout
+        self.statistics = SchedulerStatistics()
+        self._task: asyncio.Task[None] | None = None
+        self._stopped = asyncio.Event()
+        self._lock = Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """Check if the scheduler is refreshing the snapshot."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start refreshing the snapshot on the running event loop, unless it's started already."""
+        if self.is_running:
+            return
+
+        self._stopped = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="snapshot-scheduler")
+        logger.info(f"Refreshing the snapshot every {self.interval:.0f}s")
+
+    async def stop(self) -> None:
+        """Stop refreshing the snapshot, waiting for the in-flight refresh until the shutdown timeout."""
+        if self._task is None:
+            return
+
+        self._stopped.set()
+        try:
+            await asyncio.wait_for(self._task, self.shutdown_timeout)
+        except TimeoutError:
+            logger.warning("Stopped the scheduler without waiting for the in-flight refresh to complete")
+        self._task = None
+
+    def stats(self) -> dict:
+        """Export the scheduler counters along with its cadence."""
+        return {
+            **asdict(self.statistics),
+            "running": self.is_running,
+            "interval_seconds": self.interval,
+            "jitter": self.jitter,
+        }
+
+    async def _run(self) -> None:
+        """Refresh the snapshot every interval until the scheduler is stopped."""
+        while not self._stopped.is_set():
+            started_at = time.monotonic()
+            await self._refresh()
+
+            delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))  # noqa: S311
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._stopped.wait(), max(0.0, delay - (time.monotonic() - started_at)))
+
+    async def _refresh(self) -> None:
+        """Warm the snapshot, counting the outcome instead of raising it."""
+        started_at = time.monotonic()
+        try:
+            # NOTE: Callers of the refresh may be waiting on the same future, so cancelling this run mustn't cancel it
+            await asyncio.shield(asyncio.wrap_future(self.cache.warm()))
+
+        # NOTE: Background refreshes warn about the open circuit breaker themselves
+        except CircuitOpenError:
+            self._count("skipped_runs", "skipped")
+            return
+
+        except Exception:
+            logger.exception("Failed to run the scheduled refresh of the snapshot")
+            self._count("failed_runs", "failure")
+            return
+
+        finally:
+            with self._lock:
+                self.statistics.last_run_seconds = time.monotonic() - started_at
+                self.statistics.last_run_at = time.time()
+
+        self._count("runs", "success")
+
+    def _count(self, counter: str, outcome: str) -> None:
+        """Increment the given counter."""
+        with self._lock:
+            setattr(self.statistics, counter, getattr(self.statistics, counter) + 1)
+        SCHEDULED_REFRESHES.inc(outcome=outcome)
@@ -0,0 +1,228 @@
+import fcntl
+import mmap
+import os
+import pickle  # noqa: S403
+import struct
+import time
+from collections.abc import Callable, Generator, Iterable
+from concurrent.futures import Future
+from logging import getLogger
+from pathlib import Path
+from typing import IO, Any
+
+from cumplo_common.models import FundingRequest
+
+from cumplo_spotter.integrations.cumplo.cache import LoadProgress, SnapshotCache
+from cumplo_spotter.integrations.cumplo.exceptions import SnapshotUnavailableError
+from cumplo_spotter.models.snapshot import Snapshot
+from cumplo_spotter.utils.constants import SHARED_SNAPSHOT_POLL_INTERVAL, SHARED_SNAPSHOT_WAIT
+
+logger = getLogger(__name__)
+
+# NOTE: The header holds the snapshot version and the length of the serialized snapshot
+HEADER = struct.Struct("<QQ")
+
+
+class SharedSnapshotFile:
+    """
+    Versioned snapshot file shared by every worker of the host.
+
+    Only the process holding the lock file is allowed to write it. Writes go to a temporary file that atomically
+    replaces the previous one, so readers always map a complete snapshot.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+        self._lock_file: IO[bytes] | None = None
+        self._signature: tuple[int, int] | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        """Check if this process is the one that fetches and writes the snapshot."""
+        return self._lock_file is not None
+
+    def elect(self) -> bool:
+        """
+        Try to become the fetcher process. The lock is held until the process exits.
+
+        Returns:
+            bool: Whether this process is the fetcher one
+
+        """
+        if self._lock_file is not None:
+            return True
+
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = self.lock_path.open("wb")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        logger.info(f"Process {os.getpid()} elected as the snapshot fetcher")
+        self._lock_file = lock_file
+        return True
+
+    def write(self, snapshot: Snapshot) -> None:
+        """
+        Serialize the given snapshot and atomically replace the shared one.
+
+        Args:
+            snapshot (Snapshot): The snapshot to share
+
+        """
+        data = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+
+        with temporary.open("wb") as file:
+            file.write(HEADER.pack(snapshot.version, len(data)))
+            file.write(data)
+
+        temporary.replace(self.path)
+
+    def read(self, newer_than: int = 0) -> Snapshot | None:
+        """
+        Map the shared snapshot and deserialize it if its version is newer than the given one.
+
+        Args:
+            newer_than (int): The version of the snapshot already held by the caller
+
+        Returns:
+            Snapshot | None: The shared snapshot or None if there's no newer one
+
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+
+        if (signature := (stat.st_ino, stat.st_mtime_ns)) == self._signature:
+            return None
+
+        with self.path.open("rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            version, length = HEADER.unpack_from(mapped)
+            if version <= newer_than:
+                self._signature = signature
+                return None
+
+            # NOTE: The file is only written by the fetcher process of this same host
+            snapshot = pickle.loads(mapped[HEADER.size : HEADER.size + length])  # noqa: S301
+
+        self._signature = signature
+        return snapshot
+
+
+class SharedSnapshotCache(SnapshotCache):
+    """
+    Snapshot cache shared by every worker of the host through a memory-mapped file.
+
+    A single process, elected through a file lock, fetches the funding requests from Cumplo and publishes each new
+    snapshot on the shared file whenever the refresh scheduler warms it. The rest of the workers only map that file
+    and reload it when its version bumps, so the upstream load doesn't grow with the amount of workers. When the
+    fetcher process dies its lock is released and the next worker that needs a refresh takes over.
+
+    Sharing the file only saves the fetching and the serialization, not memory: every worker deserializes the whole
+    snapshot, along with its serialized views, into its own heap, so the memory still grows with the amount of workers.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[FundingRequest]], path: str, **kwargs: Any) -> None:
+        super().__init__(loader, **kwargs)
+        self.shared = SharedSnapshotFile(path)
+
+    def get(self) -> Snapshot:
+        """
+        Get the current snapshot, adopting the shared one if it's newer.
+
+        Returns:
+            Snapshot: The freshest snapshot that can be served
+
+        """
+        if not self.shared.is_leader:
+            self._adopt()
+        return super().get()
+
+    def stream(self) -> Generator[FundingRequest, None, Snapshot]:
+        """
+        Iterate over the available funding requests, adopting the shared snapshot first if it's newer.
+
+        Yields:
+            FundingRequest: The available funding requests
+
+        Returns:
+            Snapshot: The snapshot the funding requests were streamed from
+
+        """
+        if not self.shared.is_leader:
+            self._adopt()
+        return (yield from super().stream())
+
+    def warm(self) -> Future[Snapshot]:
+        """
+        Refresh the snapshot if this is the fetcher process, or adopt the shared one otherwise.
+
+        Returns:
+            Future[Snapshot]: The outcome of the refresh, which is already done unless this process has to fetch
+
+        """
+        if self.shared.elect() or (snapshot := self._adopt() or self._snapshot) is None:
+            return super().warm()
+
+        future: Future[Snapshot] = Future()
+        future.set_result(snapshot)
+        return future
+
+    def stats(self) -> dict:
+        """Export the cache counters along with the role of this process."""
+        return {**super().stats(), "leader": self.shared.is_leader}
+
+    def _adopt(self) -> Snapshot | None:
+        """Replace the current snapshot with the shared one if it's newer."""
+        current = self._snapshot
+        if (snapshot := self.shared.read(newer_than=current.version if current else 0)) is None:
+            return None
+
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _load(self, progress: LoadProgress | None = None) -> Snapshot:
+        """Fetch a new snapshot if this is the fetcher process or wait for the fetcher one otherwise."""
+        if self.shared.elect():
+            return self._lead(progress)
+        return self._follow(progress)
+
+    def _lead(self, progress: LoadProgress | None = None) -> Snapshot:
+        """Fetch a new snapshot and share it with the rest of the workers."""
+        snapshot = super()._load(progress)
+        self.shared.write(snapshot)
+        return snapshot
+
+    def _follow(self, progress: LoadProgress | None = None) -> Snapshot:
+        """
+        Wait for the fetcher process to share a newer snapshot, taking over if it dies in the meantime.
+
+        Raises:
+            SnapshotUnavailableError: If no snapshot was shared before the deadline and there's none to fall back to
+
+        """
+        # NOTE: A fresh snapshot is already the latest one the fetcher shared, so there's nothing newer to wait for
+        if (current := self._adopt() or self._snapshot) is not None and current.age <= self.ttl:
+            return current
+
+        deadline = time.monotonic() + SHARED_SNAPSHOT_WAIT
+
+        while time.monotonic() < deadline:
+            if (snapshot := self._adopt()) is not None:
+                return snapshot
+
+            if self.shared.elect():
+                return self._lead(progress)
+
+            time.sleep(SHARED_SNAPSHOT_POLL_INTERVAL)
+
+        if current is None:
+            raise SnapshotUnavailableError
+        return current
@@ -0,0 +1,509 @@
+import itertools
+import json
+import random
+from collections import deque
+from dataclasses import asdict, dataclass, replace
+from datetime import UTC, date, datetime
+from enum import StrEnum
+from logging import getLogger
+from pathlib import Path
+from statistics import median
+from threading import Lock
+from typing import Self
+
+from cumplo_common.models import DurationUnit
+
+from cumplo_spotter.integrations.cumplo.api_global import CumploGlobalAPI, GlobalFundingRequest
+from cumplo_spotter.utils.constants import (
+    EXIT_FEE_KEY,
+    SIMULATION_AMOUNT,
+    SIMULATION_CORPUS_MAX_BYTES,
+    SIMULATION_CORPUS_PATH,
+    SIMULATION_MAX_SAMPLES,
+    SIMULATION_MIN_SAMPLES,
+    SIMULATION_REMOTE_ONLY,
+    SIMULATION_SHADOW_RATE,
+    SIMULATION_TOLERANCE,
+    UPFRONT_FEE_KEY,
+)
+from cumplo_spotter.utils.metrics import registry
+from cumplo_spotter.utils.text import clean_text
+
+logger = getLogger(__name__)
+
+SIMULATIONS = registry.counter(
+    "spotter_simulations_total",
+    "Simulations of funding requests, by whether they were computed locally or requested to Cumplo",
+    ("source",),
+)
+SIMULATION_MISMATCHES = registry.counter(
+    "spotter_simulation_mismatches_total",
+    "Local simulations that didn't match the one of Cumplo, by credit type and currency",
+    ("credit_type", "currency"),
+)
+
+# NOTE: Simulations are modeled per credit type and currency, as each one may be priced differently
+Product = tuple[str, str]
+
+YEAR_DAYS = (360, 365)
+VALUES = ("interest", "payment", "upfront_fee", "exit_fee", "net_returns")
+
+
+class InterestConvention(StrEnum):
+    COMPOUND = "compound"
+    SIMPLE = "simple"
+
+
+class DayCount(StrEnum):
+    DURATION = "duration"
+    DUE_DATE = "due_date"
+
+
+@dataclass(frozen=True)
+class SimulationSample:
+    amount: int
+    rate: float
+    days: dict[DayCount, int]
+    interest: float
+    payment: float
+    upfront_fee: float
+    exit_fee: float
+    net_returns: float
+
+    @classmethod
+    def parse(cls, record: dict) -> Self | None:
+        """
+        Parse a recorded simulation into the values the local model reproduces.
+
+        Args:
+            record (dict): The recorded simulation, as built by `build_record`
+
+        Returns:
+            SimulationSample | None: The sample, or None if the response has a shape the local model doesn't cover
+
+        """
+        request, response = record["request"], record["response"]
+        if response.get("cuotas") or len(response.get("forma_pago") or []) != 1:
+            return None
+
+        fees = {}
+        for cost in response["costos"]["valores"]:
+            if UPFRONT_FEE_KEY in (name := clean_text(cost["nombre"])):
+                fees["upfront_fee"] = float(cost["valor"])
+            elif EXIT_FEE_KEY in name:
+                fees["exit_fee"] = float(cost["valor"])
+
+        if len(fees) != len(("upfront_fee", "exit_fee")):
+            return None
+
+        installment = response["forma_pago"][0]
+        return cls(
+            amount=request["monto_simulacion"],
+            rate=float(request["tasa_anual"]),
+            days=_days(record["duration_unit"], request["plazo"], request["fecha_vencimiento"], record["simulated_on"]),
+            interest=float(installment["interes"]),
+            payment=float(installment["monto_cuota"]),
+            net_returns=float(response["ganancia_liquida"]),
+            **fees,
+        )
+
+
+@dataclass(frozen=True)
+class SimulationModel:
+    convention: InterestConvention
+    day_count: DayCount
+    year_days: int
+    upfront_fee_rate: float
+    exit_fee_rate: float
+    exit_fee_in_payment: bool
+    samples: int = 0
+    max_error: float = 0.0
+
+    def predict(self, amount: float, rate: float, days: dict[DayCount, int]) -> dict[str, float]:
+        """
+        Compute the simulation of an investment.
+
+        Args:
+            amount (float): The invested amount
+            rate (float): The annual interest rate, as a percentage
+            days (dict[DayCount, int]): The days the investment lasts, by every way of counting them
+
+        Returns:
+            dict[str, float]: The interest, payment, fees and net returns of the investment
+
+        """
+        years = days[self.day_count] / self.year_days
+        if self.convention == InterestConvention.COMPOUND:
+            interest = amount * ((1 + rate / 100) ** years - 1)
+        else:
+            interest = amount * rate / 100 * years
+
+        upfront_fee, exit_fee = amount * self.upfront_fee_rate, interest * self.exit_fee_rate
+        return {
+            "interest": interest,
+            "payment": amount + interest - (exit_fee if self.exit_fee_in_payment else 0),
+            "upfront_fee": upfront_fee,
+            "exit_fee": exit_fee,
+            "net_returns": interest - upfront_fee - exit_fee,
+        }
+
+    def error(self, sample: SimulationSample) -> float:
+        """Largest relative error of the model over the values of the given sample."""
+        predicted = self.predict(sample.amount, sample.rate, sample.days)
+        return max(_error(predicted[value], getattr(sample, value)) for value in VALUES)
+
+
+@dataclass
+class SimulatorStatistics:
+    local: int = 0
+    remote: int = 0
+    checked: int = 0
+    mismatches: int = 0
+    recorded: int = 0
+
+
+class LocalSimulator:
+    """
+    Simulator of investments on funding requests that replaces the simulation requests to Cumplo's Global API.
+
+    Cumplo's pricing isn't documented, so the model of every credit type and currency is calibrated from the
+    simulations Cumplo answered, picking the interest convention and fitting the fee rates that best reproduce them.
+    A product is only simulated locally once its model reproduces every recorded simulation within the tolerance,
+    and a share of the local simulations is still checked against Cumplo. A mismatch drops the model until a
+    recalibration covers the product again. Products without enough samples, or whose simulations have a shape the
+    model doesn't cover, such as several installments, are always simulated by Cumplo.
+
+    Recorded simulations are kept in memory and, when a corpus path is configured, appended to it as JSON lines and
+    loaded back on startup. Once the corpus outgrows its maximum size it's rotated, keeping a single previous file.
+
+    Local simulation is opt-in: it's only enabled by default when a corpus path is configured, so that the model is
+    calibrated on a corpus that can be validated with `benchmarks.simulation`. Setting SIMULATION_REMOTE_ONLY along
+    with the corpus path keeps recording the simulations of Cumplo without ever answering them locally.
+    """
+
+    def __init__(
+        self,
+        corpus_path: str | None = SIMULATION_CORPUS_PATH,
+        *,
+        enabled: bool | None = None,
+        tolerance: float = SIMULATION_TOLERANCE,
+        check_rate: float = SIMULATION_SHADOW_RATE,
+        max_corpus_bytes: int = SIMULATION_CORPUS_MAX_BYTES,
+    ) -> None:
+        self.corpus_path = Path(corpus_path) if corpus_path else None
+        self.max_corpus_bytes = max_corpus_bytes
+        self.enabled = self.corpus_path is not None and not SIMULATION_REMOTE_ONLY if enabled is None else enabled
+        self.tolerance = tolerance
+        self.check_rate = check_rate
+        self.min_samples = SIMULATION_MIN_SAMPLES
+        self.max_samples = SIMULATION_MAX_SAMPLES
+        self.statistics = SimulatorStatistics()
+        self._samples: dict[Product, deque[SimulationSample]] = {}
+        self._calibrations: dict[Product, SimulationModel] = {}
+        self._models: dict[Product, SimulationModel] = {}
+        self._loaded = False
+        self._lock = Lock()
+
+    def simulate(self, funding_request: GlobalFundingRequest, due_date: str) -> dict | None:
+        """
+        Simulate an investment on the given funding request locally, if its product is covered.
+
+        Args:
+            funding_request (GlobalFundingRequest): The funding request information
+            due_date (str): The due date of the funding request
+
+        Returns:
+            dict | None: The simulation, shaped like the one of Cumplo, or None if it has to be requested to Cumplo
+
+        """
+        if not self.enabled:
+            return None
+
+        self.load()
+        if (model := self._models.get(_product(funding_request))) is None:
+            return None
+
+        days = _days(funding_request.duration.unit, funding_request.duration.value, due_date, _today())
+        simulation = model.predict(SIMULATION_AMOUNT, float(funding_request.irr), days)
+        self._count("local")
+        return {
+            "ganancia_liquida": simulation["net_returns"],
+            "costos": {
+                "valores": [
+                    {"nombre": UPFRONT_FEE_KEY, "valor": simulation["upfront_fee"]},
+                    {"nombre": EXIT_FEE_KEY, "valor": simulation["exit_fee"]},
+                ]
+            },
+            "forma_pago": [
+                {"interes": simulation["interest"], "monto_cuota": simulation["payment"], "fecha_vencimiento": due_date}
+            ],
+        }
+
+    def should_check(self) -> bool:
+        """Draw whether a local simulation should be checked against the one of Cumplo."""
+        return random.random() < self.check_rate  # noqa: S311
+
+    def record(
+        self,
+        funding_request: GlobalFundingRequest,
+        due_date: str,
+        response: dict,
+        local: dict | None = None,
+    ) -> None:
+        """
+        Record a simulation answered by Cumplo, checking the local one against it if given.
+
+        Args:
+            funding_request (GlobalFundingRequest): The funding request information
+            due_date (str): The due date of the funding request
+            response (dict): The simulation answered by Cumplo
+            local (dict | None): The local simulation of the same funding request, to be checked
+
+        """
+        self._count("remote")
+        if not self.enabled and self.corpus_path is None:
+            return
+
+        self.load()
+        record = build_record(funding_request, due_date, response)
+        try:
+            sample = SimulationSample.parse(record)
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping the simulation of funding request {funding_request.id}, which is malformed")
+            return
+
+        product = _product(funding_request)
+        if local is not None:
+            self._check(funding_request, product, sample, SimulationSample.parse({**record, "response": local}))
+
+        if sample is None:
+            return
+
+        with self._lock:
+            samples = self._samples.setdefault(product, deque(maxlen=self.max_samples))
+            persist = len(samples) < self.max_samples or local is not None
+            samples.append(sample)
+            self.statistics.recorded += 1
+
+        if persist:
+            self._persist(record)
+
+        if product not in self._models:
+            self._calibrate(product)
+
+    def stats(self) -> dict:
+        """Export the simulator counters along with the model calibrated for every product."""
+        with self._lock:
+            models = {
+                "/".join(product): {
+                    **asdict(model),
+                    "covered": product in self._models,
+                    "recorded": len(self._samples.get(product, ())),
+                }
+                for product, model in self._calibrations.items()
+            }
+            return {**asdict(self.statistics), "enabled": self.enabled, "models": models}
+
+    def _check(
+        self,
+        funding_request: GlobalFundingRequest,
+        product: Product,
+        remote: SimulationSample | None,
+        local: SimulationSample | None,
+    ) -> None:
+        """Compare a local simulation against the one of Cumplo, dropping the model of its product if they differ."""
+        self._count("checked")
+        if (
+            remote is not None
+            and local is not None
+            and (max(_error(getattr(local, value), getattr(remote, value)) for value in VALUES) <= self.tolerance)
+        ):
+            return
+
+        logger.warning(
+            f"The local simulation of funding request {funding_request.id} doesn't match the one of Cumplo, "
+            f"simulating {'/'.join(product)} remotely until it's recalibrated"
+        )
+        with self._lock:
+            self._models.pop(product, None)
+        self._count("mismatches")
+        SIMULATION_MISMATCHES.inc(credit_type=product[0], currency=product[1])
+
+    def _calibrate(self, product: Product) -> None:
+        """Calibrate the model of a product, covering it if the model reproduces every recorded simulation."""
+        with self._lock:
+            samples = list(self._samples.get(product, ()))
+
+        if len(samples) < self.min_samples:
+            return
+
+        model = calibrate(samples)
+        with self._lock:
+            self._calibrations[product] = model
+            if model.max_error > self.tolerance:
+                return
+            self._models[product] = model
+
+        logger.info(f"Simulating {'/'.join(product)} locally, calibrated from {len(samples)} simulations: {model}")
+
+    def load(self) -> None:
+        """Load the recorded simulations from the corpus and calibrate every product, once."""
+        if self._loaded:
+            return
+
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+
+            for line in self._read_corpus():
+                try:
+                    record = json.loads(line)
+                    if (sample := SimulationSample.parse(record)) is None:
+                        continue
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+                product = (record["credit_type"], record["currency"])
+                self._samples.setdefault(product, deque(maxlen=self.max_samples)).append(sample)
+
+            products = list(self._samples)
+
+        for product in products:
+            self._calibrate(product)
+
+    def _read_corpus(self) -> list[str]:
+        """Read the lines of the rotated corpus, if any, followed by the ones of the current corpus."""
+        if self.corpus_path is None:
+            return []
+
+        lines = []
+        for path in (_rotated(self.corpus_path), self.corpus_path):
+            try:
+                lines.extend(path.read_text(encoding="utf-8").splitlines())
+            except FileNotFoundError:
+                continue
+            except OSError:
+                logger.exception(f"Failed to read the simulation corpus {path}")
+        return lines
+
+    def _persist(self, record: dict) -> None:
+        """Append a recorded simulation to the corpus, if there's one."""
+        if self.corpus_path is None:
+            return
+
+        # NOTE: Every record is appended with a single write, so the workers of a host can share the corpus
+        try:
+            with self.corpus_path.open("a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+                size = file.tell()
+
+            # NOTE: Whichever worker crosses the limit rotates the corpus, so it's bounded to twice the maximum size
+            if size >= self.max_corpus_bytes:
+                self.corpus_path.replace(_rotated(self.corpus_path))
+
+        except OSError:
+            logger.exception(f"Failed to append to the simulation corpus {self.corpus_path}")
+
+    def _count(self, counter: str) -> None:
+        """Increment the given counter."""
+        with self._lock:
+            setattr(self.statistics, counter, getattr(self.statistics, counter) + 1)
+        if counter in {"local", "remote"}:
+            SIMULATIONS.inc(source=counter)
+
+
+def calibrate(samples: list[SimulationSample]) -> SimulationModel:
+    """
+    Find the model that best reproduces the given simulations of a product.
+
+    The fee rates are fitted from the samples, and every interest convention and way of counting days is tried.
+
+    Args:
+        samples (list[SimulationSample]): The recorded simulations of the product
+
+    Returns:
+        SimulationModel: The model with the lowest largest error over the samples
+
+    Raises:
+        ValueError: If there are no samples
+
+    """
+    upfront_fee_rate = median(sample.upfront_fee / sample.amount for sample in samples)
+    exit_fee_rates = [sample.exit_fee / sample.interest for sample in samples if sample.interest]
+    exit_fee_rate = median(exit_fee_rates) if exit_fee_rates else 0.0
+
+    best: SimulationModel | None = None
+    for convention, day_count, year_days, exit_fee_in_payment in itertools.product(
+        InterestConvention, DayCount, YEAR_DAYS, (False, True)
+    ):
+        model = SimulationModel(convention, day_count, year_days, upfront_fee_rate, exit_fee_rate, exit_fee_in_payment)
+        error = max(model.error(sample) for sample in samples)
+        if best is None or error < best.max_error:
+            best = replace(model, samples=len(samples), max_error=error)
+
+    if best is None:
+        message = "There are no samples to calibrate the model from"
+        raise ValueError(message)
+    return best
+
+
+def build_record(
+    funding_request: GlobalFundingRequest,
+    due_date: str,
+    response: dict,
+    simulated_on: str | None = None,
+) -> dict:
+    """
+    Build the record of a simulation answered by Cumplo, holding everything the local model is calibrated from.
+
+    Args:
+        funding_request (GlobalFundingRequest): The funding request information
+        due_date (str): The due date of the funding request
+        response (dict): The simulation answered by Cumplo
+        simulated_on (str | None): The ISO date of the simulation. Defaults to today.
+
+    Returns:
+        dict: The record of the simulation
+
+    """
+    _, payload = CumploGlobalAPI.build_simulation(funding_request, due_date)
+    return {
+        "credit_type": funding_request.credit_type.value,
+        "currency": funding_request.currency.value,
+        "duration_unit": funding_request.duration.unit.value,
+        "simulated_on": simulated_on or _today(),
+        "request": payload["data"],
+        "response": response,
+    }
+
+
+def _product(funding_request: GlobalFundingRequest) -> Product:
+    """Get the product of the given funding request."""
+    return funding_request.credit_type.value, funding_request.currency.value
+
+
+def _days(unit: str, value: int, due_date: str, simulated_on: str) -> dict[DayCount, int]:
+    """Count the days an investment lasts, both from its duration and from the simulation date until its due date."""
+    return {
+        DayCount.DURATION: value if unit == DurationUnit.DAY else value * 30,
+        DayCount.DUE_DATE: (date.fromisoformat(due_date[:10]) - date.fromisoformat(simulated_on)).days,
+    }
+
+
+def _rotated(path: Path) -> Path:
+    """Get the path the given corpus is rotated to."""
+    return path.with_name(f"{path.name}.1")
+
+
+def _today() -> str:
+    """Get the ISO date of today in UTC, which simulations count the days until the due date from."""
+    return datetime.now(UTC).date().isoformat()
+
+
+def _error(predicted: float, observed: float) -> float:
+    """Relative error of a predicted value, leaving out the unit that rounding to whole pesos may take."""
+    return max(abs(round(predicted) - round(observed)) - 1, 0) / max(abs(observed), 1)
+
+
+simulator = LocalSimulator()
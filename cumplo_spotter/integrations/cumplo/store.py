@@ -0,0 +1,154 @@
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from threading import Lock
+
+from cumplo_spotter.integrations.cumplo.api_global import GlobalFundingRequest
+from cumplo_spotter.integrations.cumplo.hydration import HydratedFundingRequest
+from cumplo_spotter.utils.constants import HYDRATION_MAX_AGE
+
+logger = getLogger(__name__)
+
+# NOTE: Fields of the details payload that may be refreshed straight from the funding requests list payload
+LIST_REFRESHABLE_FIELDS = ("porcentaje_inversion", "total_inversion", "max_inversion", "cantidad_inversionistas")
+
+
+@dataclass
+class HydrationEntry:
+    details: dict
+    simulation: dict
+    fingerprint: tuple
+    hydrated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def due_date(self) -> str:
+        """Due date the simulation was requested for."""
+        return self.details["fecha_vencimiento"]
+
+
+@dataclass
+class HydrationPlan:
+    reused: list[HydratedFundingRequest] = field(default_factory=list)
+    pending: list[GlobalFundingRequest] = field(default_factory=list)
+    simulations: dict[int, tuple[str, dict]] = field(default_factory=dict)
+
+
+class HydrationStore:
+    """
+    Per funding request store of the details and simulations already downloaded from Cumplo's Global API.
+
+    Funding requests that were already hydrated are refreshed from the cheap list payload instead of downloading their
+    details and simulating them again. They are fully hydrated again when they get older than the maximum age or when
+    any of the values their simulation depends on changes.
+    """
+
+    def __init__(self, max_age: float = HYDRATION_MAX_AGE) -> None:
+        self.max_age = max_age
+        self._entries: dict[int, HydrationEntry] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def plan(self, funding_requests: list[GlobalFundingRequest]) -> HydrationPlan:
+        """
+        Split the given funding requests into the ones that can be served from the store and the pending ones.
+
+        Args:
+            funding_requests (list[GlobalFundingRequest]): The funding requests listed by Cumplo's Global API
+
+        Returns:
+            HydrationPlan: The reused funding requests, the pending ones and the simulations they may still reuse
+
+        """
+        plan = HydrationPlan()
+        now = time.monotonic()
+
+        with self._lock:
+            for funding_request in funding_requests:
+                entry = self._entries.get(funding_request.id)
+
+                if entry is None or entry.fingerprint != self._fingerprint(funding_request):
+                    plan.pending.append(funding_request)
+                    continue
+
+                if now - entry.hydrated_at > self.max_age:
+                    plan.pending.append(funding_request)
+                    continue
+
+                if (details := self._refresh(entry, funding_request)) is None:
+                    plan.pending.append(funding_request)
+                    plan.simulations[funding_request.id] = (entry.due_date, entry.simulation)
+                    continue
+
+                plan.reused.append((funding_request, details, entry.simulation))
+
+        logger.info(f"Reusing {len(plan.reused)} hydrated funding requests, {len(plan.pending)} pending")
+        return plan
+
+    def update(self, hydrated: list[HydratedFundingRequest]) -> None:
+        """
+        Store the given freshly hydrated funding requests.
+
+        Args:
+            hydrated (list[HydratedFundingRequest]): The funding requests along with their details and simulation
+
+        """
+        with self._lock:
+            for funding_request, details, simulation in hydrated:
+                previous = self._entries.get(funding_request.id)
+                entry = HydrationEntry(details, simulation, self._fingerprint(funding_request))
+
+                # NOTE: The age is kept when only the details were downloaded again
+                if previous is not None and previous.simulation is simulation:
+                    entry.hydrated_at = previous.hydrated_at
+
+                self._entries[funding_request.id] = entry
+
+    def retain(self, ids: set[int]) -> None:
+        """
+        Drop every funding request that isn't listed anymore.
+
+        Args:
+            ids (set[int]): The IDs of the funding requests to keep
+
+        """
+        with self._lock:
+            for id_funding_request in self._entries.keys() - ids:
+                del self._entries[id_funding_request]
+
+    def clear(self) -> None:
+        """Drop every stored funding request."""
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _fingerprint(funding_request: GlobalFundingRequest) -> tuple:
+        """Values the simulation of a funding request depends on."""
+        return (
+            funding_request.irr,
+            funding_request.currency,
+            funding_request.credit_type,
+            funding_request.duration.unit,
+            funding_request.duration.value,
+        )
+
+    @staticmethod
+    def _refresh(entry: HydrationEntry, funding_request: GlobalFundingRequest) -> dict | None:
+        """
+        Refresh the stored details with the values of the list payload.
+
+        Returns None when the investment progress changed but the list payload doesn't carry the totals needed to
+        refresh it, in which case the details have to be downloaded again.
+        """
+        payload = funding_request.payload
+        refreshed = {key: payload[key] for key in LIST_REFRESHABLE_FIELDS if key in payload}
+
+        progress_changed = refreshed.get("porcentaje_inversion") != entry.details.get("porcentaje_inversion")
+        if progress_changed and refreshed.keys() != set(LIST_REFRESHABLE_FIELDS):
+            return None
+
+        return {**entry.details, **refreshed}
+
+
+store = HydrationStore()
@@ -0,0 +1 @@
+from cumplo_spotter.integrations.history.store import DEFAULT_FIELDS, FIELDS, HistoryStore, history
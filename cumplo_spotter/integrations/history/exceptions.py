@@ -0,0 +1,10 @@
+class UnknownHistoryFieldError(Exception):
+    """Exception raised when querying fields the history doesn't store."""
+
+    def __init__(self, fields: set[str]) -> None:
+        super().__init__(", ".join(sorted(fields)))
+        self.fields = fields
+
+
+class HistoryDisabledError(Exception):
+    """Exception raised when querying the history without a directory to store it in."""
@@ -0,0 +1,424 @@
+import fcntl
+import json
+import os
+import sqlite3
+import time
+import zlib
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import asdict, dataclass
+from datetime import UTC, date, datetime, timedelta
+from logging import getLogger
+from pathlib import Path
+from queue import Full, Queue
+from threading import Lock, Thread
+from typing import IO, Any
+
+from cumplo_common.models import FundingRequest
+
+from cumplo_spotter.integrations.history.exceptions import HistoryDisabledError, UnknownHistoryFieldError
+from cumplo_spotter.models.filter_plan import FundingRequestColumns
+from cumplo_spotter.models.snapshot import Snapshot
+from cumplo_spotter.utils.constants import (
+    HISTORY_COMPRESSION_LEVEL,
+    HISTORY_DIRECTORY,
+    HISTORY_QUERY_MAX_ROWS,
+    HISTORY_QUEUE_SIZE,
+)
+from cumplo_spotter.utils.metrics import registry
+
+logger = getLogger(__name__)
+
+HISTORY_SNAPSHOTS = registry.counter(
+    "spotter_history_snapshots_total",
+    "Snapshots handed to the history store, by whether they were written, dropped or failed to be written",
+    ("outcome",),
+)
+
+
+@dataclass(frozen=True)
+class Column:
+    type: str
+    read: Callable[[FundingRequest], Any]
+
+
+# NOTE: Scalar fields get a column of their own, so they're queried without decompressing the payloads
+COLUMNS = {
+    "score": Column("REAL", lambda x: float(x.score)),
+    "irr": Column("REAL", lambda x: float(x.irr)),
+    "monthly_profit_rate": Column("REAL", lambda x: float(x.monthly_profit_rate)),
+    "amount": Column("INTEGER", lambda x: x.amount),
+    "raised_amount": Column("INTEGER", lambda x: x.raised_amount),
+    "raised_percentage": Column("REAL", lambda x: float(x.raised_percentage)),
+    "maximum_investment": Column("INTEGER", lambda x: x.maximum_investment),
+    "investors": Column("INTEGER", lambda x: x.investors),
+    "credit_type": Column("TEXT", lambda x: str(x.credit_type)),
+    "duration": Column("INTEGER", FundingRequestColumns.duration_in_days),
+    "id_borrower": Column("INTEGER", lambda x: x.borrower.id),
+}
+FIELDS = frozenset({*COLUMNS, "payload"})
+DEFAULT_FIELDS = tuple(COLUMNS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots (
+    version INTEGER PRIMARY KEY,
+    captured_at REAL NOT NULL,
+    funding_requests INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    removed INTEGER NOT NULL,
+    keyframe INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    captured_at REAL NOT NULL,
+    removed INTEGER NOT NULL,
+    {", ".join(f"{name} {column.type}" for name, column in COLUMNS.items())},
+    payload BLOB
+);
+CREATE INDEX IF NOT EXISTS observations_by_id ON observations (id, captured_at);
+CREATE INDEX IF NOT EXISTS observations_by_time ON observations (captured_at);
+"""
+
+
+@dataclass
+class HistoryStatistics:
+    written: int = 0
+    dropped: int = 0
+    failed: int = 0
+    observations: int = 0
+    keyframes: int = 0
+    last_write_seconds: float = 0.0
+
+
+class HistoryStore:
+    """
+    Append-only history of the funding requests snapshots, stored in SQLite files partitioned by UTC day.
+
+    Each snapshot only adds the funding requests that changed since the previous one, along with a tombstone for the
+    ones that stopped being available, so the history grows with the changes rather than with the refreshes. The
+    first snapshot of every partition is a keyframe holding every funding request, so a day can be read on its own.
+    Scalar fields are stored as columns and the whole funding request as a compressed JSON payload, which is only
+    read and decompressed when asked for.
+
+    Snapshots are queued and written by a background thread, so refreshes never wait for the disk, and are dropped
+    when the queue is full. Only one process per host, elected through a file lock, writes the history. If the
+    directory can't be written the history is disabled for the rest of the process, without failing any refresh.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = HISTORY_DIRECTORY,
+        max_queued: int = HISTORY_QUEUE_SIZE,
+        compression_level: int = HISTORY_COMPRESSION_LEVEL,
+    ) -> None:
+        self.directory = Path(directory) if directory else None
+        self.compression_level = compression_level
+        self.statistics = HistoryStatistics()
+        self._queue: Queue[Snapshot | None] = Queue(maxsize=max_queued)
+        self._thread: Thread | None = None
+        self._lock_file: IO[bytes] | None = None
+        self._connection: sqlite3.Connection | None = None
+        self._day: date | None = None
+        self._previous: dict[int, bytes] = {}
+        self._disabled = False
+        self._lock = Lock()
+
+    @property
+    def is_writer(self) -> bool:
+        """Check if this process is the one that writes the history."""
+        return self._lock_file is not None
+
+    def append(self, snapshot: Snapshot) -> None:
+        """
+        Queue a snapshot to be appended to the history, if this process is the one that writes it.
+
+        Args:
+            snapshot (Snapshot): The refreshed snapshot
+
+        """
+        if self.directory is None or not self._elect():
+            return
+
+        self._start()
+        try:
+            self._queue.put_nowait(snapshot)
+
+        except Full:
+            logger.warning(f"Dropping snapshot {snapshot.version} from the history: the queue is full")
+            self._count("dropped")
+
+    def close(self, timeout: float = 10) -> None:
+        """
+        Write the queued snapshots and stop the writing thread.
+
+        Args:
+            timeout (float): Maximum amount of seconds to wait for the queued snapshots to be written
+
+        """
+        if self._thread is None:
+            return
+
+        try:
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            logger.warning("Closed the history with snapshots still queued")
+            return
+
+        self._thread.join(timeout)
+
+    def snapshots(self, start: datetime, end: datetime) -> list[dict]:
+        """
+        List the snapshots appended within the given time range.
+
+        Args:
+            start (datetime): Start of the range, inclusive
+            end (datetime): End of the range, exclusive
+
+        Raises:
+            HistoryDisabledError: If there's no directory to store the history in
+
+        Returns:
+            list[dict]: The snapshots along with how many funding requests changed in each one
+
+        """
+        if self.directory is None:
+            raise HistoryDisabledError
+
+        rows = []
+        query = "SELECT * FROM snapshots WHERE captured_at >= ? AND captured_at < ? ORDER BY version"
+        for path in _partitions(self.directory, start, end):
+            rows.extend(self._read(path, query, (_timestamp(start), _timestamp(end))))
+
+        return [
+            {**dict(row), "captured_at": _isoformat(row["captured_at"]), "keyframe": bool(row["keyframe"])}
+            for row in rows
+        ]
+
+    def query(
+        self,
+        start: datetime,
+        end: datetime,
+        fields: Sequence[str] = DEFAULT_FIELDS,
+        id_funding_request: int | None = None,
+        limit: int = HISTORY_QUERY_MAX_ROWS,
+    ) -> list[dict]:
+        """
+        Get the recorded changes of the funding requests within the given time range.
+
+        Only the requested columns of the partitions that overlap with the range are read.
+
+        Args:
+            start (datetime): Start of the range, inclusive
+            end (datetime): End of the range, exclusive
+            fields (Sequence[str]): Fields to read besides the ID, version, time and whether it was removed
+            id_funding_request (int | None): ID of the only funding request to read the history of
+            limit (int): Maximum amount of records
+
+        Raises:
+            UnknownHistoryFieldError: If any of the fields isn't stored by the history
+            HistoryDisabledError: If there's no directory to store the history in
+
+        Returns:
+            list[dict]: The changes sorted by time, each one holding the state of the funding request at that moment
+
+        """
+        if self.directory is None:
+            raise HistoryDisabledError
+
+        if unknown := set(fields) - FIELDS:
+            raise UnknownHistoryFieldError(unknown)
+
+        # NOTE: Column names come from the allowed fields only, so they're safe to interpolate
+        columns = ", ".join(["id", "version", "captured_at", "removed", *dict.fromkeys(fields)])
+        conditions = "captured_at >= ? AND captured_at < ?" + (" AND id = ?" if id_funding_request is not None else "")
+        query = f"SELECT {columns} FROM observations WHERE {conditions} ORDER BY captured_at, id LIMIT ?"  # noqa: S608
+        parameters: tuple = (_timestamp(start), _timestamp(end))
+        if id_funding_request is not None:
+            parameters = (*parameters, id_funding_request)
+
+        records: list[dict] = []
+        for path in _partitions(self.directory, start, end):
+            if len(records) >= limit:
+                break
+            records.extend(map(self._record, self._read(path, query, (*parameters, limit - len(records)))))
+        return records
+
+    def stats(self) -> dict:
+        """Export the history counters along with the role of this process and the amount of queued snapshots."""
+        with self._lock:
+            return {
+                **asdict(self.statistics),
+                "enabled": self.directory is not None and not self._disabled,
+                "writer": self.is_writer,
+                "queue_size": self._queue.qsize(),
+            }
+
+    def _elect(self) -> bool:
+        """Try to become the process that writes the history. The lock is held until the process exits."""
+        with self._lock:
+            if self._lock_file is not None or self.directory is None or self._disabled:
+                return self._lock_file is not None
+
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                lock_file = (self.directory / ".writer.lock").open("wb")
+
+            except OSError:
+                logger.exception(f"Disabling the history: {self.directory} can't be written")
+                self._disabled = True
+                return False
+
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+            except BlockingIOError:
+                lock_file.close()
+                return False
+
+            logger.info(f"Process {os.getpid()} elected as the history writer")
+            self._lock_file = lock_file
+            return True
+
+    def _start(self) -> None:
+        """Start the writing thread if it isn't running yet."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Write the queued snapshots until the store is closed."""
+        while (snapshot := self._queue.get()) is not None:
+            start = time.perf_counter()
+            try:
+                self._write(snapshot)
+
+            except (sqlite3.Error, OSError):
+                logger.exception(f"Failed to append snapshot {snapshot.version} to the history")
+                self._count("failed")
+                continue
+
+            with self._lock:
+                self.statistics.last_write_seconds = time.perf_counter() - start
+            self._count("written")
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _write(self, snapshot: Snapshot) -> None:
+        """Append the funding requests that changed or were removed since the previous snapshot."""
+        day = datetime.fromtimestamp(snapshot.created_at, UTC).date()
+        connection = self._connect(day)
+        keyframe = not self._previous
+
+        current = snapshot.serialized
+        changed = [id_ for id_, data in current.items() if self._previous.get(id_) != data]
+        removed = [id_ for id_ in self._previous if id_ not in current]
+
+        rows = [
+            (
+                id_,
+                snapshot.version,
+                snapshot.created_at,
+                0,
+                *(column.read(snapshot.index[id_]) for column in COLUMNS.values()),
+                zlib.compress(current[id_], self.compression_level),
+            )
+            for id_ in changed
+        ]
+        rows.extend((id_, snapshot.version, snapshot.created_at, 1, *([None] * len(COLUMNS)), None) for id_ in removed)
+
+        placeholders = ", ".join(["?"] * (len(COLUMNS) + 5))
+        with connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                (snapshot.version, snapshot.created_at, len(current), len(changed), len(removed), keyframe),
+            )
+            connection.executemany(f"INSERT INTO observations VALUES ({placeholders})", rows)  # noqa: S608
+
+        self._previous = dict(current)
+        with self._lock:
+            self.statistics.observations += len(rows)
+            self.statistics.keyframes += keyframe
+
+    def _connect(self, day: date) -> sqlite3.Connection:
+        """
+        Open the partition of the given day, starting over from a keyframe when it's a new one.
+
+        Raises:
+            HistoryDisabledError: If there's no directory to store the history in
+
+        """
+        if self._connection is not None and self._day == day:
+            return self._connection
+
+        if self._connection is not None:
+            self._connection.close()
+
+        if self.directory is None:
+            raise HistoryDisabledError
+
+        connection = sqlite3.connect(self.directory / f"{day.isoformat()}.sqlite", check_same_thread=False)
+        # NOTE: Write-ahead logging lets queries read the partition while the writer appends to it
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+
+        self._connection, self._day, self._previous = connection, day, {}
+        return connection
+
+    @staticmethod
+    def _read(path: Path, query: str, parameters: tuple) -> list[sqlite3.Row]:
+        """Run a query over a partition opened as read-only."""
+        connection = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            connection.row_factory = sqlite3.Row
+            return connection.execute(query, parameters).fetchall()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> dict:
+        """Convert an observation row into a record, decompressing its payload if it was read."""
+        record = {**dict(row), "captured_at": _isoformat(row["captured_at"]), "removed": bool(row["removed"])}
+        if "payload" in record:
+            record["payload"] = json.loads(zlib.decompress(record["payload"])) if record["payload"] else None
+        return record
+
+    def _count(self, counter: str) -> None:
+        """Increment the given counter."""
+        with self._lock:
+            setattr(self.statistics, counter, getattr(self.statistics, counter) + 1)
+        HISTORY_SNAPSHOTS.inc(outcome=counter)
+
+
+def _partitions(directory: Path, start: datetime, end: datetime) -> Iterator[Path]:
+    """
+    Iterate over the existing partitions that overlap with the given time range.
+
+    Yields:
+        Path: The partitions, oldest first
+
+    """
+    day = datetime.fromtimestamp(_timestamp(start), UTC).date()
+    last = datetime.fromtimestamp(_timestamp(end), UTC).date()
+    while day <= last:
+        if (path := directory / f"{day.isoformat()}.sqlite").exists():
+            yield path
+        day += timedelta(days=1)
+
+
+def _timestamp(moment: datetime) -> float:
+    """Get the POSIX timestamp of the given moment, taking naive ones as UTC."""
+    return (moment if moment.tzinfo else moment.replace(tzinfo=UTC)).timestamp()
+
+
+def _isoformat(timestamp: float) -> str:
+    """Format the given POSIX timestamp as an ISO 8601 UTC moment."""
+    return datetime.fromtimestamp(timestamp, UTC).isoformat()
+
+
+history = HistoryStore()
@@ -0,0 +1 @@
+from cumplo_spotter.integrations.pubsub.publisher import BatchPublisher, BatchSettings, publisher
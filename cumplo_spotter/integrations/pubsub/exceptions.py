@@ -0,0 +1,6 @@
+class PublishQueueFullError(Exception):
+    """Exception raised when a message is rejected because the publisher queue is full."""
+
+
+class PublisherClosedError(Exception):
+    """Exception raised when a message is published after the publisher was closed."""
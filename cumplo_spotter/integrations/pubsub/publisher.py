@@ -0,0 +1,269 @@
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from logging import getLogger
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+
+from cumplo_spotter.integrations.pubsub.exceptions import PublisherClosedError, PublishQueueFullError
+from cumplo_spotter.integrations.pubsub.transport import CloudPubSubTransport, Message, Transport
+from cumplo_spotter.utils.constants import (
+    PUBSUB_BATCH_MAX_BYTES,
+    PUBSUB_BATCH_MAX_LATENCY,
+    PUBSUB_BATCH_MAX_MESSAGES,
+    PUBSUB_FLUSH_TIMEOUT,
+    PUBSUB_QUEUE_SIZE,
+    PUBSUB_WORKERS,
+)
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class PublisherStatistics:
+    queued: int = 0
+    dropped: int = 0
+    batches: int = 0
+    published: int = 0
+    failed: int = 0
+
+
+@dataclass(frozen=True)
+class BatchSettings:
+    max_messages: int = PUBSUB_BATCH_MAX_MESSAGES
+    max_bytes: int = PUBSUB_BATCH_MAX_BYTES
+    max_latency: float = PUBSUB_BATCH_MAX_LATENCY
+
+
+@dataclass
+class Batch:
+    topic: str
+    deadline: float
+    messages: list[Message] = field(default_factory=list)
+    size: int = 0
+
+
+class BatchPublisher:
+    """
+    Asynchronous Pub/Sub publisher that groups messages into batches per topic.
+
+    Publishing only enqueues the message on a bounded queue and returns a future with its ID, so callers don't wait
+    for Pub/Sub. A background thread groups the queued messages of each topic and sends a batch as soon as it reaches
+    the maximum amount of messages or bytes, or when its oldest message has waited for the maximum latency. Batches
+    are sent concurrently by a pool of workers. Messages that don't fit in the queue are dropped instead of blocking,
+    and their futures fail right away, so callers can tell with `rejected`.
+    """
+
+    def __init__(
+        self,
+        transport: Transport | None = None,
+        settings: BatchSettings | None = None,
+        *,
+        max_queued: int = PUBSUB_QUEUE_SIZE,
+        workers: int = PUBSUB_WORKERS,
+    ) -> None:
+        self.transport = transport or CloudPubSubTransport()
+        self.settings = settings or BatchSettings()
+        self.statistics = PublisherStatistics()
+        self._queue: Queue[Message | Event] = Queue(maxsize=max_queued)
+        self._inflight: set[Future[list[str]]] = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pubsub-publisher")
+        self._thread: Thread | None = None
+        self._closed = False
+        self._lock = Lock()
+
+    def publish(self, content: dict | list, topic: str, **attributes: str) -> Future[str]:
+        """
+        Enqueue a message to be published to the given topic.
+
+        Args:
+            content (dict | list): The content of the message
+            topic (str): The topic the message is published to
+            **attributes (str): The attributes of the message
+
+        Returns:
+            Future[str]: The ID of the message once it's published
+
+        """
+        message = Message(topic=topic, content=content, attributes=attributes)
+
+        if self._closed:
+            message.future.set_exception(PublisherClosedError())
+            return message.future
+
+        self._start()
+        try:
+            self._queue.put_nowait(message)
+
+        except Full:
+            logger.warning(f"Dropping message to {topic}: the publisher queue is full")
+            self._count("dropped")
+            message.future.set_exception(PublishQueueFullError())
+            return message.future
+
+        self._count("queued")
+        return message.future
+
+    def flush(self, timeout: float = PUBSUB_FLUSH_TIMEOUT) -> bool:
+        """
+        Send every queued message right away and wait for them to be published.
+
+        Args:
+            timeout (float): Maximum amount of seconds to wait
+
+        Returns:
+            bool: Whether every message was handed to Pub/Sub before the timeout
+
+        """
+        if self._thread is None:
+            return True
+
+        deadline = time.monotonic() + timeout
+        request = Event()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except Full:
+            return False
+
+        if not request.wait(max(deadline - time.monotonic(), 0)):
+            return False
+
+        with self._lock:
+            inflight = set(self._inflight)
+
+        _, pending = wait(inflight, timeout=max(deadline - time.monotonic(), 0))
+        return not pending
+
+    def close(self, timeout: float = PUBSUB_FLUSH_TIMEOUT) -> None:
+        """
+        Stop accepting messages and flush the queued ones.
+
+        Args:
+            timeout (float): Maximum amount of seconds to wait for the queued messages to be published
+
+        """
+        self._closed = True
+        if not self.flush(timeout):
+            logger.error(f"Closed the publisher with {self._queue.qsize()} messages still queued or in flight")
+
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Export the publisher counters along with the amount of queued messages and in-flight batches."""
+        with self._lock:
+            return {
+                **asdict(self.statistics),
+                "queue_size": self._queue.qsize(),
+                "inflight_batches": len(self._inflight),
+                "batched_transport": self.transport.batched,
+            }
+
+    @staticmethod
+    def rejected(futures: Iterable[Future[str]]) -> int:
+        """
+        Count the messages that were dropped instead of queued, because the queue was full or the publisher closed.
+
+        Args:
+            futures (Iterable[Future[str]]): The futures returned when publishing the messages
+
+        Returns:
+            int: The amount of dropped messages
+
+        """
+        return sum(
+            future.done() and isinstance(future.exception(), PublishQueueFullError | PublisherClosedError)
+            for future in futures
+        )
+
+    def _start(self) -> None:
+        """Start the batching thread if it isn't running yet."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="pubsub-batcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Group the queued messages into batches and send each one when it's full or old enough."""
+        batches: dict[str, Batch] = {}
+
+        while True:
+            deadline = min((batch.deadline for batch in batches.values()), default=None)
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except Empty:
+                item = None
+
+            if isinstance(item, Event):
+                for batch in batches.values():
+                    self._dispatch(batch)
+                batches.clear()
+                item.set()
+                continue
+
+            if item is not None:
+                self._add(batches, item)
+
+            now = time.monotonic()
+            for topic in [topic for topic, batch in batches.items() if batch.deadline <= now]:
+                self._dispatch(batches.pop(topic))
+
+    def _add(self, batches: dict[str, Batch], message: Message) -> None:
+        """Add a message to the batch of its topic, sending the batch once it reaches any of its limits."""
+        size = message.size
+        batch = batches.get(message.topic)
+
+        if batch is not None and batch.size + size > self.settings.max_bytes:
+            self._dispatch(batches.pop(message.topic))
+            batch = None
+
+        if batch is None:
+            batch = batches[message.topic] = Batch(
+                topic=message.topic, deadline=time.monotonic() + self.settings.max_latency
+            )
+
+        batch.messages.append(message)
+        batch.size += size
+
+        if len(batch.messages) >= self.settings.max_messages or batch.size >= self.settings.max_bytes:
+            self._dispatch(batches.pop(message.topic))
+
+    def _dispatch(self, batch: Batch) -> None:
+        """Hand a batch to the pool of workers."""
+        future = self._executor.submit(self.transport.publish, batch.topic, batch.messages)
+
+        with self._lock:
+            self._inflight.add(future)
+            self.statistics.batches += 1
+
+        future.add_done_callback(partial(self._complete, batch))
+
+    def _complete(self, batch: Batch, future: Future[list[str]]) -> None:
+        """Resolve the futures of the messages of a sent batch."""
+        with self._lock:
+            self._inflight.discard(future)
+
+        if (exception := future.exception()) is not None:
+            logger.error(f"Failed to publish {len(batch.messages)} messages to {batch.topic}: {exception}")
+            self._count("failed", len(batch.messages))
+            for message in batch.messages:
+                message.future.set_exception(exception)
+            return
+
+        self._count("published", len(batch.messages))
+        for message, id_message in zip(batch.messages, future.result(), strict=True):
+            message.future.set_result(id_message)
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        """Increment the given counter."""
+        with self._lock:
+            setattr(self.statistics, counter, getattr(self.statistics, counter) + amount)
+
+
+publisher = BatchPublisher()
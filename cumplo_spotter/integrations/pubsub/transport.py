@@ -0,0 +1,66 @@
+import json
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from cumplo_common.integrations.cloud_pubsub import CloudPubSub
+
+
+@dataclass
+class Message:
+    topic: str
+    content: dict | list
+    attributes: dict[str, str]
+    future: Future[str] = field(default_factory=Future)
+
+    @property
+    def size(self) -> int:
+        """Approximate size of the message once encoded, used to bound the size of the batches."""
+        return len(json.dumps(self.content)) + sum(len(key) + len(value) for key, value in self.attributes.items())
+
+
+class Transport(ABC):
+    """Sends batches of messages of the same topic to Pub/Sub."""
+
+    # NOTE: Whether a whole batch is sent in a single request, rather than a request per message
+    batched: bool = True
+
+    @abstractmethod
+    def publish(self, topic: str, messages: Sequence[Message]) -> list[str]:
+        """
+        Publish the given messages to the given topic.
+
+        Args:
+            topic (str): The topic the messages are published to
+            messages (Sequence[Message]): The messages to publish
+
+        Returns:
+            list[str]: The IDs of the published messages, in the same order
+
+        """
+
+
+class CloudPubSubTransport(Transport):
+    """
+    Transport through the shared Cloud Pub/Sub integration, which takes care of the client and the topic paths.
+
+    The shared integration only publishes one message at a time, so the messages of a batch still cost a request each.
+    Batching only takes the publishing off the callers and bounds how many requests are in flight.
+    """
+
+    batched = False
+
+    def publish(self, topic: str, messages: Sequence[Message]) -> list[str]:  # noqa: PLR6301
+        """
+        Publish the given messages to the given topic.
+
+        Args:
+            topic (str): The topic the messages are published to
+            messages (Sequence[Message]): The messages to publish
+
+        Returns:
+            list[str]: The IDs of the published messages, in the same order
+
+        """
+        return [CloudPubSub.publish(message.content, topic, **message.attributes) for message in messages]
@@ -1,12 +1,21 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from logging import CRITICAL, DEBUG, INFO, basicConfig, getLogger
+from threading import Thread
 
-import google.cloud.logging
 from cumplo_common.dependencies import authenticate, is_admin
 from cumplo_common.middlewares import PubSubMiddleware
 from fastapi import Depends, FastAPI
 
-from cumplo_spotter.routers import funding_requests
-from cumplo_spotter.utils.constants import IS_TESTING, LOG_FORMAT
+from cumplo_spotter.integrations import cumplo
+from cumplo_spotter.integrations.cumplo.hydration import engine as hydration_engine
+from cumplo_spotter.integrations.history import history as history_store
+from cumplo_spotter.integrations.pubsub import publisher
+from cumplo_spotter.routers import funding_requests, history, metrics, profiling
+from cumplo_spotter.utils.constants import IS_TESTING, LOG_FORMAT, SERVER_TIMING
+from cumplo_spotter.utils.metrics import registry
+from cumplo_spotter.utils.timing import ServerTimingMiddleware
 
 # NOTE: Mute noisy third-party loggers
 for module in ("google", "urllib3", "werkzeug"):
@@ -14,15 +23,65 @@ for module in ("google", "urllib3", "werkzeug"):
 
 getLogger("cumplo_common").setLevel(DEBUG)
 
-if IS_TESTING:
-    basicConfig(level=INFO, format=LOG_FORMAT)
-else:
-    client = google.cloud.logging.Client()
-    client.setup_logging(log_level=DEBUG)
+# NOTE: Logs go to the standard error until Cloud Logging is set up, which happens in the background after startup
+basicConfig(level=INFO if IS_TESTING else DEBUG, format=LOG_FORMAT)
 
+logger = getLogger(__name__)
 
-app = FastAPI(dependencies=[Depends(authenticate)])
+
+def setup_cloud_logging() -> None:
+    """
+    Send the logs to Cloud Logging, replacing the standard error handler it was logging to so far.
+
+    Importing the client library and building the client, which looks up the credentials and project of the instance,
+    take long enough to delay the first request of every new instance, so this runs in a background thread.
+    """
+    root = getLogger()
+    handlers = list(root.handlers)
+    try:
+        import google.cloud.logging  # noqa: PLC0415
+
+        client = google.cloud.logging.Client()
+        client.setup_logging(log_level=DEBUG)
+
+    except Exception:
+        logger.exception("Failed to set up Cloud Logging, logging to the standard error instead")
+        return
+
+    for handler in handlers:
+        root.removeHandler(handler)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """
+    Keep the snapshot warm and export the metrics of the worker while it runs.
+
+    Before the worker exits, the scheduler is stopped, the hydration engine is closed and the queued Pub/Sub messages
+    and snapshots to append to the history are flushed.
+    """
+    if not IS_TESTING:
+        Thread(target=setup_cloud_logging, name="cloud-logging", daemon=True).start()
+
+    registry.start()
+    cumplo.scheduler.start()
+    yield
+    await cumplo.scheduler.stop()
+    await asyncio.to_thread(hydration_engine.close)
+    await asyncio.to_thread(publisher.close)
+    await asyncio.to_thread(history_store.close)
+    registry.stop()
+
+
+app = FastAPI(dependencies=[Depends(authenticate)], lifespan=lifespan)
 app.add_middleware(PubSubMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+if SERVER_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(funding_requests.public.router)
 app.include_router(funding_requests.private.router, dependencies=[Depends(is_admin)])
+app.include_router(metrics.router, dependencies=[Depends(is_admin)])
+app.include_router(profiling.router, dependencies=[Depends(is_admin)])
+app.include_router(history.router, dependencies=[Depends(is_admin)])
@@ -4,9 +4,11 @@ from datetime import datetime
 from typing import Any, ClassVar
 
 from cumplo_common.models import PortfolioCategory
-from cumplo_common.utils.text import clean_text
 from pydantic import BaseModel, Field, field_validator
 
+from cumplo_spotter.models.cumplo.normalization import normalize_payload
+from cumplo_spotter.utils.text import clean_text
+
 from .portfolio import Portfolio
 
 
@@ -66,3 +68,17 @@ class Borrower(BaseModel):
         """Clean the value and checks if the economic sector is 'null' and return None."""
         clean_value = clean_text(value)
         return None if clean_value == "NULL" else clean_value
+
+    @classmethod
+    def normalize(cls, data: dict) -> dict:
+        """Normalize the raw borrower payload without validating it."""
+        return normalize_payload(
+            cls,
+            data,
+            {
+                "name": cls._format_text_field,
+                "description": cls._format_text_field,
+                "economic_sector": cls._format_economic_sector,
+                "portfolio": BorrowerPortfolio.normalize,
+            },
+        )
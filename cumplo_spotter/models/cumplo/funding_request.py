@@ -4,14 +4,15 @@ from functools import cached_property
 from typing import Any
 
 from cumplo_common.models import CreditType, Currency, FundingRequest
-from cumplo_common.utils.text import clean_text
 from pydantic import BaseModel, Field, field_validator, model_validator
 
 from cumplo_spotter.models.cumplo.borrower import Borrower
 from cumplo_spotter.models.cumplo.debtor import Debtor
+from cumplo_spotter.models.cumplo.normalization import normalize_payload
 from cumplo_spotter.models.cumplo.request_duration import CumploFundingRequestDuration
 from cumplo_spotter.models.cumplo.simulation import CumploFundingRequestSimulation
 from cumplo_spotter.utils.constants import DicomMarker
+from cumplo_spotter.utils.text import MarkerMatcher, clean_text
 
 
 class CumploCreditType(StrEnum):
@@ -51,6 +52,17 @@ CREDIT_TYPE_TRANSLATIONS = {
 }
 
 
+DICOM_MARKERS = MarkerMatcher([
+    DicomMarker.BOTH_TRUE,
+    DicomMarker.BOTH_FALSE,
+    DicomMarker.DEBTOR_TRUE,
+    DicomMarker.BORROWER_FALSE,
+    *DicomMarker.BORROWER_TRUE,
+    *DicomMarker.SINGLE_FALSE,
+    *DicomMarker.SINGLE_TRUE,
+])
+
+
 class CumploFundingRequest(BaseModel):
     id: int = Field(..., alias="id_operacion")
     score: Decimal = Field(...)
@@ -89,7 +101,7 @@ class CumploFundingRequest(BaseModel):
         debtor_dicom, borrower_dicom = cls._identify_dicom_status(data)
 
         data["solicitante"]["dicom"] = borrower_dicom
-        for debtor in data["pagadores"]:
+        for debtor in data.get("pagadores", []):
             debtor["dicom"] = debtor_dicom
 
     @staticmethod
@@ -97,29 +109,29 @@ class CumploFundingRequest(BaseModel):
         """Identify the DICOM status of the borrower and debtors."""
         debtor_description = clean_text(data["vitrina_descripcion_empresa_deudora"])
         borrower_description = clean_text(data["vitrina_descripcion_empresa_solicitante"])
-        description = f"{borrower_description} {debtor_description}"
+        markers = DICOM_MARKERS.find(f"{borrower_description} {debtor_description}")
 
         debtor_dicom, borrower_dicom = None, None
 
-        if DicomMarker.BOTH_TRUE in description:
+        if DicomMarker.BOTH_TRUE in markers:
             return True, True
 
-        if DicomMarker.BOTH_FALSE in description:
+        if DicomMarker.BOTH_FALSE in markers:
             return False, False
 
-        if DicomMarker.DEBTOR_TRUE in description:
+        if DicomMarker.DEBTOR_TRUE in markers:
             debtor_dicom = True
 
-        if any(marker in description for marker in DicomMarker.BORROWER_TRUE):
+        if markers.intersection(DicomMarker.BORROWER_TRUE):
             borrower_dicom = True
 
-        if DicomMarker.BORROWER_FALSE in description:
+        if DicomMarker.BORROWER_FALSE in markers:
             borrower_dicom = False
 
-        if borrower_dicom is None and any(marker in description for marker in DicomMarker.SINGLE_FALSE):
+        if borrower_dicom is None and markers.intersection(DicomMarker.SINGLE_FALSE):
             borrower_dicom = False
 
-        elif borrower_dicom is None and any(marker in description for marker in DicomMarker.SINGLE_TRUE):
+        elif borrower_dicom is None and markers.intersection(DicomMarker.SINGLE_TRUE):
             borrower_dicom = True
 
         return debtor_dicom, borrower_dicom
@@ -150,3 +162,46 @@ class CumploFundingRequest(BaseModel):
     def export(self) -> FundingRequest:
         """Export the CumploFundingRequest to a FundingRequest."""
         return FundingRequest.model_validate(self.model_dump(exclude_none=True, exclude_unset=True))
+
+    @classmethod
+    def convert(cls, data: dict, id_borrower: int | None = None) -> FundingRequest:
+        """
+        Build a FundingRequest straight from the raw Cumplo payload, validating it only once.
+
+        It yields the same FundingRequest as validating the payload into a CumploFundingRequest, setting its borrower
+        ID and exporting it, but it skips the intermediate models and doesn't modify the given payload.
+
+        Args:
+            data (dict): The raw funding request payload
+            id_borrower (int | None): The ID of the borrower, which isn't part of the payload
+
+        Returns:
+            FundingRequest: The validated funding request
+
+        """
+        debtor_dicom, borrower_dicom = cls._identify_dicom_status(data)
+        borrower = {**data["solicitante"], "dicom": borrower_dicom}
+        if id_borrower is not None:
+            borrower["id"] = id_borrower
+
+        payload = {**data, "solicitante": borrower}
+        if "pagadores" in data:
+            payload["pagadores"] = [{**debtor, "dicom": debtor_dicom} for debtor in data["pagadores"]]
+
+        normalized = normalize_payload(
+            cls,
+            payload,
+            {
+                **dict.fromkeys(
+                    ("id", "amount", "raised_amount", "maximum_investment", "investors"), cls.parse_integer_fields
+                ),
+                "supporting_documents": cls._format_supporting_documents,
+                "raised_percentage": cls.raised_percentage_validator,
+                "credit_type": cls.credit_type_validator,
+                "duration": CumploFundingRequestDuration.normalize,
+                "simulation": CumploFundingRequestSimulation.normalize,
+                "debtors": lambda debtors: [Debtor.normalize(debtor) for debtor in debtors],
+                "borrower": Borrower.normalize,
+            },
+        )
+        return FundingRequest.model_validate(normalized)
@@ -0,0 +1,38 @@
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from pydantic import BaseModel
+
+
+def normalize_payload(
+    model: type[BaseModel],
+    data: dict,
+    formatters: Mapping[str, Callable[[Any], Any]] | None = None,
+) -> dict:
+    """
+    Rename the aliased keys of a raw Cumplo payload to the field names of the given model, without validating it.
+
+    It mirrors dumping a validated instance with `exclude_unset` and `exclude_none`: missing keys and `None` values
+    are left out, so the result can be validated straight into its `cumplo_common` counterpart.
+
+    Args:
+        model (type[BaseModel]): The Cumplo model that describes the payload
+        data (dict): The raw payload
+        formatters (Mapping[str, Callable[[Any], Any]] | None): Formatters of the values by field name
+
+    Returns:
+        dict: The normalized payload
+
+    """
+    formatters = formatters or {}
+    normalized = {}
+
+    for name, field in model.model_fields.items():
+        if (alias := field.alias or name) not in data:
+            continue
+
+        value = formatters[name](data[alias]) if name in formatters else data[alias]
+        if value is not None:
+            normalized[name] = value
+
+    return normalized
@@ -18,6 +18,11 @@ class Portfolio(BaseModel):
 
     PORTFOLIO_STATUS_MAPPING: ClassVar[dict] = {}
 
+    @classmethod
+    def normalize(cls, value: list[dict] | dict) -> dict:
+        """Transform the raw portfolio data without validating it."""
+        return cls._format_portfolio_data(value)
+
     @model_validator(mode="before")
     @classmethod
     def _format_portfolio_data(cls, value: list[dict]) -> dict:
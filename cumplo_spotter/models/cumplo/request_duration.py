@@ -1,6 +1,8 @@
 from cumplo_common.models import DurationUnit
 from pydantic import BaseModel, Field, field_validator
 
+from cumplo_spotter.models.cumplo.normalization import normalize_payload
+
 
 class CumploFundingRequestDuration(BaseModel):
     unit: DurationUnit = Field(..., alias="type")
@@ -14,3 +16,8 @@ class CumploFundingRequestDuration(BaseModel):
     def unit_formatter(cls, value: str) -> DurationUnit:
         """Format the unit value."""
         return DurationUnit(value.strip().upper())
+
+    @classmethod
+    def normalize(cls, data: dict) -> dict:
+        """Normalize the raw duration payload without validating it."""
+        return normalize_payload(cls, data, {"unit": cls.unit_formatter})
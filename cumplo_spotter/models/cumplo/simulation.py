@@ -1,10 +1,11 @@
 from datetime import datetime
 from typing import Self
 
-from cumplo_common.utils.text import clean_text
 from pydantic import BaseModel, Field, model_validator
 
+from cumplo_spotter.models.cumplo.normalization import normalize_payload
 from cumplo_spotter.utils.constants import EXIT_FEE_KEY, SIMULATION_AMOUNT, UPFRONT_FEE_KEY
+from cumplo_spotter.utils.text import clean_text
 
 
 class CumploSimulationInstallment(BaseModel):
@@ -29,6 +30,13 @@ class CumploSimulationInstallment(BaseModel):
         self.amount -= self.exit_fee  # NOTE: The exit fee has to be subtracted from the received amount
         return self
 
+    @classmethod
+    def normalize(cls, values: dict) -> dict:
+        """Normalize the raw installment payload without validating it."""
+        installment = normalize_payload(cls, cls.round_values({**values}))
+        installment["amount"] -= installment["exit_fee"]
+        return installment
+
 
 class CumploFundingRequestSimulation(BaseModel):
     exit_fee: int = Field(...)
@@ -42,6 +50,13 @@ class CumploFundingRequestSimulation(BaseModel):
         """Format the values to the expected format."""
         return cls._unpack_simulation(values)
 
+    @classmethod
+    def normalize(cls, values: dict) -> dict:
+        """Normalize the raw simulation payload without validating it."""
+        simulation = cls._unpack_simulation(values)
+        simulation["installments"] = [CumploSimulationInstallment.normalize(x) for x in simulation["installments"]]
+        return simulation
+
     @staticmethod
     def _unpack_simulation(values: dict) -> dict:
         """Unpack the simulation values."""
@@ -0,0 +1,36 @@
+from enum import StrEnum
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+
+class FundingRequestEventType(StrEnum):
+    SNAPSHOT = "SNAPSHOT"
+    DELTA = "DELTA"
+
+
+class FundingRequestUpdate(BaseModel):
+    id: int = Field(...)
+    changes: dict[str, Any] = Field(...)
+
+
+class FundingRequestEvent(BaseModel):
+    """
+    Event describing the available funding requests.
+
+    A SNAPSHOT carries every available funding request in `added` and works as a resync point. A DELTA only carries
+    what changed since the event with version `base_version`: the added funding requests, the changed fields of the
+    updated ones and the IDs of the ones that were removed or completed.
+    """
+
+    type: FundingRequestEventType = Field(...)
+    version: int = Field(...)
+    base_version: int | None = Field(None)
+    added: list[dict] = Field(default_factory=list)
+    updated: list[FundingRequestUpdate] = Field(default_factory=list)
+    removed: list[int] = Field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        """Check if the event doesn't carry any change."""
+        return self.type == FundingRequestEventType.DELTA and not (self.added or self.updated or self.removed)
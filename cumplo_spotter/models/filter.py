@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from logging import getLogger
+from logging import DEBUG, getLogger
 from typing import final
 
 from cumplo_common.models import FilterConfiguration, FundingRequest
@@ -19,9 +19,9 @@ class Filter(ABC):
     @final
     def apply(self, funding_request: FundingRequest) -> bool:
         """Apply the filter to the funding request."""
-        if not (result := self._apply(funding_request)):
+        if not (result := self._apply(funding_request)) and logger.isEnabledFor(DEBUG):
             filter_name = f"'{self.configuration.name}' {self.__class__.__name__}"
-            logger.info(f"Funding request {funding_request.id} filtered out by {filter_name}")
+            logger.debug(f"Funding request {funding_request.id} filtered out by {filter_name}")
         return result
 
 
@@ -133,12 +133,11 @@ class PortfolioFilter(Filter):
                     percentage_base=filter_.percentage_base,
                 )
 
-                if filter_.minimum is not None and value < filter_.minimum:
-                    logger.info(f"Funding request {funding_request.id} filtered out by {filter_}")
-                    return False
-
-                if filter_.maximum is not None and value > filter_.maximum:
-                    logger.info(f"Funding request {funding_request.id} filtered out by {filter_}")
+                if (filter_.minimum is not None and value < filter_.minimum) or (
+                    filter_.maximum is not None and value > filter_.maximum
+                ):
+                    if logger.isEnabledFor(DEBUG):
+                        logger.debug(f"Funding request {funding_request.id} filtered out by {filter_}")
                     return False
 
         return True
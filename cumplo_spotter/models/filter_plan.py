@@ -0,0 +1,292 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from logging import getLogger
+from threading import Lock
+from typing import Any, Self
+
+from cumplo_common.models import FilterConfiguration, FundingRequest
+
+from cumplo_spotter.models.cumplo.request_duration import DurationUnit
+
+logger = getLogger(__name__)
+
+Mask = int
+
+# NOTE: Filters that compare a single column against a configuration value: (filter, attribute, operation, column)
+THRESHOLD_FILTERS = (
+    ("MinimumAmountFilter", "minimum_amount", "at_least", "amount"),
+    ("CreditTypeFilter", "target_credit_types", "one_of", "credit_type"),
+    ("MinimumInvestmentFilter", "minimum_investment_amount", "at_least", "maximum_investment"),
+    ("MinimumScoreFilter", "minimum_score", "at_least", "score"),
+    ("MinimumIRRFilter", "minimum_irr", "at_least", "irr"),
+    ("MinimumMonthlyProfitFilter", "minimum_monthly_profit_rate", "at_least", "monthly_profit_rate"),
+    ("MinimumDurationFilter", "minimum_duration", "at_least", "duration"),
+    ("MaximumDurationFilter", "maximum_duration", "at_most", "duration"),
+)
+
+# NOTE: Columns that can be indexed to answer threshold predicates with a binary search
+INDEXABLE_COLUMNS = {column for _, _, operation, column in THRESHOLD_FILTERS if operation in {"at_least", "at_most"}}
+
+
+@dataclass(frozen=True)
+class Predicate:
+    name: str = field(compare=False)
+    operation: str
+    column: str
+    value: Any
+
+
+class ThresholdIndex:
+    """
+    Sorted index of a numeric column that answers threshold predicates with a binary search.
+
+    The suffix masks are precomputed, so `value >= threshold` is a bisection plus a lookup instead of a full scan.
+    """
+
+    def __init__(self, values: Sequence[Any]) -> None:
+        order = sorted(range(len(values)), key=values.__getitem__)
+        self.values = [values[position] for position in order]
+        self.all = (1 << len(values)) - 1
+
+        # NOTE: suffixes[i] holds the bits of every position whose value ranks i or higher
+        self.suffixes = [0] * (len(order) + 1)
+        for rank in range(len(order) - 1, -1, -1):
+            self.suffixes[rank] = self.suffixes[rank + 1] | (1 << order[rank])
+
+    def at_least(self, threshold: Any) -> Mask:
+        """Bitmask of the positions whose value is greater than or equal to the threshold."""
+        return self.suffixes[bisect_left(self.values, threshold)]
+
+    def at_most(self, threshold: Any) -> Mask:
+        """Bitmask of the positions whose value is lower than or equal to the threshold."""
+        return self.all & ~self.suffixes[bisect_right(self.values, threshold)]
+
+
+class FundingRequestColumns:
+    """
+    Columnar view of a list of funding requests.
+
+    Every predicate is evaluated over a whole column at once and produces a bitmask where the bit `i` is set when the
+    funding request `i` satisfies it. Masks are memoized, so configurations sharing a threshold evaluate it once.
+
+    When indexed, threshold predicates are answered by a `ThresholdIndex` built on first use of each column, which
+    pays off when many configurations are evaluated over the same funding requests.
+    """
+
+    def __init__(self, funding_requests: Sequence[FundingRequest], *, indexed: bool = False) -> None:
+        self.funding_requests = tuple(funding_requests)
+        self.indexed = indexed
+        self.all = (1 << len(self.funding_requests)) - 1
+        self.columns: dict[str, tuple] = {
+            "amount": tuple(x.amount for x in self.funding_requests),
+            "score": tuple(x.score for x in self.funding_requests),
+            "irr": tuple(x.irr for x in self.funding_requests),
+            "monthly_profit_rate": tuple(x.monthly_profit_rate for x in self.funding_requests),
+            "maximum_investment": tuple(x.maximum_investment for x in self.funding_requests),
+            "duration": tuple(self.duration_in_days(x) for x in self.funding_requests),
+            "credit_type": tuple(x.credit_type for x in self.funding_requests),
+            "dicom": tuple(self._has_dicom(x) for x in self.funding_requests),
+            "portfolios": tuple(self._portfolios(x) for x in self.funding_requests),
+        }
+        self._masks: dict[Predicate, Mask] = {}
+        self._indexes: dict[str, ThresholdIndex] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.funding_requests)
+
+    def mask(self, predicate: Predicate) -> Mask:
+        """
+        Get the mask of the funding requests that satisfy the given predicate.
+
+        Args:
+            predicate (Predicate): The predicate to evaluate
+
+        Returns:
+            Mask: Bitmask of the funding requests that satisfy the predicate
+
+        """
+        if (mask := self._masks.get(predicate)) is not None:
+            return mask
+
+        operation: Callable[[str, Any], Mask] = getattr(self, f"_{predicate.operation}")
+        mask = operation(predicate.column, predicate.value)
+
+        with self._lock:
+            self._masks[predicate] = mask
+        return mask
+
+    def select(self, mask: Mask) -> list[FundingRequest]:
+        """
+        Get the funding requests whose bit is set in the given mask, keeping their original order.
+
+        Args:
+            mask (Mask): Bitmask of the funding requests to select
+
+        Returns:
+            list[FundingRequest]: The selected funding requests
+
+        """
+        bits = bin(mask)[:1:-1]
+        return [x for x, bit in zip(self.funding_requests, bits, strict=False) if bit == "1"]
+
+    @staticmethod
+    def _pack(values: Iterable[bool]) -> Mask:
+        """Pack a column of booleans into a bitmask."""
+        return int("".join("1" if value else "0" for value in values)[::-1] or "0", 2)
+
+    def index(self, column: str) -> ThresholdIndex:
+        """
+        Get the threshold index of the given column, building it on first use.
+
+        Args:
+            column (str): The name of the numeric column to index
+
+        Returns:
+            ThresholdIndex: The sorted index of the column
+
+        """
+        if (index := self._indexes.get(column)) is not None:
+            return index
+
+        index = ThresholdIndex(self.columns[column])
+        with self._lock:
+            self._indexes[column] = index
+        return index
+
+    def _at_least(self, column: str, threshold: Any) -> Mask:
+        if self.indexed and column in INDEXABLE_COLUMNS:
+            return self.index(column).at_least(threshold)
+        return self._pack(value >= threshold for value in self.columns[column])
+
+    def _at_most(self, column: str, threshold: Any) -> Mask:
+        if self.indexed and column in INDEXABLE_COLUMNS:
+            return self.index(column).at_most(threshold)
+        return self._pack(value <= threshold for value in self.columns[column])
+
+    def _one_of(self, column: str, values: frozenset) -> Mask:
+        return self._pack(value in values for value in self.columns[column])
+
+    def _is_false(self, column: str, _: Any) -> Mask:
+        return self._pack(not value for value in self.columns[column])
+
+    def _within(self, column: str, bounds: tuple) -> Mask:
+        unit, category, percentage_unit, percentage_base, minimum, maximum = bounds
+
+        def satisfies(portfolios: tuple) -> bool:
+            for portfolio in portfolios:
+                value = portfolio.get(
+                    unit=unit,
+                    category=category,
+                    percentage_unit=percentage_unit,
+                    percentage_base=percentage_base,
+                )
+                if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                    return False
+            return True
+
+        return self._pack(satisfies(portfolios) for portfolios in self.columns[column])
+
+    @staticmethod
+    def duration_in_days(funding_request: FundingRequest) -> int:
+        """Duration of the funding request in days."""
+        duration = funding_request.duration
+        return duration.value if duration.unit == DurationUnit.DAY else duration.value * 30
+
+    @staticmethod
+    def _has_dicom(funding_request: FundingRequest) -> bool:
+        """Check if the debtors, or the borrower when there are none, have DICOM."""
+        dicoms = [debtor.dicom for debtor in funding_request.debtors] or [funding_request.borrower.dicom]
+        return any(dicoms)
+
+    @staticmethod
+    def _portfolios(funding_request: FundingRequest) -> tuple:
+        """Portfolios of the debtors and the borrower of the funding request."""
+        return (*(debtor.portfolio for debtor in funding_request.debtors), funding_request.borrower.portfolio)
+
+
+@dataclass(frozen=True)
+class FilterResult:
+    mask: Mask
+    # NOTE: Funding requests rejected by each filter, only counting the first filter that rejected each one
+    rejections: dict[str, Mask] = field(default_factory=dict)
+
+    @property
+    def rejected(self) -> dict[str, int]:
+        """Amount of funding requests rejected by each filter."""
+        return {name: mask.bit_count() for name, mask in self.rejections.items()}
+
+
+@dataclass(frozen=True)
+class FilterPlan:
+    """
+    Filter configuration compiled into the list of predicates it actually enables.
+
+    It yields the same results as applying every `Filter` of `cumplo_spotter.models.filter` one funding request at a
+    time, but disabled filters are skipped at compile time and the enabled ones are evaluated column-wise.
+    """
+
+    name: str | None
+    predicates: tuple[Predicate, ...]
+
+    @classmethod
+    def compile(cls, configuration: FilterConfiguration) -> Self:
+        """
+        Compile the given filter configuration.
+
+        Args:
+            configuration (FilterConfiguration): The filter configuration to compile
+
+        Returns:
+            FilterPlan: The compiled plan
+
+        """
+        predicates = []
+
+        for name, attribute, operation, column in THRESHOLD_FILTERS:
+            if (value := getattr(configuration, attribute)) is None:
+                continue
+
+            if operation == "one_of":
+                value = frozenset(value)
+            predicates.append(Predicate(name, operation, column, value))
+
+        if not configuration.ignore_dicom:
+            predicates.append(Predicate("DicomFilter", "is_false", "dicom", None))
+
+        for filter_ in configuration.portfolio or []:
+            bounds = (
+                filter_.unit,
+                filter_.category,
+                filter_.percentage_unit,
+                filter_.percentage_base,
+                filter_.minimum,
+                filter_.maximum,
+            )
+            predicates.append(Predicate("PortfolioFilter", "within", "portfolios", bounds))
+
+        return cls(name=configuration.name, predicates=tuple(predicates))
+
+    def evaluate(self, columns: FundingRequestColumns) -> FilterResult:
+        """
+        Evaluate the plan over the given columns.
+
+        Args:
+            columns (FundingRequestColumns): The columnar view of the funding requests
+
+        Returns:
+            FilterResult: The funding requests that satisfy every predicate and the ones each filter rejected
+
+        """
+        mask, rejections = columns.all, {}
+        for predicate in self.predicates:
+            if not mask:
+                break
+
+            kept = mask & columns.mask(predicate)
+            if rejected := mask & ~kept:
+                rejections[predicate.name] = rejections.get(predicate.name, 0) | rejected
+            mask = kept
+
+        return FilterResult(mask, rejections)
@@ -0,0 +1,243 @@
+import base64
+import binascii
+import json
+import time
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Self
+
+from cumplo_common.models import FundingRequest
+
+from cumplo_spotter.models.filter_plan import FundingRequestColumns
+from cumplo_spotter.utils.constants import CUMPLO_CACHE_TTL
+
+# NOTE: The funding requests can be sorted by any numeric column or by their ID
+SORT_FIELDS = ("monthly_profit_rate", "irr", "score", "amount", "maximum_investment", "duration", "id")
+DEFAULT_SORT = "-monthly_profit_rate"
+
+# NOTE: Serialized views built by the refresh, which are carried over when the snapshot is shared with other workers
+SERIALIZED_VIEWS = ("payloads", "serialized", "serialized_list")
+
+
+class InvalidCursorError(Exception):
+    """Exception raised when a pagination cursor is malformed or belongs to another sort."""
+
+
+class InvalidSortError(Exception):
+    """Exception raised when sorting by an unknown field."""
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position after the last listed funding request, which stays valid across snapshots."""
+
+    sort: str
+    value: float
+    id: int
+
+    def encode(self) -> str:
+        """Encode the cursor as an opaque URL-safe token."""
+        return base64.urlsafe_b64encode(json.dumps([self.sort, self.value, self.id]).encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> Self:
+        """
+        Decode a cursor from its opaque token.
+
+        Args:
+            token (str): The token returned along with the previous page
+
+        Raises:
+            InvalidCursorError: If the token isn't a valid cursor
+
+        Returns:
+            Cursor: The decoded cursor
+
+        """
+        try:
+            sort, value, id_ = json.loads(base64.urlsafe_b64decode(token.encode()))
+            return cls(sort=str(sort), value=float(value), id=int(id_))
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as error:
+            raise InvalidCursorError from error
+
+
+@dataclass(frozen=True)
+class SortOrder:
+    """Funding requests IDs sorted ascending by a field, with the ID breaking ties, ready for keyset pagination."""
+
+    keys: list[tuple[float, int]]
+
+    def page(self, after: tuple[float, int] | None, limit: int | None, *, descending: bool) -> list[tuple[float, int]]:
+        """
+        Get the sort keys of the page that follows the given key.
+
+        Args:
+            after (tuple[float, int] | None): Sort key of the last listed funding request. Starts over if not given.
+            limit (int | None): Maximum amount of keys. Lists every remaining one if not given.
+            descending (bool): Whether to walk the order backwards
+
+        Returns:
+            list[tuple[float, int]]: The sort keys of the page, each one holding the value and the ID
+
+        """
+        if descending:
+            end = len(self.keys) if after is None else bisect_left(self.keys, after)
+            start = 0 if limit is None else max(0, end - limit)
+            return self.keys[start:end][::-1]
+
+        start = 0 if after is None else bisect_right(self.keys, after)
+        end = len(self.keys) if limit is None else start + limit
+        return self.keys[start:end]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Immutable view of the available funding requests, built once per refresh and shared by every request.
+
+    Besides the funding requests as listed, it holds them sorted by monthly profit rate and indexed by ID, so readers
+    never sort, copy nor scan them.
+    """
+
+    version: int
+    funding_requests: tuple[FundingRequest, ...]
+    created_at: float = field(default_factory=time.time)
+    by_profit: tuple[FundingRequest, ...] = field(init=False, repr=False, compare=False)
+    index: dict[int, FundingRequest] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        by_profit = tuple(sorted(self.funding_requests, key=lambda x: x.monthly_profit_rate, reverse=True))
+        object.__setattr__(self, "by_profit", by_profit)
+        object.__setattr__(self, "index", {funding_request.id: funding_request for funding_request in by_profit})
+
+    def __getstate__(self) -> dict:
+        # NOTE: The funding requests and their serialized views are pickled, the rest are rebuilt as some hold locks
+        state = {"version": self.version, "funding_requests": self.funding_requests, "created_at": self.created_at}
+        return state | {name: self.__dict__[name] for name in SERIALIZED_VIEWS if name in self.__dict__}
+
+    def __setstate__(self, state: dict) -> None:
+        for key, value in state.items():
+            object.__setattr__(self, key, value)
+        self.__post_init__()
+
+    @property
+    def age(self) -> float:
+        """Seconds elapsed since the snapshot was built."""
+        return time.time() - self.created_at
+
+    @property
+    def is_stale(self) -> bool:
+        """Check if the snapshot outlived the cache TTL."""
+        return self.age > CUMPLO_CACHE_TTL
+
+    @cached_property
+    def payloads(self) -> dict[int, dict]:
+        """Serialized funding requests by ID sorted by monthly profit rate, built by `precompute`."""
+        return {funding_request.id: funding_request.json() for funding_request in self.by_profit}
+
+    @cached_property
+    def serialized(self) -> dict[int, bytes]:
+        """JSON encoded funding requests by ID sorted by monthly profit rate, built by `precompute`."""
+        return {id_: self.encode(payload) for id_, payload in self.payloads.items()}
+
+    @cached_property
+    def serialized_list(self) -> bytes:
+        """JSON encoded list of every funding request sorted by monthly profit rate, built by `precompute`."""
+        return b"[" + b",".join(self.serialized.values()) + b"]"
+
+    def precompute(self) -> None:
+        """Build the serialized views of the funding requests, so the first request after a refresh doesn't pay them."""
+        for name in SERIALIZED_VIEWS:
+            getattr(self, name)
+
+    @property
+    def etag(self) -> str:
+        """Entity tag of the whole snapshot."""
+        return f'"{self.version}"'
+
+    def serialize(self, ids: Iterable[int]) -> bytes:
+        """
+        Join the already encoded funding requests with the given IDs into a JSON list.
+
+        Args:
+            ids (Iterable[int]): IDs of funding requests of the snapshot, in the order they should be listed
+
+        Returns:
+            bytes: The JSON encoded list
+
+        """
+        return b"[" + b",".join(self.serialized[id_] for id_ in ids) + b"]"
+
+    @staticmethod
+    def encode(payload: dict) -> bytes:
+        """Encode the payload the same way FastAPI's JSONResponse does."""
+        return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+    @cached_property
+    def columns(self) -> FundingRequestColumns:
+        """Indexed columnar view of the funding requests, built on first use and shared by every filter."""
+        return FundingRequestColumns(self.funding_requests, indexed=True)
+
+    @cached_property
+    def orders(self) -> dict[str, SortOrder]:
+        """Order of the funding requests by every sortable field, built on first use."""
+        ids = [funding_request.id for funding_request in self.funding_requests]
+        columns = {**self.columns.columns, "id": ids}
+        return {name: SortOrder(sorted(zip(map(float, columns[name]), ids, strict=True))) for name in SORT_FIELDS}
+
+    def page(
+        self, sort: str = DEFAULT_SORT, limit: int | None = None, cursor: str | None = None
+    ) -> tuple[list[int], str | None]:
+        """
+        Get a page of the funding requests.
+
+        Args:
+            sort (str): Field to sort by, prefixed with a minus sign to sort descending
+            limit (int | None): Maximum amount of funding requests. Lists every remaining one if not given.
+            cursor (str | None): Cursor returned along with the previous page. Starts over if not given.
+
+        Raises:
+            InvalidSortError: If the sort field is unknown
+            InvalidCursorError: If the cursor is malformed or belongs to another sort
+
+        Returns:
+            tuple[list[int], str | None]: The IDs of the page and the cursor of the next one, if any
+
+        """
+        field_, descending = sort.removeprefix("-"), sort.startswith("-")
+        if field_ not in SORT_FIELDS:
+            raise InvalidSortError
+
+        after = None
+        if cursor is not None:
+            if (decoded := Cursor.decode(cursor)).sort != sort:
+                raise InvalidCursorError
+            after = (decoded.value, decoded.id)
+
+        # NOTE: One extra key is requested to know whether there's a next page
+        keys = self.orders[field_].page(after, None if limit is None else limit + 1, descending=descending)
+        if limit is None or len(keys) <= limit:
+            return [id_ for _, id_ in keys], None
+
+        value, id_ = keys[limit - 1]
+        return [id_ for _, id_ in keys[:limit]], Cursor(sort=sort, value=value, id=id_).encode()
+
+    def project(self, ids: Iterable[int], fields: Iterable[str]) -> bytes:
+        """
+        Encode a JSON list of the funding requests with the given IDs keeping only the given top-level fields.
+
+        Args:
+            ids (Iterable[int]): IDs of funding requests of the snapshot, in the order they should be listed
+            fields (Iterable[str]): Top-level fields to keep
+
+        Returns:
+            bytes: The JSON encoded list
+
+        """
+        fields = tuple(fields)
+        projections = (
+            {key: payload[key] for key in fields if key in payload} for payload in map(self.payloads.__getitem__, ids)
+        )
+        return b"[" + b",".join(map(self.encode, projections)) + b"]"
@@ -2,27 +2,111 @@ from http import HTTPStatus
 from logging import getLogger
 from typing import cast
 
-from cumplo_common.integrations.cloud_pubsub import CloudPubSub
 from cumplo_common.models import PrivateEvent, User
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from fastapi.requests import Request
 
-from cumplo_spotter.business import funding_requests
+from cumplo_spotter.business import events, filters, funding_requests
 from cumplo_spotter.integrations import cumplo
+from cumplo_spotter.integrations.cumplo.governor import governor
+from cumplo_spotter.integrations.cumplo.simulator import simulator
+from cumplo_spotter.integrations.pubsub import publisher
+from cumplo_spotter.utils.profiling import ProfiledRoute
 
 logger = getLogger(__name__)
 
-router = APIRouter(prefix="/funding-requests")
+router = APIRouter(prefix="/funding-requests", route_class=ProfiledRoute)
 
 
 @router.post(path="/fetch", status_code=HTTPStatus.NO_CONTENT)
-def _fetch_funding_requests(request: Request) -> None:
-    """Fetch a list of funding requests and emits an event containing them."""
+def _fetch_funding_requests(request: Request, response: Response) -> None:
+    """Fetch a list of funding requests and emits an event with the changes since the last one."""
     user = cast(User, request.state.user)
 
-    cumplo.cache.clear()
-    available_funding_requests = funding_requests.get_available()
+    # NOTE: The scheduler keeps the snapshot fresh, so its latest one is reused instead of refreshing it again
+    snapshot = cumplo.get_snapshot()
+    available_funding_requests = funding_requests.get_available(snapshot)
     logger.info(f"Found {len(available_funding_requests)} available funding requests")
 
-    if content := [funding_request.json() for funding_request in available_funding_requests]:
-        CloudPubSub.publish(content=content, topic=PrivateEvent.FUNDING_REQUEST_AVAILABLE, id_user=str(user.id))
+    if not (event := events.tracker.track(str(user.id), available_funding_requests)):
+        return
+
+    logger.info(f"Publishing {event.type} version {event.version} to user {user.id}")
+    content = event.model_dump(mode="json")
+    future = publisher.publish(content=content, topic=PrivateEvent.FUNDING_REQUEST_AVAILABLE, id_user=str(user.id))
+
+    # NOTE: The next deltas would be based on an event the user never got, so it starts over from a snapshot instead
+    if publisher.rejected([future]):
+        logger.warning(f"Dropped {event.type} version {event.version} to user {user.id}")
+        events.tracker.reset(str(user.id))
+        response.headers["X-Dropped-Notifications"] = "1"
+
+
+@router.post(path="/promising/batch", status_code=HTTPStatus.OK)
+def _get_promising_funding_requests_batch(
+    response: Response,
+    payload: list[User],
+    publish: bool = False,  # noqa: FBT001, FBT002
+) -> dict[str, list[int]]:
+    """Evaluate the filters of many users in a single pass and optionally notify each one about its matches."""
+    promising = funding_requests.get_promising_batch(payload)
+
+    if publish:
+        futures = []
+        for id_user, promising_funding_requests in promising.items():
+            logger.info(f"Notifying about {len(promising_funding_requests)} funding requests to user {id_user}")
+            futures.extend(
+                publisher.publish(funding_request.json(), PrivateEvent.FUNDING_REQUEST_PROMISING, id_user=id_user)
+                for funding_request in promising_funding_requests
+            )
+
+        if dropped := publisher.rejected(futures):
+            logger.warning(f"Dropped {dropped} of {len(futures)} promising funding request notifications")
+            response.headers["X-Dropped-Notifications"] = str(dropped)
+
+    return {
+        id_user: [funding_request.id for funding_request in promising_funding_requests]
+        for id_user, promising_funding_requests in promising.items()
+    }
+
+
+@router.get(path="/cache", status_code=HTTPStatus.OK)
+def _get_cache_statistics() -> dict:
+    """Get the hit, miss and refresh counters of the funding requests cache."""
+    return cumplo.cache.stats()
+
+
+@router.get(path="/scheduler", status_code=HTTPStatus.OK)
+def _get_scheduler_statistics() -> dict:
+    """Get the run counters and the cadence of the scheduler that keeps the funding requests snapshot warm."""
+    return cumplo.scheduler.stats()
+
+
+@router.get(path="/governor", status_code=HTTPStatus.OK)
+def _get_governor_statistics() -> dict:
+    """Get the request counters, the concurrency limit and the circuit breaker state of the calls to Cumplo."""
+    return governor.stats()
+
+
+@router.get(path="/simulator", status_code=HTTPStatus.OK)
+def _get_simulator_statistics() -> dict:
+    """Get the local and remote simulation counters along with the model calibrated for every product."""
+    return simulator.stats()
+
+
+@router.get(path="/filters/cache", status_code=HTTPStatus.OK)
+def _get_filter_cache_statistics() -> dict:
+    """Get the hit and miss counters of the filter results cache, which show how much users share their filters."""
+    return filters.results.stats()
+
+
+@router.get(path="/filters/rejections", status_code=HTTPStatus.OK)
+def _get_filter_rejection_statistics() -> dict:
+    """Get the amount of funding requests rejected by each filter, overall and per filter configuration."""
+    return filters.rejections.stats()
+
+
+@router.get(path="/publisher", status_code=HTTPStatus.OK)
+def _get_publisher_statistics() -> dict:
+    """Get the queued, published, failed and dropped counters of the Pub/Sub publisher."""
+    return publisher.stats()
@@ -1,37 +1,203 @@
+import hashlib
+import time
+from collections.abc import Callable, Generator, Iterator, Sequence
 from http import HTTPStatus
 from logging import getLogger
-from typing import cast
+from typing import Annotated, cast
 
-from cumplo_common.integrations.cloud_pubsub import CloudPubSub
 from cumplo_common.models import FundingRequest, PrivateEvent, User
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from fastapi.requests import Request
+from fastapi.responses import StreamingResponse
 
 from cumplo_spotter.business import funding_requests
+from cumplo_spotter.integrations.pubsub import publisher
+from cumplo_spotter.models.snapshot import (
+    DEFAULT_SORT,
+    SORT_FIELDS,
+    InvalidCursorError,
+    InvalidSortError,
+    Snapshot,
+)
+from cumplo_spotter.utils.constants import PAGE_MAX_SIZE
+from cumplo_spotter.utils.profiling import ProfiledRoute
+from cumplo_spotter.utils.timing import phase
 
 logger = getLogger(__name__)
 
 
-router = APIRouter(prefix="/funding-requests")
+router = APIRouter(prefix="/funding-requests", route_class=ProfiledRoute)
 
+# NOTE: Top-level fields of the funding requests that can be projected
+PROJECTABLE_FIELDS = frozenset(FundingRequest.model_fields) | frozenset(FundingRequest.model_computed_fields)
 
-@router.get("", status_code=HTTPStatus.OK)
-def _get_funding_requests(_request: Request) -> list[dict]:
-    """Get a list of available funding requests."""
-    available_funding_requests = funding_requests.get_available()
-    return [funding_request.json() for funding_request in available_funding_requests]
 
+def _set_snapshot_headers(response: Response, snapshot: Snapshot) -> None:
+    """Describe the snapshot the response was built from."""
+    response.headers["Age"] = str(int(snapshot.age))
+    response.headers["X-Snapshot-Version"] = str(snapshot.version)
+    response.headers["X-Snapshot-Stale"] = str(snapshot.is_stale).lower()
 
-@router.get("/promising", status_code=HTTPStatus.OK)
-def _get_promising_funding_requests(request: Request) -> list[dict]:
+
+def _is_not_modified(request: Request, etag: str) -> bool:
+    """Check if the client already holds the representation with the given entity tag."""
+    if not (header := request.headers.get("If-None-Match")):
+        return False
+
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _list_etag(snapshot: Snapshot, ids: Sequence[int], *fields: str) -> str:
+    """Entity tag of a list of funding requests of the snapshot, derived from its version and the listed content."""
+    digest = hashlib.blake2b(",".join([*map(str, ids), *fields]).encode(), digest_size=8).hexdigest()
+    return f'"{snapshot.version}-{digest}"'
+
+
+def _snapshot_response(request: Request, snapshot: Snapshot, etag: str, content: Callable[[], bytes]) -> Response:
+    """
+    Serve already encoded funding requests of the snapshot, or a bodiless 304 if the client holds them already.
+
+    Entity tags are derived from the snapshot version, so clients polling between refreshes barely cost anything.
+    """
+    if _is_not_modified(request, etag):
+        response = Response(status_code=HTTPStatus.NOT_MODIFIED)
+    else:
+        with phase("serialize"):
+            body = content()
+        response = Response(content=body, media_type="application/json")
+
+    response.headers["ETag"] = etag
+    _set_snapshot_headers(response, snapshot)
+    return response
+
+
+@router.get("", status_code=HTTPStatus.OK, response_model=list[dict])
+def _get_funding_requests(
+    request: Request,
+    limit: Annotated[int | None, Query(ge=1, le=PAGE_MAX_SIZE)] = None,
+    cursor: Annotated[str | None, Query()] = None,
+    sort: Annotated[str | None, Query(description=f"One of {', '.join(SORT_FIELDS)}, prefixed by - to reverse")] = None,
+    fields: Annotated[str | None, Query(description="Comma separated top-level fields to keep")] = None,
+) -> Response:
+    """
+    Get a list of available funding requests.
+
+    When paginated, the cursor of the next page is returned in the `X-Next-Cursor` header.
+
+    Raises:
+        HTTPException: If the sort field, the cursor or the projected fields are invalid.
+
+    """
+    snapshot = funding_requests.get_snapshot()
+    if limit is None and cursor is None and sort is None and fields is None:
+        return _snapshot_response(request, snapshot, snapshot.etag, lambda: snapshot.serialized_list)
+
+    projection = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip())) if fields else ()
+    if unknown := set(projection) - PROJECTABLE_FIELDS:
+        detail = f"Unknown fields {', '.join(sorted(unknown))}"
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+
+    try:
+        ids, next_cursor = snapshot.page(sort or DEFAULT_SORT, limit, cursor)
+
+    except InvalidSortError as error:
+        detail = f"Unknown sort field, expected one of {', '.join(SORT_FIELDS)}"
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail) from error
+
+    except InvalidCursorError as error:
+        detail = "Invalid cursor for the given sort"
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail) from error
+
+    etag = _list_etag(snapshot, ids, *projection)
+    content = (lambda: snapshot.project(ids, projection)) if projection else (lambda: snapshot.serialize(ids))
+    response = _snapshot_response(request, snapshot, etag, content)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def _stream_lines() -> Iterator[bytes]:
+    """
+    Encode every available funding request as a JSON line, as soon as it's available, followed by a summary line.
+
+    A refresh that fails midway doesn't break the stream: the summary tells the client it's incomplete instead.
+
+    Yields:
+        bytes: The encoded funding requests and the summary record
+
+    """
+    start = time.perf_counter()
+    summary = {"count": 0, "complete": False, "version": None, "first_seconds": None, "seconds": None}
+
+    try:
+        # NOTE: The version is the one of the snapshot that was streamed, not of the one that's current by now
+        snapshot = yield from _encode_lines(funding_requests.stream_available(), summary, start)
+        summary["complete"], summary["version"] = True, snapshot.version
+
+    except Exception:
+        logger.exception("Failed to stream the available funding requests")
+
+    summary["seconds"] = time.perf_counter() - start
+    yield Snapshot.encode({"summary": summary}) + b"\n"
+
+
+def _encode_lines(
+    stream: Generator[FundingRequest, None, Snapshot], summary: dict, start: float
+) -> Generator[bytes, None, Snapshot]:
+    """
+    Encode the streamed funding requests as JSON lines, counting them on the given summary.
+
+    Yields:
+        bytes: The encoded funding requests
+
+    Returns:
+        Snapshot: The snapshot the funding requests were streamed from
+
+    """
+    # NOTE: The stream is iterated by hand, as a for loop would drop the snapshot it returns
+    while True:
+        try:
+            funding_request = next(stream)
+        except StopIteration as stop:
+            return stop.value  # noqa: B901
+
+        if summary["first_seconds"] is None:
+            summary["first_seconds"] = time.perf_counter() - start
+        summary["count"] += 1
+        yield Snapshot.encode(funding_request.json()) + b"\n"
+
+
+@router.get("/stream", status_code=HTTPStatus.OK)
+def _stream_funding_requests() -> StreamingResponse:
+    """
+    Stream the available funding requests as newline delimited JSON, ending with a summary record.
+
+    On a cold cache each funding request is sent as soon as it's hydrated, instead of after the slowest one.
+    """
+    return StreamingResponse(_stream_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/promising", status_code=HTTPStatus.OK, response_model=list[dict])
+def _get_promising_funding_requests(request: Request) -> Response:
     """Get a list of promising funding requests based on the user's configuration."""
     user = cast(User, request.state.user)
-    promising_funding_requests = funding_requests.get_promising(user)
-    return [request.json() for request in promising_funding_requests]
+    snapshot = funding_requests.get_snapshot()
+    ids = [funding_request.id for funding_request in funding_requests.get_promising(user, snapshot)]
+    return _snapshot_response(request, snapshot, _list_etag(snapshot, ids), lambda: snapshot.serialize(ids))
+
 
+@router.get("/batch", status_code=HTTPStatus.OK, response_model=list[dict])
+def _get_funding_requests_batch(request: Request, ids: Annotated[list[int], Query()]) -> Response:
+    """Get the available funding requests with the given IDs, skipping the ones that aren't available."""
+    snapshot = funding_requests.get_snapshot()
+    available_ids = [funding_request.id for funding_request in funding_requests.get_by_ids(ids, snapshot)]
+    etag = _list_etag(snapshot, available_ids)
+    return _snapshot_response(request, snapshot, etag, lambda: snapshot.serialize(available_ids))
 
-@router.get("/{id_funding_request}", status_code=HTTPStatus.OK)
-def _get_funding_request(id_funding_request: int) -> dict:
+
+@router.get("/{id_funding_request:int}", status_code=HTTPStatus.OK, response_model=dict)
+def _get_funding_request(request: Request, id_funding_request: int) -> Response:
     """
     Get a funding request by its ID.
 
@@ -39,22 +205,21 @@ def _get_funding_request(id_funding_request: int) -> dict:
         HTTPException: If the funding request is not found.
 
     """
-    available_funding_requests = funding_requests.get_available()
-    for funding_request in available_funding_requests:
-        if funding_request.id == id_funding_request:
-            return funding_request.json()
+    snapshot = funding_requests.get_snapshot()
+    if id_funding_request not in snapshot.index:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Funding request {id_funding_request} not found")
 
-    raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Funding request {id_funding_request} not found")
+    etag = f'"{snapshot.version}-{id_funding_request}"'
+    return _snapshot_response(request, snapshot, etag, lambda: snapshot.serialized[id_funding_request])
 
 
 @router.post(path="/filter", status_code=HTTPStatus.NO_CONTENT)
-def _filter_funding_requests(request: Request, payload: list[FundingRequest]) -> None:
-    """Filter a list of funding requests based on the user's filters."""
+def _filter_funding_requests(request: Request, response: Response, payload: list[FundingRequest]) -> None:
+    """Filter a list of funding requests based on the user's filters, reporting the notifications that were dropped."""
     user = cast(User, request.state.user)
-    promising_funding_requests = set() if user.filters else set(payload)
-
-    for filter_ in user.filters.values():
-        promising_funding_requests.update(funding_requests.filter_(list(payload), filter_))
+    promising_funding_requests = (
+        funding_requests.filter_any(payload, user.filters.values()) if user.filters else list(dict.fromkeys(payload))
+    )
 
     if not promising_funding_requests:
         logger.info(f"No promising funding requests for user {user.id}")
@@ -62,6 +227,13 @@ def _filter_funding_requests(request: Request, payload: list[FundingRequest]) ->
 
     logger.info(f"Found {len(promising_funding_requests)} promising funding requests for user {user.id}")
 
+    futures = []
     for funding_request in promising_funding_requests:
         logger.info(f"Notifying about funding request {funding_request.id} to user {user.id}")
-        CloudPubSub.publish(funding_request.json(), PrivateEvent.FUNDING_REQUEST_PROMISING, id_user=str(user.id))
+        futures.append(
+            publisher.publish(funding_request.json(), PrivateEvent.FUNDING_REQUEST_PROMISING, id_user=str(user.id))
+        )
+
+    if dropped := publisher.rejected(futures):
+        logger.warning(f"Dropped {dropped} of {len(futures)} notifications to user {user.id}")
+        response.headers["X-Dropped-Notifications"] = str(dropped)
@@ -0,0 +1,86 @@
+from datetime import UTC, datetime, timedelta
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query
+
+from cumplo_spotter.integrations.history import DEFAULT_FIELDS, FIELDS, history
+from cumplo_spotter.integrations.history.exceptions import HistoryDisabledError, UnknownHistoryFieldError
+from cumplo_spotter.utils.constants import HISTORY_QUERY_MAX_ROWS
+
+router = APIRouter(prefix="/history")
+
+FIELDS_DESCRIPTION = f"Comma separated fields to read, out of {', '.join(sorted(FIELDS))}"
+
+
+@router.get(path="/snapshots", status_code=HTTPStatus.OK)
+def _get_snapshots(start: datetime | None = None, end: datetime | None = None) -> list[dict]:
+    """
+    List the snapshots appended to the history within the given time range, the last day by default.
+
+    Raises:
+        HTTPException: If the history is disabled
+
+    """
+    start, end = _range(start, end)
+    try:
+        return history.snapshots(start, end)
+    except HistoryDisabledError as error:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="The history is disabled") from error
+
+
+@router.get(path="", status_code=HTTPStatus.OK)
+def _get_history(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+    limit: Annotated[int, Query(ge=1, le=HISTORY_QUERY_MAX_ROWS)] = HISTORY_QUERY_MAX_ROWS,
+) -> list[dict]:
+    """Get the recorded changes of every funding request within the given time range, the last day by default."""
+    return _query(start, end, fields, limit)
+
+
+@router.get(path="/{id_funding_request}", status_code=HTTPStatus.OK)
+def _get_funding_request_history(
+    id_funding_request: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    fields: Annotated[str | None, Query(description=FIELDS_DESCRIPTION)] = None,
+    limit: Annotated[int, Query(ge=1, le=HISTORY_QUERY_MAX_ROWS)] = HISTORY_QUERY_MAX_ROWS,
+) -> list[dict]:
+    """Get the recorded changes of a single funding request within the given time range, the last day by default."""
+    return _query(start, end, fields, limit, id_funding_request)
+
+
+def _query(
+    start: datetime | None,
+    end: datetime | None,
+    fields: str | None,
+    limit: int,
+    id_funding_request: int | None = None,
+) -> list[dict]:
+    """
+    Query the history, reading only the given fields.
+
+    Raises:
+        HTTPException: If the history is disabled or any of the fields isn't stored by it
+
+    """
+    start, end = _range(start, end)
+    projection = tuple(field.strip() for field in fields.split(",") if field.strip()) if fields else DEFAULT_FIELDS
+
+    try:
+        return history.query(start, end, projection, id_funding_request, limit)
+
+    except UnknownHistoryFieldError as error:
+        detail = f"Unknown fields {', '.join(sorted(error.fields))}"
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail) from error
+
+    except HistoryDisabledError as error:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="The history is disabled") from error
+
+
+def _range(start: datetime | None, end: datetime | None) -> tuple[datetime, datetime]:
+    """Fill in the missing ends of a time range, which ends now and spans a day by default."""
+    end = end or datetime.now(UTC)
+    return start or end - timedelta(days=1), end
@@ -0,0 +1,65 @@
+import time
+from http import HTTPStatus
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from cumplo_spotter.utils.metrics import registry
+
+router = APIRouter(prefix="/metrics")
+
+REQUEST_SECONDS = registry.histogram(
+    "spotter_http_request_duration_seconds",
+    "Latency of the requests served by the API until their response starts, by route, method and status code",
+    ("route", "method", "status"),
+)
+
+
+class MetricsMiddleware:
+    """
+    Middleware that records the latency of every request served by the API.
+
+    Requests are labeled by the path template of their route rather than by their path, so funding request IDs don't
+    become label values. Streamed responses are timed until their headers are sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request, recording its latency once the response starts."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        responded = False
+
+        def record(status: int) -> None:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started_at, route=route, method=scope["method"], status=status
+            )
+
+        async def send_recording(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_recording)
+
+        except Exception:
+            if not responded:
+                record(HTTPStatus.INTERNAL_SERVER_ERROR.value)
+            raise
+
+
+@router.get(path="", response_class=PlainTextResponse, status_code=HTTPStatus.OK)
+def _get_metrics(aggregate: bool = False) -> PlainTextResponse:  # noqa: FBT001, FBT002
+    """Get the metrics of this worker, or of every worker of the host, in the Prometheus text format."""
+    families = registry.aggregate() if aggregate else registry.collect()
+    return PlainTextResponse(registry.render(families), media_type="text/plain; version=0.0.4")
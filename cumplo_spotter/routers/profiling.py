@@ -0,0 +1,48 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+
+from cumplo_spotter.utils.constants import PROFILE_MAX_COUNT
+from cumplo_spotter.utils.profiling import ProfileFormat, ProfileTarget, profiler
+
+router = APIRouter(prefix="/profile")
+
+
+@router.post(path="", status_code=HTTPStatus.OK)
+def _start_profile(
+    target: ProfileTarget,
+    count: Annotated[int, Query(ge=1, le=PROFILE_MAX_COUNT)] = 1,
+) -> dict:
+    """Profile the next refresh cycles or requests of the worker that serves this request."""
+    return profiler.arm(target, count)
+
+
+@router.get(path="/status", status_code=HTTPStatus.OK)
+def _get_profile_status() -> dict:
+    """Get what the worker that serves this request is profiling and what it captured so far."""
+    return profiler.status()
+
+
+@router.get(path="", status_code=HTTPStatus.OK)
+def _get_profile(
+    format_: Annotated[ProfileFormat, Query(alias="format")] = ProfileFormat.SPEEDSCOPE,
+) -> Response:
+    """
+    Get the profile captured so far, as a speedscope JSON profile or as a pstats file.
+
+    Raises:
+        HTTPException: If nothing was captured yet
+
+    """
+    status = profiler.status()
+    if (profile := profiler.export(format_)) is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Nothing was profiled yet")
+
+    headers = {"X-Profile-Captured": str(len(status["captured"])), "X-Profile-Remaining": str(status["remaining"])}
+    if isinstance(profile, bytes):
+        headers["Content-Disposition"] = 'attachment; filename="profile.pstats"'
+        return Response(content=profile, media_type="application/octet-stream", headers=headers)
+
+    return JSONResponse(content=profile, headers=headers)
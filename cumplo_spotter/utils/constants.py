@@ -55,6 +55,34 @@ CUMPLO_GLOBAL_API_DETAILS = os.getenv("CUMPLO_GLOBAL_API_DETAILS", "")
 UPFRONT_FEE_KEY = os.getenv("UPFRONT_FEE_KEY", "COMISION ENTRADA")
 EXIT_FEE_KEY = os.getenv("EXIT_FEE_KEY", "COMISION SALIDA")
 SIMULATION_AMOUNT = int(os.getenv("SIMULATION_AMOUNT", "1000000"))
+CUMPLO_HTTP2 = bool(os.getenv("CUMPLO_HTTP2"))
+CUMPLO_TIMEOUT = float(os.getenv("CUMPLO_TIMEOUT", "30"))
+
+# Hydration
+HYDRATION_CONCURRENCY = int(os.getenv("HYDRATION_CONCURRENCY", "25"))
+HYDRATION_MAX_AGE = int(os.getenv("HYDRATION_MAX_AGE", "1800"))
+
+# Simulation
+SIMULATION_REMOTE_ONLY = bool(os.getenv("SIMULATION_REMOTE_ONLY"))
+SIMULATION_CORPUS_PATH = os.getenv("SIMULATION_CORPUS_PATH")
+SIMULATION_CORPUS_MAX_BYTES = int(os.getenv("SIMULATION_CORPUS_MAX_BYTES", "16777216"))
+SIMULATION_MIN_SAMPLES = int(os.getenv("SIMULATION_MIN_SAMPLES", "20"))
+SIMULATION_MAX_SAMPLES = int(os.getenv("SIMULATION_MAX_SAMPLES", "200"))
+SIMULATION_TOLERANCE = float(os.getenv("SIMULATION_TOLERANCE", "0.001"))
+SIMULATION_SHADOW_RATE = float(os.getenv("SIMULATION_SHADOW_RATE", "0.05"))
+
+# Governor
+GOVERNOR_INITIAL_CONCURRENCY = int(os.getenv("GOVERNOR_INITIAL_CONCURRENCY", "10"))
+GOVERNOR_MIN_CONCURRENCY = int(os.getenv("GOVERNOR_MIN_CONCURRENCY", "2"))
+GOVERNOR_LATENCY_TARGET = float(os.getenv("GOVERNOR_LATENCY_TARGET", "2"))
+GOVERNOR_DECREASE_RATIO = float(os.getenv("GOVERNOR_DECREASE_RATIO", "0.5"))
+GOVERNOR_RATE = float(os.getenv("GOVERNOR_RATE", "100"))
+GOVERNOR_BURST = int(os.getenv("GOVERNOR_BURST", "50"))
+GOVERNOR_RETRY_TRIES = int(os.getenv("GOVERNOR_RETRY_TRIES", "5"))
+GOVERNOR_RETRY_BASE_DELAY = float(os.getenv("GOVERNOR_RETRY_BASE_DELAY", "0.5"))
+GOVERNOR_RETRY_MAX_DELAY = float(os.getenv("GOVERNOR_RETRY_MAX_DELAY", "10"))
+GOVERNOR_FAILURE_THRESHOLD = int(os.getenv("GOVERNOR_FAILURE_THRESHOLD", "10"))
+GOVERNOR_OPEN_SECONDS = float(os.getenv("GOVERNOR_OPEN_SECONDS", "30"))
 
 # Defaults
 DEFAULT_FILTER_NOTIFIED = bool(os.getenv("DEFAULT_FILTER_NOTIFIED"))
@@ -63,3 +91,50 @@ DEFAULT_EXPIRATION_MINUTES = int(os.getenv("DEFAULT_EXPIRATION_MINUTES", "30"))
 # Cache
 CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "1000"))
 CUMPLO_CACHE_TTL = int(os.getenv("CUMPLO_CACHE_TTL", "120"))
+CUMPLO_CACHE_MAX_STALENESS = int(os.getenv("CUMPLO_CACHE_MAX_STALENESS", "600"))
+
+# Refresh Scheduler
+CUMPLO_REFRESH_INTERVAL = float(os.getenv("CUMPLO_REFRESH_INTERVAL", "90"))
+CUMPLO_REFRESH_JITTER = float(os.getenv("CUMPLO_REFRESH_JITTER", "0.1"))
+CUMPLO_REFRESH_SHUTDOWN_TIMEOUT = float(os.getenv("CUMPLO_REFRESH_SHUTDOWN_TIMEOUT", "10"))
+
+# Shared Snapshot
+SHARED_SNAPSHOT_PATH = os.getenv("SHARED_SNAPSHOT_PATH")
+SHARED_SNAPSHOT_WAIT = float(os.getenv("SHARED_SNAPSHOT_WAIT", "60"))
+SHARED_SNAPSHOT_POLL_INTERVAL = float(os.getenv("SHARED_SNAPSHOT_POLL_INTERVAL", "0.5"))
+
+# History
+HISTORY_DIRECTORY = os.getenv("HISTORY_DIRECTORY")
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "4"))
+HISTORY_COMPRESSION_LEVEL = int(os.getenv("HISTORY_COMPRESSION_LEVEL", "6"))
+HISTORY_QUERY_MAX_ROWS = int(os.getenv("HISTORY_QUERY_MAX_ROWS", "10000"))
+
+# Text
+CLEAN_TEXT_CACHE_SIZE = int(os.getenv("CLEAN_TEXT_CACHE_SIZE", "8192"))
+
+# Pagination
+PAGE_MAX_SIZE = int(os.getenv("PAGE_MAX_SIZE", "500"))
+
+# Filters
+FILTER_REJECTION_SAMPLE = int(os.getenv("FILTER_REJECTION_SAMPLE", "5"))
+FILTER_TRACE_SAMPLE_RATE = float(os.getenv("FILTER_TRACE_SAMPLE_RATE", "0"))
+FILTER_REJECTION_MAX_CONFIGURATIONS = int(os.getenv("FILTER_REJECTION_MAX_CONFIGURATIONS", "1000"))
+
+# Pub/Sub
+PUBSUB_BATCH_MAX_MESSAGES = int(os.getenv("PUBSUB_BATCH_MAX_MESSAGES", "100"))
+PUBSUB_BATCH_MAX_BYTES = int(os.getenv("PUBSUB_BATCH_MAX_BYTES", "1000000"))
+PUBSUB_BATCH_MAX_LATENCY = float(os.getenv("PUBSUB_BATCH_MAX_LATENCY", "0.05"))
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "10000"))
+PUBSUB_WORKERS = int(os.getenv("PUBSUB_WORKERS", "4"))
+PUBSUB_FLUSH_TIMEOUT = float(os.getenv("PUBSUB_FLUSH_TIMEOUT", "10"))
+
+# Events
+EVENTS_SNAPSHOT_INTERVAL = int(os.getenv("EVENTS_SNAPSHOT_INTERVAL", "30"))
+
+# Metrics
+METRICS_DIRECTORY = os.getenv("METRICS_DIRECTORY")
+METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL", "15"))
+
+# Profiling
+PROFILE_MAX_COUNT = int(os.getenv("PROFILE_MAX_COUNT", "100"))
+SERVER_TIMING = bool(os.getenv("SERVER_TIMING"))
@@ -0,0 +1,379 @@
+import json
+import math
+import os
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from logging import getLogger
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, ClassVar, TypeVar
+
+from cumplo_spotter.utils.constants import METRICS_DIRECTORY, METRICS_EXPORT_INTERVAL
+
+logger = getLogger(__name__)
+
+# NOTE: Samples are kept as (name, labels, value) so they can be exported as JSON and merged across workers
+Sample = tuple[str, dict[str, str], float]
+Family = dict[str, Any]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Metric:
+    """Base metric, holding one value per combination of label values."""
+
+    type: ClassVar[str]
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict[tuple[str, ...], Any] = {}
+        self._lock = Lock()
+
+    def collect(self) -> Family:
+        """Export the metric along with its current samples."""
+        return {"name": self.name, "type": self.type, "help": self.documentation, "samples": self.samples()}
+
+    def samples(self) -> list[Sample]:
+        """Build the current samples of the metric."""
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        """
+        Build the key of the given label values.
+
+        Raises:
+            ValueError: If the given labels don't match the labels of the metric
+
+        """
+        if labels.keys() != set(self.labels):
+            message = f"{self.name} expects the labels {self.labels}, got {tuple(labels)}"
+            raise ValueError(message)
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _labels(self, key: tuple[str, ...]) -> dict[str, str]:
+        """Build the label values of the given key."""
+        return dict(zip(self.labels, key, strict=True))
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """
+        Increase the count of the given label values.
+
+        Args:
+            amount (float): The amount to increase the count by
+            **labels (Any): The label values
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down, either set by the application or read when the metrics are collected."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        function: Callable[[], float | None] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def set(self, value: float, **labels: Any) -> None:
+        """
+        Set the value of the given label values.
+
+        Args:
+            value (float): The new value
+            **labels (Any): The label values
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """
+        Increase the value of the given label values.
+
+        Args:
+            amount (float): The amount to increase the value by, which may be negative
+            **labels (Any): The label values
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[Sample]:
+        """Build the current samples of the gauge, reading its function if it has one."""
+        if self.function is None:
+            return super().samples()
+
+        try:
+            value = self.function()
+        except Exception:
+            logger.exception(f"Failed to read the {self.name} gauge")
+            return []
+
+        return [] if value is None else [(self.name, {}, value)]
+
+
+class Histogram(Metric):
+    """Distribution of observed values, counted into cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = (*sorted(buckets), math.inf)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """
+        Count an observed value into its bucket.
+
+        Args:
+            value (float): The observed value
+            **labels (Any): The label values
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> list[Sample]:
+        """Build the cumulative bucket, sum and count samples of the histogram."""
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts, strict=True):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format(bound)}, cumulative))
+                samples.extend([(f"{self.name}_sum", labels, total), (f"{self.name}_count", labels, cumulative)])
+        return samples
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class MetricsRegistry:
+    """
+    Registry of the metrics of this process, rendered in the Prometheus text format.
+
+    Every worker holds its own metrics. When a directory is configured, each worker also exports them to a file of
+    its own every interval, so any worker can merge the metrics of the whole host: counters and histograms are added
+    up, while gauges are kept apart with a `worker` label.
+    """
+
+    def __init__(self, directory: str | None = METRICS_DIRECTORY, interval: float = METRICS_EXPORT_INTERVAL) -> None:
+        self.directory = Path(directory) if directory else None
+        self.interval = interval
+        self._metrics: dict[str, Metric] = {}
+        self._stopped = Event()
+        self._exporter: Thread | None = None
+        self._lock = Lock()
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        """Register a counter."""
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        function: Callable[[], float | None] | None = None,
+    ) -> Gauge:
+        """Register a gauge, optionally read from the given function when the metrics are collected."""
+        return self._register(Gauge(name, documentation, labels, function))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Register a histogram."""
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def collect(self) -> list[Family]:
+        """Export every metric of this process along with its current samples."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [metric.collect() for metric in metrics]
+
+    def aggregate(self) -> list[Family]:
+        """
+        Merge the metrics of every live worker of the host, falling back to the ones of this process.
+
+        Returns:
+            list[Family]: The merged metrics
+
+        """
+        workers = {**self._read_workers(), os.getpid(): self.collect()}
+
+        merged: dict[str, Family] = {}
+        values: dict[str, dict[tuple, float]] = {}
+        for pid, families in workers.items():
+            for family in families:
+                merged.setdefault(family["name"], {**family, "samples": []})
+                family_values = values.setdefault(family["name"], {})
+                for name, labels, value in family["samples"]:
+                    if family["type"] == "gauge":
+                        labels = {**labels, "worker": str(pid)}  # noqa: PLW2901
+                    key = (name, tuple(sorted(labels.items())))
+                    family_values[key] = family_values.get(key, 0) + value
+
+        for name, family in merged.items():
+            family["samples"] = [(sample, dict(labels), value) for (sample, labels), value in values[name].items()]
+        return list(merged.values())
+
+    @staticmethod
+    def render(families: list[Family]) -> str:
+        """
+        Render the given metrics in the Prometheus text exposition format.
+
+        Args:
+            families (list[Family]): The metrics to render
+
+        Returns:
+            str: The rendered metrics
+
+        """
+        lines = []
+        for family in families:
+            lines.extend([f"# HELP {family['name']} {family['help']}", f"# TYPE {family['name']} {family['type']}"])
+            for name, labels, value in family["samples"]:
+                rendered = ",".join(f'{label}="{_escape(content)}"' for label, content in labels.items())
+                lines.append(f"{name}{{{rendered}}} {_format(value)}" if rendered else f"{name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    def start(self) -> None:
+        """Start exporting the metrics of this process every interval, if a directory is configured."""
+        if self.directory is None or self._exporter is not None:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stopped.clear()
+        self._exporter = Thread(target=self._export_periodically, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+    def stop(self) -> None:
+        """Stop exporting the metrics of this process and remove its file, as it's no longer a live worker."""
+        if self.directory is None or self._exporter is None:
+            return
+
+        self._stopped.set()
+        self._exporter.join()
+        self._exporter = None
+        (self.directory / f"{os.getpid()}.json").unlink(missing_ok=True)
+
+    def export(self) -> None:
+        """Atomically replace the metrics file of this process with its current metrics."""
+        if self.directory is None:
+            return
+
+        path = self.directory / f"{os.getpid()}.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.collect()), encoding="utf-8")
+        temporary.replace(path)
+
+    def _read_workers(self) -> dict[int, list[Family]]:
+        """Read the metrics exported by the rest of the live workers, removing the files of the dead ones."""
+        workers: dict[int, list[Family]] = {}
+        if self.directory is None:
+            return workers
+
+        for path in self.directory.glob("*.json"):
+            # NOTE: Only the files named after the PID of a worker are metrics exports
+            if not path.stem.isdigit() or (pid := int(path.stem)) == os.getpid():
+                continue
+
+            if not _is_alive(pid):
+                # NOTE: Workers that crashed don't get to remove their own file
+                path.unlink(missing_ok=True)
+                continue
+
+            try:
+                workers[pid] = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                logger.warning(f"Skipping the unreadable metrics of worker {pid}")
+
+        return workers
+
+    def _export_periodically(self) -> None:
+        """Export the metrics of this process until it's stopped."""
+        while not self._stopped.wait(self.interval):
+            try:
+                self.export()
+            except OSError:
+                logger.exception("Failed to export the metrics of this worker")
+
+    def _register(self, metric: M) -> M:
+        """
+        Register a metric, rejecting duplicate names.
+
+        Raises:
+            ValueError: If there's a metric with the same name already
+
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                message = f"There's a metric named {metric.name} already"
+                raise ValueError(message)
+            self._metrics[metric.name] = metric
+        return metric
+
+
+def _is_alive(pid: int) -> bool:
+    """Check if there's a process with the given ID."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    """Format a sample value."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
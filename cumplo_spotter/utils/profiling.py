@@ -0,0 +1,269 @@
+import cProfile
+import inspect
+import marshal
+import pstats
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import StrEnum
+from functools import wraps
+from logging import getLogger
+from threading import Lock
+from typing import Any
+
+from fastapi.routing import APIRoute
+
+logger = getLogger(__name__)
+
+# NOTE: Call paths that take less than this share of the profile are left out of the speedscope export
+SPEEDSCOPE_MIN_SHARE = 1e-4
+
+Function = tuple[str, int, str]
+
+
+class ProfileTarget(StrEnum):
+    REFRESH = "refresh"
+    REQUEST = "request"
+
+
+class ProfileFormat(StrEnum):
+    PSTATS = "pstats"
+    SPEEDSCOPE = "speedscope"
+
+
+@dataclass
+class ProfileCapture:
+    target: ProfileTarget
+    requested: int
+    captured: list[dict] = field(default_factory=list)
+
+    @property
+    def remaining(self) -> int:
+        """Amount of refresh cycles or requests still to be captured."""
+        return self.requested - len(self.captured)
+
+
+class Profiler:
+    """
+    On-demand deterministic profiler of the next refresh cycles or requests of this worker.
+
+    Arming the profiler drops the previous profile. Every captured refresh cycle or request is added up into a single
+    profile, which can be exported as a pstats file or as a speedscope JSON profile. A process can only run one
+    profiler at a time, so refresh cycles or requests overlapping with the one being captured run unprofiled and
+    aren't counted. Only the thread that runs the refresh cycle or request is profiled, so the time spent waiting for
+    the hydration engine shows up as upstream I/O.
+    """
+
+    def __init__(self) -> None:
+        self._capture: ProfileCapture | None = None
+        self._stats: pstats.Stats | None = None
+        self._busy = False
+        self._lock = Lock()
+
+    def arm(self, target: ProfileTarget, count: int) -> dict:
+        """
+        Capture the next refresh cycles or requests, dropping the previous profile.
+
+        Args:
+            target (ProfileTarget): Whether to capture refresh cycles or requests
+            count (int): The amount of refresh cycles or requests to capture
+
+        Returns:
+            dict: The status of the capture
+
+        """
+        with self._lock:
+            self._capture, self._stats = ProfileCapture(target=target, requested=count), None
+
+        logger.info(f"Profiling the next {count} captures of {target}")
+        return self.status()
+
+    def status(self) -> dict:
+        """Export what is being captured and what was captured so far."""
+        with self._lock:
+            if self._capture is None:
+                return {"target": None, "requested": 0, "remaining": 0, "captured": []}
+
+            return {
+                "target": self._capture.target,
+                "requested": self._capture.requested,
+                "remaining": self._capture.remaining,
+                "captured": list(self._capture.captured),
+            }
+
+    @contextmanager
+    def capture(self, target: ProfileTarget, name: str) -> Iterator[None]:
+        """
+        Profile the wrapped refresh cycle or request if the profiler is armed for it.
+
+        Args:
+            target (ProfileTarget): Whether the wrapped code is a refresh cycle or a request
+            name (str): The name the capture is listed under
+
+        """
+        if (capture := self._claim(target)) is None:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        started_at = time.perf_counter()
+        try:
+            profile.enable()
+        except ValueError:
+            logger.warning("Skipped a profile capture, there's another profiler active")
+            self._release()
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._collect(capture, profile, name, time.perf_counter() - started_at)
+
+    def profiled(self, function: Callable[..., Any], name: str) -> Callable[..., Any]:
+        """
+        Wrap a synchronous endpoint, so its requests can be captured.
+
+        Args:
+            function (Callable[..., Any]): The endpoint to wrap
+            name (str): The name its requests are listed under
+
+        Returns:
+            Callable[..., Any]: The wrapped endpoint, or the given one if it's a coroutine function
+
+        """
+        # NOTE: Coroutine endpoints run on the event loop, along with every other request, so they aren't profiled
+        if inspect.iscoroutinefunction(function):
+            return function
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self.capture(ProfileTarget.REQUEST, name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    def export(self, format_: ProfileFormat) -> bytes | dict | None:
+        """
+        Export the captured profile.
+
+        Args:
+            format_ (ProfileFormat): The format to export the profile in
+
+        Returns:
+            bytes | dict | None: The marshalled pstats or the speedscope profile, or None if nothing was captured
+
+        """
+        with self._lock:
+            if self._stats is None or self._capture is None:
+                return None
+            stats, name = self._stats, f"{self._capture.target} x{len(self._capture.captured)}"
+
+            if format_ == ProfileFormat.PSTATS:
+                return marshal.dumps(stats.stats)
+            return speedscope(stats, name)
+
+    def _claim(self, target: ProfileTarget) -> ProfileCapture | None:
+        """Take the profiler for a new capture of the given target, if it's armed for it and not busy."""
+        with self._lock:
+            capture = self._capture
+            if self._busy or capture is None or capture.target != target or not capture.remaining:
+                return None
+            self._busy = True
+        return capture
+
+    def _release(self) -> None:
+        """Let the next capture take the profiler."""
+        with self._lock:
+            self._busy = False
+
+    def _collect(self, capture: ProfileCapture, profile: cProfile.Profile, name: str, seconds: float) -> None:
+        """Add a finished capture to the profile, unless the profiler was armed again in the meantime."""
+        with self._lock:
+            self._busy = False
+            if capture is not self._capture:
+                return
+
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            capture.captured.append({"name": name, "seconds": seconds})
+
+
+class ProfiledRoute(APIRoute):
+    """Route whose requests can be captured by the profiler."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, profiler.profiled(endpoint, path), **kwargs)
+
+
+def speedscope(stats: pstats.Stats, name: str) -> dict:
+    """
+    Convert a profile into the speedscope file format.
+
+    Deterministic profiles only know the time spent by each caller and callee pair, so the time of a function is split
+    among its callees in proportion to the time each of them was called from it.
+
+    Args:
+        stats (pstats.Stats): The profile to convert
+        name (str): The name of the profile
+
+    Returns:
+        dict: The speedscope profile
+
+    """
+    entries: dict[Function, tuple] = stats.stats
+    children: dict[Function, list[tuple[Function, float]]] = {}
+    for function, entry in entries.items():
+        for caller, (*_, cumulative) in entry[4].items():
+            children.setdefault(caller, []).append((function, cumulative))
+
+    roots = [(function, entry[3]) for function, entry in entries.items() if not entry[4]]
+    minimum = sum(cumulative for _, cumulative in roots) * SPEEDSCOPE_MIN_SHARE
+    frames: dict[Function, int] = {}
+    samples: list[list[int]] = []
+    weights: list[float] = []
+
+    def walk(function: Function, inclusive: float, stack: list[int], path: set[Function]) -> None:
+        _, _, own, cumulative, _ = entries[function]
+        if inclusive < minimum or function in path:
+            return
+
+        ratio = inclusive / cumulative if cumulative else 0
+        stack = [*stack, frames.setdefault(function, len(frames))]
+        if own * ratio > 0:
+            samples.append(stack)
+            weights.append(own * ratio)
+
+        for child, child_cumulative in children.get(function, []):
+            walk(child, child_cumulative * ratio, stack, path | {function})
+
+    for function, cumulative in roots:
+        walk(function, cumulative, [], set())
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {
+            "frames": [{"name": function, "file": file, "line": line} for file, line, function in frames],
+        },
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+        "name": name,
+        "activeProfileIndex": 0,
+        "exporter": "cumplo-spotter",
+    }
+
+
+profiler = Profiler()
@@ -0,0 +1,79 @@
+from collections.abc import Iterable
+from functools import lru_cache
+
+from cumplo_common.utils import text
+
+from cumplo_spotter.utils.constants import CLEAN_TEXT_CACHE_SIZE
+
+
+@lru_cache(maxsize=CLEAN_TEXT_CACHE_SIZE)
+def clean_text(value: str) -> str:
+    """
+    Memoized version of `cumplo_common.utils.text.clean_text`.
+
+    Most cleaned texts, such as economic sectors, fee names and the descriptions of the funding requests that are
+    still listed, show up again on every refresh.
+
+    Args:
+        value (str): The text to be cleaned
+
+    Returns:
+        str: The cleaned text
+
+    """
+    return text.clean_text(value)
+
+
+class MarkerMatcher:
+    """
+    Find every marker contained in a text with a single scan.
+
+    The markers are indexed by the longest substring they all share, their anchor. The text is only scanned for the
+    anchor, and on each occurrence the markers are checked in place at the offsets where they hold it. Overlapping
+    markers are found too. Without a common anchor every position is checked, which is still correct but slower.
+    """
+
+    def __init__(self, markers: Iterable[str]) -> None:
+        self.markers = frozenset(markers)
+        self.anchor = self._find_anchor(self.markers)
+        self.candidates = tuple(
+            (marker, offset)
+            for marker in self.markers
+            for offset in range(len(marker) - len(self.anchor) + 1)
+            if marker.startswith(self.anchor, offset)
+        )
+
+    def find(self, value: str) -> frozenset[str]:
+        """
+        Find the markers contained in the given text.
+
+        Args:
+            value (str): The text to scan
+
+        Returns:
+            frozenset[str]: The markers found in the text
+
+        """
+        found = set()
+        position = value.find(self.anchor)
+
+        while position != -1:
+            for marker, offset in self.candidates:
+                if position >= offset and value.startswith(marker, position - offset):
+                    found.add(marker)
+            position = value.find(self.anchor, position + 1)
+
+        return frozenset(found)
+
+    @staticmethod
+    def _find_anchor(markers: frozenset[str]) -> str:
+        """Find the longest substring shared by every marker."""
+        if not markers:
+            return ""
+
+        shortest = min(markers, key=len)
+        for length in range(len(shortest), 0, -1):
+            for start in range(len(shortest) - length + 1):
+                if all(shortest[start : start + length] in marker for marker in markers):
+                    return shortest[start : start + length]
+        return ""
@@ -0,0 +1,104 @@
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+T = TypeVar("T")
+
+# NOTE: Seconds spent in each phase by the request being served, if its Server-Timing header is being built
+phases: ContextVar[dict[str, float] | None] = ContextVar("phases", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Add the time spent in the wrapped code to the given phase of the request being served.
+
+    It does nothing outside of a request with Server-Timing, such as in background refreshes.
+
+    Args:
+        name (str): The name of the phase
+
+    """
+    if (current := phases.get()) is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        current[name] = current.get(name, 0.0) + time.perf_counter() - started_at
+
+
+def timed(iterable: Iterable[T], name: str) -> Iterator[T]:
+    """
+    Iterate over the given iterable, adding the time spent waiting for each item to the given phase.
+
+    Args:
+        iterable (Iterable[T]): The iterable to iterate over
+        name (str): The name of the phase
+
+    Yields:
+        T: The items of the iterable
+
+    """
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def render(timings: dict[str, float]) -> str:
+    """
+    Render the given phase timings as a Server-Timing header.
+
+    Args:
+        timings (dict[str, float]): Seconds spent in each phase
+
+    Returns:
+        str: The header value, with the durations in milliseconds
+
+    """
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware that adds a Server-Timing header with the time the request spent in each phase.
+
+    Phases are timed wherever the request goes through them: waiting for Cumplo, validating its payloads, filtering
+    and serializing. The header also holds the total time until the response started. Phases that happen after the
+    response starts, such as the body of streamed responses, aren't included.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve the request, adding the Server-Timing header once the response starts."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        timings: dict[str, float] = {}
+        token = phases.set(timings)
+
+        async def send_timed(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                header = render({**timings, "total": time.perf_counter() - started_at})
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            phases.reset(token)
@@ -0,0 +1,77 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from cumplo_spotter.models.cumplo import CumploFundingRequest
+
+FIXTURES = Path(__file__).parent / "fixtures" / "synthetic_funding_requests"
+
+
+def load(path: Path) -> dict:
+    """Load a synthetic funding request fixture along with the payload the controller builds out of it."""
+    fixture = json.loads(path.read_text(encoding="utf-8"))
+    fixture["payload"] = {**fixture["data"], "score": fixture["score"], "simulation": fixture["simulation"]}
+    return fixture
+
+
+@pytest.fixture(params=sorted(FIXTURES.glob("*.json")), ids=lambda path: path.stem)
+def fixture(request: pytest.FixtureRequest) -> dict:
+    """Every synthetic funding request."""
+    return load(request.param)
+
+
+def test_convert_matches_export(fixture: dict) -> None:
+    """The single-validation path yields the same funding request as validating and exporting the Cumplo model."""
+    expected = CumploFundingRequest.model_validate(copy.deepcopy(fixture["payload"])).export()
+
+    assert CumploFundingRequest.convert(fixture["payload"]) == expected
+
+
+def test_convert_matches_export_with_borrower(fixture: dict) -> None:
+    """The borrower ID, which isn't part of the details, is set the same way by both paths."""
+    legacy = CumploFundingRequest.model_validate(copy.deepcopy(fixture["payload"]))
+    legacy.borrower.id = fixture["id_borrower"]
+
+    converted = CumploFundingRequest.convert(fixture["payload"], id_borrower=fixture["id_borrower"])
+
+    assert converted == legacy.export()
+    assert converted.borrower.id == fixture["id_borrower"]
+
+
+def test_convert_leaves_payload_untouched(fixture: dict) -> None:
+    """Converting doesn't modify the payload, which is kept around to hydrate the next refresh."""
+    payload = copy.deepcopy(fixture["payload"])
+
+    CumploFundingRequest.convert(payload, id_borrower=fixture["id_borrower"])
+
+    assert payload == fixture["payload"]
+
+
+def test_dicom_status(fixture: dict) -> None:
+    """The DICOM markers of the descriptions are read into the borrower and debtors."""
+    funding_request = CumploFundingRequest.convert(fixture["payload"])
+
+    assert funding_request.borrower.dicom is fixture["expected"]["borrower_dicom"]
+    assert all(debtor.dicom is fixture["expected"]["debtor_dicom"] for debtor in funding_request.debtors)
+
+
+def test_installments() -> None:
+    """Simulations with installments keep every one of them, net of their exit fee."""
+    fixture = load(FIXTURES / "working_capital_installments.json")
+
+    installments = CumploFundingRequest.convert(fixture["payload"]).simulation.installments
+
+    assert len(installments) == len(fixture["simulation"]["cuotas"])
+    assert [installment.amount for installment in installments] == [
+        round(cuota["montoPagar"]) - round(cuota["feeSalida"]) for cuota in fixture["simulation"]["cuotas"]
+    ]
+
+
+def test_missing_debtors() -> None:
+    """Funding requests whose details don't list any debtor are converted without them."""
+    fixture = load(FIXTURES / "missing_debtors.json")
+
+    assert "pagadores" not in fixture["data"]
+    assert CumploFundingRequest.convert(fixture["payload"]).debtors == []
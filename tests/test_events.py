@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+from cumplo_common.models import FundingRequest
+
+from cumplo_spotter.business.events import SharedFundingRequestEventTracker
+from cumplo_spotter.models.cumplo import CumploFundingRequest
+from cumplo_spotter.models.events import FundingRequestEventType
+
+FIXTURES = Path(__file__).parent / "fixtures" / "synthetic_funding_requests"
+
+
+def funding_requests() -> list[FundingRequest]:
+    """Every synthetic funding request of the conversion fixtures, each one with a distinct ID."""
+    converted = []
+    for id_, path in enumerate(sorted(FIXTURES.glob("*.json")), start=1):
+        fixture = json.loads(path.read_text(encoding="utf-8"))
+        payload = {**fixture["data"], "score": fixture["score"], "simulation": fixture["simulation"]}
+        converted.append(CumploFundingRequest.convert(payload).model_copy(update={"id": id_}))
+    return converted
+
+
+def test_shared_trackers_chain_the_versions_of_a_user(tmp_path: Path) -> None:
+    """Events built by alternating workers reference the last event published to the user by any of them."""
+    workers = [SharedFundingRequestEventTracker(str(tmp_path)) for _ in range(2)]
+    available = funding_requests()
+
+    first = workers[0].track("user", available)
+    second = workers[1].track("user", available[1:])
+    third = workers[0].track("user", available[2:])
+
+    assert first is not None
+    assert first.type == FundingRequestEventType.SNAPSHOT
+    assert second is not None
+    assert (second.type, second.base_version, second.removed) == (
+        FundingRequestEventType.DELTA,
+        first.version,
+        [available[0].id],
+    )
+    assert third is not None
+    assert (third.base_version, third.removed) == (second.version, [available[1].id])
+    assert workers[1].track("user", available[2:]) is None
+
+
+def test_shared_trackers_reset(tmp_path: Path) -> None:
+    """A reset by any worker makes the next event of the user a snapshot."""
+    workers = [SharedFundingRequestEventTracker(str(tmp_path)) for _ in range(2)]
+    available = funding_requests()
+
+    workers[0].track("user", available)
+    workers[1].reset("user")
+
+    event = workers[0].track("user", available)
+    assert event is not None
+    assert event.type == FundingRequestEventType.SNAPSHOT
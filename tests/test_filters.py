@@ -0,0 +1,51 @@
+import json
+from decimal import Decimal
+
+from cumplo_common.models import FilterConfiguration
+
+from cumplo_spotter.business.filters import FilterResultCache
+
+CONFIGURATION = {
+    "id": "01JB3M8Y2Q7T5V0X9K4N6P1R3S",
+    "name": "Short factoring",
+    "minimum_score": Decimal("0.50"),
+    "target_credit_types": ["FACTORING", "WORKING_CAPITAL"],
+    "minimum_duration": 30,
+    "maximum_duration": 120,
+    "minimum_investment_amount": 100000,
+    "minimum_amount": 5000000,
+    "minimum_irr": Decimal("12.0"),
+    "minimum_monthly_profit_rate": Decimal("1E-2"),
+    "ignore_dicom": True,
+    "portfolio": [
+        {"unit": "percentage", "category": "on_time", "percentage_base": "count", "minimum": Decimal("0.9")},
+        {"unit": "count", "category": "delinquent", "maximum": Decimal("0.00")},
+    ],
+}
+
+
+def test_key_of_fully_populated_configuration() -> None:
+    """Every field of a configuration is serialized into its key, except the ones that only identify it."""
+    key = FilterResultCache.key(FilterConfiguration.model_validate(CONFIGURATION))
+
+    dumped = json.loads(key)
+    assert dumped.keys() == FilterConfiguration.model_fields.keys() - {"id", "name"}
+    assert dumped["minimum_score"] == "0.5"
+    assert dumped["minimum_monthly_profit_rate"] == "0.01"
+
+
+def test_key_of_equivalent_configurations() -> None:
+    """Configurations that only differ in their identity, the order of their lists or their decimals share a key."""
+    equivalent = {
+        **CONFIGURATION,
+        "id": "01JB3M8Y2Q7T5V0X9K4N6P1R3T",
+        "name": "Another name",
+        "minimum_score": Decimal("0.5"),
+        "target_credit_types": ["WORKING_CAPITAL", "FACTORING", "FACTORING"],
+        "minimum_irr": Decimal("12.000"),
+        "portfolio": CONFIGURATION["portfolio"][::-1],
+    }
+
+    assert FilterResultCache.key(FilterConfiguration.model_validate(equivalent)) == FilterResultCache.key(
+        FilterConfiguration.model_validate(CONFIGURATION)
+    )
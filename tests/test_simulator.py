@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+from benchmarks.simulation import load, validate
+from cumplo_spotter.integrations.cumplo.api_global import GlobalFundingRequest
+from cumplo_spotter.integrations.cumplo.simulator import DayCount, InterestConvention, LocalSimulator
+
+CORPUS = Path(__file__).parent / "fixtures" / "synthetic_simulations.jsonl"
+COVERED, UNCOVERED = "ANTICIPO_FACTURA/CLP", "CAPITAL_TRABAJO/CLP"
+
+
+def test_load_skips_malformed_lines() -> None:
+    """Every well-formed record of the corpus is read, including the ones the model doesn't cover."""
+    assert len(load(CORPUS)) == len(CORPUS.read_text(encoding="utf-8").splitlines()) - 1
+
+
+def test_validate_holds_on_synthetic_corpus() -> None:
+    """
+    The model calibrated on half of the synthetic simulations reproduces the other half.
+
+    The fixture corpus is generated with simple interest on a 360-day year rather than recorded from Cumplo, so this
+    only checks the calibration and validation logic, not that the model matches Cumplo's pricing.
+    """
+    assert validate(load(CORPUS), tolerance=0.001, min_samples=20) == []
+
+
+def test_simulator_calibrates_from_corpus() -> None:
+    """Products with enough synthetic simulations are covered with the model they were generated with."""
+    simulator = LocalSimulator(str(CORPUS), enabled=True)
+    simulator.load()
+
+    models = simulator.stats()["models"]
+    assert models[COVERED]["covered"]
+    model = models[COVERED]
+    assert (model["convention"], model["day_count"], model["year_days"]) == (
+        InterestConvention.SIMPLE,
+        DayCount.DUE_DATE,
+        360,
+    )
+    assert UNCOVERED not in models
+
+
+def test_local_simulation_is_opt_in(tmp_path: Path) -> None:
+    """Local simulation is only enabled by default when a corpus is configured."""
+    assert not LocalSimulator(None).enabled
+    assert LocalSimulator(str(tmp_path / "simulations.jsonl")).enabled
+
+
+def test_corpus_is_rotated(tmp_path: Path) -> None:
+    """A corpus that outgrows its maximum size is rotated and read back along with the rotated file."""
+    record = json.loads(CORPUS.read_text(encoding="utf-8").splitlines()[0])
+    request = record["request"]
+    funding_request = GlobalFundingRequest.model_validate({
+        "id": request["id_operacion"],
+        "score": 0.5,
+        "tir": request["tasa_anual"],
+        "moneda": record["currency"],
+        "plazo": {"type": record["duration_unit"], "value": request["plazo"]},
+        "porcentaje_inversion": 10,
+        "credit_type": record["credit_type"],
+    })
+    corpus = tmp_path / "simulations.jsonl"
+    simulator = LocalSimulator(str(corpus), enabled=True, max_corpus_bytes=1)
+
+    for _ in range(3):
+        simulator.record(funding_request, request["fecha_vencimiento"], record["response"])
+
+    assert not corpus.exists()
+    assert len(load(corpus)) == 1